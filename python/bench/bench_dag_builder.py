@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+DAG-builder scaling benchmark on synthetic worlds (no game needed).
+
+Times DAGBuilder.build() and its phases (_build_supply_graph,
+_extract_edges, _extract_chains, _discover_multi_stop_candidates) at
+several multiples of a base world, then repeats each build under
+tracemalloc for peak memory. Results are written as JSON so runs can be
+diffed; --baseline prints per-phase ratios against an earlier file.
+
+    python bench/bench_dag_builder.py                        # 10x, 100x, 1000x
+    python bench/bench_dag_builder.py --scales 10,100 --depth 4 --or-branching 3
+    python bench/bench_dag_builder.py --baseline bench/results/dag_builder.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dag_builder import MULTI_STOP_MAX_STOPS, DAGBuilder  # noqa: E402
+from synthetic_world import SyntheticIPC, SyntheticWorld  # noqa: E402
+
+
+# Builder phases timed individually (method names on DAGBuilder).
+PHASES = (
+    "_build_supply_graph",
+    "_extract_edges",
+    "_extract_chains",
+    "_discover_multi_stop_candidates",
+)
+# A 1x world (fractional); scales multiply both counts, so 1000x is a
+# large real map (100 towns, 1000 industries).
+BASE_TOWNS = 0.1
+BASE_INDUSTRIES = 1.0
+DEFAULT_SCALES = (10, 100, 1000)
+DEFAULT_OUTPUT = Path(__file__).parent / "results" / "dag_builder.json"
+
+
+def _make_builder(world: SyntheticWorld, con_root: Path, workers: Optional[int],
+                  max_stops: int = MULTI_STOP_MAX_STOPS) -> DAGBuilder:
+    builder = DAGBuilder(strict_recipes=True, catalog_path=None,
+                         extract_workers=workers, snapshot_path=None,
+                         multi_stop_max_stops=max_stops)
+    builder.ipc = SyntheticIPC(world)
+    builder.base_zip_path = ""
+    builder.construction_roots = [str(con_root)]
+    return builder
+
+
+def _instrument(builder: DAGBuilder, timings: Dict[str, float]):
+    """Wrap the phase methods on this instance to accumulate wall time."""
+    for name in PHASES:
+        method = getattr(builder, name)
+
+        def timed(*args, _method=method, _name=name, **kwargs):
+            started = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                timings[_name] = timings.get(_name, 0.0) + time.perf_counter() - started
+
+        setattr(builder, name, timed)
+
+
+def _quiet_build(builder: DAGBuilder) -> Dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return builder.build()
+
+
+def run_scale(scale: int, args: argparse.Namespace, con_root: Path) -> Dict[str, Any]:
+    world = SyntheticWorld(
+        towns=max(1, round(args.base_towns * scale)),
+        industries=max(1, round(args.base_industries * scale)),
+        recipe_depth=args.depth,
+        or_branching=args.or_branching,
+        seed=args.seed,
+    )
+    world.write_con_files(con_root)
+
+    best: Optional[Dict[str, float]] = None
+    dag: Dict = {}
+    for _ in range(max(1, args.repeat)):
+        timings: Dict[str, float] = {}
+        builder = _make_builder(world, con_root, args.workers, args.max_stops)
+        _instrument(builder, timings)
+        started = time.perf_counter()
+        dag = _quiet_build(builder)
+        timings["total"] = time.perf_counter() - started
+        if "error" in dag:
+            raise RuntimeError(f"scale {scale}x: {dag['error']}")
+        if best is None or timings["total"] < best["total"]:
+            best = timings
+    assert best is not None
+    best["other"] = max(0.0, best["total"] - sum(best.get(p, 0.0) for p in PHASES))
+
+    peak_mb = None
+    if not args.no_memory:
+        builder = _make_builder(world, con_root, args.workers, args.max_stops)
+        tracemalloc.start()
+        try:
+            _quiet_build(builder)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = round(peak / (1024 * 1024), 2)
+
+    graph = dag.get("supply_graph", {})
+    return {
+        "scale": scale,
+        "towns": len(world.towns),
+        "industries": len(world.industries),
+        "seconds": {k: round(v, 4) for k, v in best.items()},
+        "peak_traced_mb": peak_mb,
+        "counts": {
+            "nodes": len(graph.get("nodes", {})),
+            "edges": len(dag.get("edges", [])),
+            "chains": len(dag.get("complete_chains", [])),
+            "multi_stop_candidates": len(dag.get("multi_stop_candidates", [])),
+        },
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _write_json(path: Path, payload: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(str(tmp_path), str(path))
+
+
+def compare(results: List[Dict], baseline: Dict):
+    """Print current/baseline time and memory ratios per scale and phase."""
+    base_by_scale = {r["scale"]: r for r in baseline.get("results", [])}
+    for res in results:
+        base = base_by_scale.get(res["scale"])
+        if base is None:
+            continue
+        parts = []
+        for key, secs in res["seconds"].items():
+            old = base.get("seconds", {}).get(key)
+            if old:
+                parts.append(f"{key} x{secs / old:.2f}")
+        if res.get("peak_traced_mb") and base.get("peak_traced_mb"):
+            parts.append(f"memory x{res['peak_traced_mb'] / base['peak_traced_mb']:.2f}")
+        print(f"[bench] {res['scale']}x vs baseline: " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAG builder scaling benchmark")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated world multiples (default 10,100,1000)")
+    parser.add_argument("--base-towns", type=float, default=BASE_TOWNS)
+    parser.add_argument("--base-industries", type=float, default=BASE_INDUSTRIES)
+    parser.add_argument("--depth", type=int, default=3, help="Processor tiers above raw")
+    parser.add_argument("--or-branching", type=int, default=2,
+                        help="Interchangeable inputs per processor recipe")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Timed builds per scale (best kept)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="DAGBuilder extract_workers")
+    parser.add_argument("--max-stops", type=int, default=MULTI_STOP_MAX_STOPS,
+                        help="Longest multi-stop loop to search for")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the tracemalloc pass")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    baseline = None
+    if args.baseline is not None:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[bench] Could not read baseline {args.baseline}: {e}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="dag_bench_") as tmp:
+        for scale in scales:
+            res = run_scale(scale, args, Path(tmp) / f"x{scale}")
+            results.append(res)
+            secs = res["seconds"]
+            phases = ", ".join(f"{p.strip('_')} {secs.get(p, 0.0):.3f}s" for p in PHASES)
+            print(
+                f"[bench] {scale}x ({res['towns']} towns, {res['industries']} industries): "
+                f"{secs['total']:.3f}s [{phases}], peak {res['peak_traced_mb']} MB"
+            )
+
+    payload = {
+        "benchmark": "dag_builder_scaling",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "base_towns": args.base_towns,
+            "base_industries": args.base_industries,
+            "depth": args.depth,
+            "or_branching": args.or_branching,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "workers": args.workers,
+        },
+        "peak_rss_mb": _peak_rss_mb(),
+        "results": results,
+    }
+    _write_json(args.output, payload)
+    print(f"[bench] Results written to {args.output}")
+
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
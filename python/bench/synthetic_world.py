@@ -0,0 +1,299 @@
+"""
+Synthetic TF2 worlds for benchmarking without a running game.
+
+A world is a layered cargo economy: tier 0 cargos come from raw
+industries, and each tier-t processor consumes tier t-1 cargos (one
+mandatory input plus `or_branching` interchangeable ones). Towns demand
+top-tier cargos. Towns and industries are scattered over a square map
+sized to keep density constant as the world grows.
+
+    world = SyntheticWorld(towns=100, industries=400, recipe_depth=3)
+    root = world.write_con_files(tmp_dir)   # <root>/industry/*.con
+    ipc = SyntheticIPC(world)               # drop-in for IPCClient reads
+    builder.ipc = ipc
+    builder.construction_roots = [str(root)]
+
+`vanilla_industry_types()` swaps the generated tiers for a small
+vanilla-like economy (COAL + IRON_ORE -> STEEL, GRAIN -> FOOD, ...) for
+code that keys on real cargo names.
+
+Payloads mirror the Lua handlers in res/scripts/simple_ipc.lua
+(all values strings, as the Lua JSON bridge sends them).
+"""
+
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+
+# Metres between neighbouring industries on the generated map.
+DEFAULT_SPACING = 1500.0
+# Top-tier cargos each town asks for.
+TOWN_DEMANDED_CARGOS = 2
+# First entity ids; towns and industries share the game's id space.
+TOWN_ID_BASE = 1
+INDUSTRY_ID_BASE = 100000
+
+BatchEntry = Union[str, Tuple[str, Dict[str, Any]]]
+
+
+def industry_type(name: str, outputs: List[str], stocks: List[str] = (),
+                  input_rows: List[List[int]] = (), tier: int = 0) -> Dict[str, Any]:
+    """One industry type; `input_rows` index into `stocks` like a `.con` rule."""
+    return {
+        "type": name,
+        "file_name": f"industry/{name}.con",
+        "kind": "processor" if stocks else "raw",
+        "tier": tier,
+        "outputs": list(outputs),
+        "stocks": list(stocks),
+        "input_rows": [list(row) for row in input_rows],
+    }
+
+
+def vanilla_industry_types() -> List[Dict[str, Any]]:
+    """A vanilla-like TF2 economy; GOODS takes STEEL and PLANKS or OIL."""
+    return [
+        industry_type("coal_mine", ["COAL"]),
+        industry_type("iron_ore_mine", ["IRON_ORE"]),
+        industry_type("forest", ["LOGS"]),
+        industry_type("farm", ["GRAIN"]),
+        industry_type("oil_well", ["CRUDE"]),
+        industry_type("quarry", ["STONE"]),
+        industry_type("steel_mill", ["STEEL"], ["COAL", "IRON_ORE"], [[1, 1]], tier=1),
+        industry_type("saw_mill", ["PLANKS"], ["LOGS"], [[1]], tier=1),
+        industry_type("oil_refinery", ["OIL"], ["CRUDE"], [[1]], tier=1),
+        industry_type("food_processing_plant", ["FOOD"], ["GRAIN"], [[1]], tier=1),
+        industry_type("construction_materials_plant", ["CONSTRUCTION_MATERIALS"],
+                      ["STONE"], [[1]], tier=1),
+        industry_type("fuel_refinery", ["FUEL"], ["OIL"], [[1]], tier=2),
+        industry_type("tools_factory", ["TOOLS"], ["STEEL"], [[1]], tier=2),
+        industry_type("machines_factory", ["MACHINES"], ["STEEL", "PLANKS"], [[1, 1]], tier=2),
+        industry_type("goods_factory", ["GOODS"], ["STEEL", "PLANKS", "OIL"],
+                      [[1, 1, 0], [1, 0, 1]], tier=2),
+    ]
+
+
+# Cargos towns ask for in the vanilla-like economy.
+VANILLA_TOWN_CARGOS = ["FOOD", "GOODS", "FUEL", "TOOLS", "CONSTRUCTION_MATERIALS", "MACHINES"]
+
+
+class SyntheticWorld:
+    """Deterministic (per seed) towns, industries and recipes."""
+
+    def __init__(self, towns: int = 10, industries: int = 40,
+                 recipe_depth: int = 3, or_branching: int = 2,
+                 seed: int = 0, spacing: float = DEFAULT_SPACING,
+                 year: int = 1900,
+                 industry_types: Optional[List[Dict[str, Any]]] = None,
+                 town_cargos: Optional[List[str]] = None):
+        """Generated tiers unless `industry_types` (and the cargos towns
+        demand, `town_cargos`) are given, e.g. vanilla_industry_types()."""
+        self.recipe_depth = max(1, int(recipe_depth))
+        self.or_branching = max(0, int(or_branching))
+        self.seed = seed
+        self.year = year
+        # Cargos per tier: room for the mandatory input plus OR alternatives.
+        self.width = max(2, self.or_branching + 1)
+        rnd = random.Random(seed)
+
+        self.industry_types = list(industry_types) if industry_types else self._make_types()
+        side = spacing * max(1.0, float(industries) ** 0.5)
+
+        self.industries: List[Dict[str, Any]] = []
+        type_cycle = list(self.industry_types)
+        for i in range(industries):
+            itype = type_cycle[i % len(type_cycle)]
+            self.industries.append({
+                "id": str(INDUSTRY_ID_BASE + i),
+                "name": f"{itype['type']} {i}",
+                "type": itype["type"],
+                "x": str(int(rnd.uniform(0, side))),
+                "y": str(int(rnd.uniform(0, side))),
+                "z": "0",
+            })
+        self._industry_by_id = {ind["id"]: ind for ind in self.industries}
+        self._type_by_name = {t["type"]: t for t in self.industry_types}
+
+        if town_cargos:
+            final_cargos = list(town_cargos)
+        else:
+            final_cargos = [f"CARGO_{self.recipe_depth}_{j}" for j in range(self.width)]
+        self.towns: List[Dict[str, Any]] = []
+        for i in range(towns):
+            wanted = rnd.sample(final_cargos, min(TOWN_DEMANDED_CARGOS, len(final_cargos)))
+            demands = ", ".join(f"{cargo}:{rnd.randint(20, 100)}" for cargo in sorted(wanted))
+            self.towns.append({
+                "id": str(TOWN_ID_BASE + i),
+                "name": f"Town {i}",
+                "x": str(int(rnd.uniform(0, side))),
+                "y": str(int(rnd.uniform(0, side))),
+                "z": "0",
+                "population": str(rnd.randint(300, 3000)),
+                "building_count": str(rnd.randint(20, 200)),
+                "cargo_demands": demands,
+            })
+
+    def _make_types(self) -> List[Dict[str, Any]]:
+        """One industry type per cargo; tier t > 0 consumes tier t-1."""
+        types = []
+        for tier in range(self.recipe_depth + 1):
+            for j in range(self.width):
+                output = f"CARGO_{tier}_{j}"
+                if tier == 0:
+                    stocks: List[str] = []
+                    rows: List[List[int]] = []
+                else:
+                    prev = [f"CARGO_{tier - 1}_{k}" for k in range(self.width)]
+                    mandatory = prev[j]
+                    alternatives = [
+                        prev[(j + 1 + k) % self.width]
+                        for k in range(min(self.or_branching, self.width - 1))
+                    ]
+                    stocks = [mandatory] + alternatives
+                    if len(alternatives) > 1:
+                        # mandatory AND (alt_1 OR alt_2 ...)
+                        rows = [
+                            [1] + [1 if a == k else 0 for a in range(len(alternatives))]
+                            for k in range(len(alternatives))
+                        ]
+                    else:
+                        rows = [[1] * len(stocks)]
+                types.append(industry_type(f"bench_t{tier}_{j}", [output], stocks, rows, tier))
+        return types
+
+    # ------------------------------------------------------------------
+    # Recipe files
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def con_text(itype: Dict[str, Any]) -> str:
+        """A minimal industry `.con` with a stockListConfig recipe."""
+        stocks = ", ".join(f'"{s}"' for s in itype["stocks"])
+        if itype["input_rows"]:
+            rows = ", ".join(
+                "{ " + ", ".join(str(n) for n in row) + " }"
+                for row in itype["input_rows"]
+            )
+        else:
+            rows = "{ }"
+        outputs = ", ".join(f"{c} = 1" for c in itype["outputs"])
+        return (
+            "function data()\n"
+            "return {\n"
+            '\ttype = "INDUSTRY",\n'
+            f'\tdescription = {{ name = _("{itype["type"]}") }},\n'
+            "\tupdateFn = function(params)\n"
+            "\t\tlocal result = { }\n"
+            "\t\tresult.stockListConfig = {\n"
+            f"\t\t\tstocks = {{ {stocks} }},\n"
+            "\t\t\trule = {\n"
+            f"\t\t\t\tinput = {{ {rows} }},\n"
+            f"\t\t\t\toutput = {{ {outputs} }},\n"
+            "\t\t\t\tcapacity = 100,\n"
+            "\t\t\t},\n"
+            "\t\t}\n"
+            "\t\treturn result\n"
+            "\tend,\n"
+            "}\n"
+            "end\n"
+        )
+
+    def write_con_files(self, root: Union[str, Path]) -> Path:
+        """Write every type's `.con` under `root`; returns the construction root."""
+        root = Path(root)
+        for itype in self.industry_types:
+            path = root / itype["file_name"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self.con_text(itype), encoding="utf-8")
+        return root
+
+    # ------------------------------------------------------------------
+    # IPC payloads
+    # ------------------------------------------------------------------
+
+    def game_state(self) -> Dict[str, Any]:
+        return {"year": str(self.year), "month": "1", "day": "1",
+                "money": "50000000", "speed": "0", "paused": "true"}
+
+    def town_demands(self) -> Dict[str, Any]:
+        return {"towns": [dict(t) for t in self.towns]}
+
+    def industries_payload(self) -> Dict[str, Any]:
+        return {"industries": [dict(ind) for ind in self.industries]}
+
+    def recipe_detail(self, industry_id: str) -> Optional[Dict[str, Any]]:
+        ind = self._industry_by_id.get(str(industry_id))
+        if ind is None:
+            return None
+        itype = self._type_by_name[ind["type"]]
+        return {
+            "industry_id": ind["id"],
+            "name": ind["name"],
+            "file_name": itype["file_name"],
+            "type": ind["type"],
+            "items_produced": {c: "100" for c in itype["outputs"]},
+            "items_consumed": {c: "50" for c in itype["stocks"]},
+            "ai_params": {
+                "inputCargoTypeForAiBuilder": [],
+                "outputCargoTypeForAiBuilder": [],
+                "sourcesCountForAiBuilder": [],
+            },
+        }
+
+    def recipes_payload(self, industry_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        ids = [ind["id"] for ind in self.industries] if industry_ids is None else industry_ids
+        recipes, missing = [], []
+        for ind_id in ids:
+            detail = self.recipe_detail(ind_id)
+            if detail is None:
+                missing.append(str(ind_id))
+            else:
+                recipes.append(detail)
+        return {"recipes": recipes, "missing": missing}
+
+
+class SyntheticIPC:
+    """Answers the read-only queries DAGBuilder issues from a SyntheticWorld."""
+
+    def __init__(self, world: SyntheticWorld):
+        self.world = world
+        self.calls: Dict[str, int] = {}
+
+    def send(self, command: str, params: Dict[str, Any] = None,
+             timeout: float = 30.0) -> Optional[Dict]:
+        self.calls[command] = self.calls.get(command, 0) + 1
+        params = params or {}
+        world = self.world
+        if command == "query_game_state":
+            return {"status": "ok", "data": world.game_state()}
+        if command == "query_town_demands":
+            return {"status": "ok", "data": world.town_demands()}
+        if command == "query_industries":
+            return {"status": "ok", "data": world.industries_payload()}
+        if command == "query_industry_recipe":
+            detail = world.recipe_detail(str(params.get("industry_id", "")))
+            if detail is None:
+                return {"status": "error",
+                        "message": f"Industry not found: {params.get('industry_id')}"}
+            return {"status": "ok", "data": detail}
+        if command == "query_industry_recipes":
+            raw = str(params.get("industry_ids", "") or "")
+            ids = [i for i in raw.split(",") if i] or None
+            return {"status": "ok", "data": world.recipes_payload(ids)}
+        if command == "query_lines":
+            return {"status": "ok", "data": {"lines": []}}
+        return {"status": "error", "message": f"Unknown command: {command}"}
+
+    def send_batch(self, commands: Sequence[BatchEntry],
+                   timeout: float = 30.0) -> List[Optional[Dict]]:
+        out = []
+        for entry in commands:
+            if isinstance(entry, str):
+                out.append(self.send(entry, timeout=timeout))
+            else:
+                out.append(self.send(entry[0], entry[1], timeout=timeout))
+        return out
+
+    def invalidate_cache(self, command: Optional[str] = None):
+        pass
@@ -0,0 +1,914 @@
+#!/usr/bin/env python3
+"""
+Local Transport Fever 2 stand-in that speaks the file IPC protocol.
+
+Serves the same files as res/scripts/simple_ipc.lua (the per-request
+spool under SPOOL_DIR once a client has created it, and the legacy
+CMD_FILE/RESP_FILE pair) with handlers for the commands the Python side
+uses: query_*, build_connection, build_cargo_to_town,
+build_industry_connection, build_rail_station, add_vehicle_to_line,
+remove_vehicles_from_line, sell_vehicle, delete_line, set_line_*,
+check_water_path, query_nearby_stations, set_speed/set_calendar_speed,
+add_money, ping and batch. Responses have the Lua handlers' shapes (all
+values strings).
+
+Behind them runs a small monthly economy on a SyntheticWorld: served
+raw industries produce, lines move cargo limited by vehicle capacity
+and round-trip time, processors convert delivered inputs, towns consume
+delivered goods, and money follows revenue, running costs and purchases.
+Builds complete immediately (or after --build-delay seconds) and fail
+silently when money is short, like the in-game AI builder.
+
+    python bench/tf2_sim.py --towns 12 --industries 90 --latency 0.005
+    TF2_GAME_ROOT=/tmp/tf2_sim_game TF2_BUILD_WAIT_SCALE=0 \\
+        python orchestrator.py --cycles 20 --delay-seconds 0
+    python agent_helper.py run-cycle
+
+Game time advances with wall time (--seconds-per-month), or with
+--seconds-per-month 0 by --months-per-command per served command, which
+makes a run a deterministic function of the command stream. The `.con`
+recipes are written under --game-root so DAGBuilder resolves OR recipes
+through TF2_GAME_ROOT. Per-command serve counts and handler time go to
+--stats-file on exit.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ipc_client import CMD_FILE, RESP_FILE, SPOOL_DIR, SPOOL_READY_FILE, SPOOL_SLOTS  # noqa: E402
+from synthetic_world import (  # noqa: E402
+    SyntheticWorld,
+    VANILLA_TOWN_CARGOS,
+    vanilla_industry_types,
+)
+
+
+# Per-mode vehicle and construction economics.
+TRANSPORT_MODES: Dict[str, Dict[str, float]] = {
+    "road": {"speed": 14.0, "capacity": 20, "vehicle_price": 60_000,
+             "running_cost": 1_500, "build_base": 150_000, "build_per_m": 120,
+             "initial_vehicles": 2},
+    "rail": {"speed": 28.0, "capacity": 180, "vehicle_price": 900_000,
+             "running_cost": 12_000, "build_base": 1_500_000, "build_per_m": 400,
+             "initial_vehicles": 1},
+    "water": {"speed": 8.0, "capacity": 300, "vehicle_price": 500_000,
+              "running_cost": 6_000, "build_base": 600_000, "build_per_m": 0,
+              "initial_vehicles": 1},
+}
+# Simulated seconds per game month (trip counts, line frequency/interval).
+GAME_SECONDS_PER_MONTH = 3600.0
+# Loading/unloading time per vehicle round trip.
+STOP_SECONDS = 60.0
+# Revenue per delivered unit per km.
+CARGO_RATE_PER_KM = 45.0
+# Monthly output of a raw industry served by at least one line.
+RAW_PRODUCTION_PER_MONTH = 50
+# Most a processor can make in a month from delivered inputs.
+PROCESSOR_CAPACITY_PER_MONTH = 100
+# Share of delivered town supply left after a month.
+TOWN_SUPPLY_RETAINED = 0.5
+# Share of the purchase price refunded when a vehicle is sold.
+VEHICLE_RESALE_FRACTION = 0.5
+# Spool commands handled per tick, as in simple_ipc.lua.
+SPOOL_MAX_PER_TICK = 8
+# Entity ids for lines, vehicles and stations start here.
+ENTITY_ID_BASE = 500000
+DEFAULT_GAME_ROOT = Path("/tmp/tf2_sim_game")
+
+STATION_WORDS = {"road": "Truck Station", "rail": "Rail Station", "water": "Harbor"}
+
+
+def _num(value: Any, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _unit_hash(*parts: Any) -> float:
+    """Deterministic value in [0, 1) for the given parts."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / float(1 << 64)
+
+
+class SimGame:
+    """Game state and command handlers; no file I/O."""
+
+    def __init__(self, world: SyntheticWorld, money: int = 10_000_000,
+                 seconds_per_month: float = 10.0, months_per_command: float = 0.01,
+                 build_delay: float = 0.0):
+        self.world = world
+        self.money = float(money)
+        self.seconds_per_month = seconds_per_month
+        self.months_per_command = months_per_command
+        self.build_delay = build_delay
+        self.speed = 4
+        self.calendar_speed = 4
+        # Months since January of the world's start year
+        self.clock = 0.0
+        self._months_done = 0
+        self._next_id = ENTITY_ID_BASE
+
+        self.industries = {ind["id"]: ind for ind in world.industries}
+        self.types = {t["type"]: t for t in world.industry_types}
+        self.towns = {t["id"]: t for t in world.towns}
+        self.town_limits: Dict[str, Dict[str, float]] = {}
+        for town in world.towns:
+            limits = {}
+            for token in town["cargo_demands"].split(","):
+                if ":" in token:
+                    cargo, amount = token.split(":", 1)
+                    limits[cargo.strip()] = _num(amount.strip())
+            self.town_limits[town["id"]] = limits
+        self.town_supply: Dict[str, Dict[str, float]] = {tid: {} for tid in self.towns}
+        self.stock: Dict[str, Dict[str, float]] = {iid: {} for iid in self.industries}
+        self.inputs: Dict[str, Dict[str, float]] = {iid: {} for iid in self.industries}
+
+        self.lines: Dict[str, Dict[str, Any]] = {}
+        self.vehicles: Dict[str, str] = {}  # vehicle id -> line id
+        self.stations: Dict[str, Dict[str, Any]] = {}
+        self.pending_builds: List[Tuple[float, Callable[[], None]]] = []
+        self.failed_builds = 0
+
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Dict]] = {
+            "ping": lambda p: {"status": "ok", "data": "pong"},
+            "query_game_state": self.query_game_state,
+            "query_towns": self.query_towns,
+            "query_town_demands": self.query_town_demands,
+            "query_town_supply": self.query_town_supply,
+            "query_industries": lambda p: {"status": "ok", "data": world.industries_payload()},
+            "query_industry_recipe": self.query_industry_recipe,
+            "query_industry_recipes": self.query_industry_recipes,
+            "query_construction_recipe": self.query_construction_recipe,
+            "query_lines": self.query_lines,
+            "query_vehicles": self.query_vehicles,
+            "query_stations": self.query_stations,
+            "query_nearby_stations": self.query_nearby_stations,
+            "check_water_path": self.check_water_path,
+            "set_speed": self.set_speed,
+            "set_calendar_speed": self.set_calendar_speed,
+            "pause": lambda p: self.set_speed({"speed": "0"}),
+            "resume": lambda p: self.set_speed({"speed": "4"}),
+            "add_money": self.add_money,
+            "build_connection": self.build_connection,
+            "build_industry_connection": self.build_industry_connection,
+            "build_cargo_to_town": self.build_cargo_to_town,
+            "build_rail_station": self.build_rail_station,
+            "add_vehicle_to_line": self.add_vehicle_to_line,
+            "remove_vehicles_from_line": self.remove_vehicles_from_line,
+            "sell_vehicle": self.sell_vehicle,
+            "delete_line": self.delete_line,
+            "set_line_load_mode": self.set_line_load_mode,
+            "set_line_all_terminals": self.set_line_all_terminals,
+            "batch": self.batch,
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatch and time
+    # ------------------------------------------------------------------
+
+    def run_command(self, command: str, params: Optional[Dict[str, Any]]) -> Dict:
+        handler = self.handlers.get(str(command))
+        if handler is None:
+            return {"status": "error", "message": f"Unknown command: {command}"}
+        if self.seconds_per_month <= 0:
+            self._advance_months(self.months_per_command)
+        try:
+            resp = handler(params if isinstance(params, dict) else {})
+        except Exception as e:  # handlers are pcall'd in Lua too
+            return {"status": "error", "message": f"{type(e).__name__}: {e}"}
+        return resp or {"status": "error", "message": "nil response"}
+
+    def advance(self, wall_seconds: float):
+        """Run due builds and, in wall-clock mode, move the calendar."""
+        now = time.time()
+        if self.pending_builds:
+            due = [b for b in self.pending_builds if b[0] <= now]
+            self.pending_builds = [b for b in self.pending_builds if b[0] > now]
+            for _, apply in due:
+                apply()
+        if self.seconds_per_month > 0:
+            self._advance_months(wall_seconds / self.seconds_per_month)
+
+    def _advance_months(self, months: float):
+        if self.speed == 0 or self.calendar_speed == 0 or months <= 0:
+            return
+        self.clock += months
+        while self._months_done < int(self.clock):
+            self._months_done += 1
+            self._month_tick()
+
+    def _schedule(self, apply: Callable[[], None]):
+        if self.build_delay > 0:
+            self.pending_builds.append((time.time() + self.build_delay, apply))
+        else:
+            apply()
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return str(self._next_id)
+
+    # ------------------------------------------------------------------
+    # Economy
+    # ------------------------------------------------------------------
+
+    def _round_trip_seconds(self, line: Dict[str, Any]) -> float:
+        mode = TRANSPORT_MODES[line["transport_type"]]
+        return 2.0 * line["distance"] / mode["speed"] + STOP_SECONDS
+
+    def _month_tick(self):
+        served = {line["source_id"] for line in self.lines.values()}
+        for iid in served:
+            itype = self.types[self.industries[iid]["type"]]
+            if itype["kind"] == "raw":
+                stock = self.stock[iid]
+                for cargo in itype["outputs"]:
+                    stock[cargo] = stock.get(cargo, 0.0) + RAW_PRODUCTION_PER_MONTH
+
+        revenue = 0.0
+        running = 0.0
+        for line_id in sorted(self.lines, key=int):
+            line = self.lines[line_id]
+            mode = TRANSPORT_MODES[line["transport_type"]]
+            count = len(line["vehicles"])
+            running += count * mode["running_cost"]
+            trips = GAME_SECONDS_PER_MONTH / self._round_trip_seconds(line)
+            capacity = count * mode["capacity"] * trips
+            stock = self.stock[line["source_id"]]
+            cargo = line["cargo"]
+            moved = float(int(min(capacity, stock.get(cargo, 0.0))))
+            line["last_month"] = moved
+            if moved <= 0:
+                continue
+            stock[cargo] -= moved
+            line["transported"][cargo] = line["transported"].get(cargo, 0.0) + moved
+            revenue += moved * (line["distance"] / 1000.0) * CARGO_RATE_PER_KM
+            target = line["target_id"]
+            if target in self.towns:
+                supply = self.town_supply[target]
+                supply[cargo] = supply.get(cargo, 0.0) + moved
+            else:
+                inputs = self.inputs[target]
+                inputs[cargo] = inputs.get(cargo, 0.0) + moved
+
+        for iid, inputs in self.inputs.items():
+            if not inputs:
+                continue
+            itype = self.types[self.industries[iid]["type"]]
+            best_row, best = None, 0.0
+            for row in itype["input_rows"]:
+                needs = {itype["stocks"][i]: n for i, n in enumerate(row) if n > 0}
+                possible = min((inputs.get(c, 0.0) / n for c, n in needs.items()), default=0.0)
+                if possible > best:
+                    best_row, best = needs, possible
+            made = min(best, PROCESSOR_CAPACITY_PER_MONTH)
+            if best_row is None or made <= 0:
+                continue
+            for cargo, n in best_row.items():
+                inputs[cargo] -= made * n
+            for cargo in itype["outputs"]:
+                self.stock[iid][cargo] = self.stock[iid].get(cargo, 0.0) + made
+
+        for supply in self.town_supply.values():
+            for cargo in supply:
+                supply[cargo] *= TOWN_SUPPLY_RETAINED
+        self.money += revenue - running
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query_game_state(self, params: Dict) -> Dict:
+        month_index = int(self.clock)
+        day = 1 + int((self.clock - month_index) * 30)
+        return {"status": "ok", "data": {
+            "year": str(self.world.year + month_index // 12),
+            "month": str(1 + month_index % 12),
+            "day": str(day),
+            "money": str(int(self.money)),
+            "speed": str(self.speed),
+            "paused": "true" if self.speed == 0 else "false",
+        }}
+
+    def query_towns(self, params: Dict) -> Dict:
+        return {"status": "ok", "data": {"towns": [
+            {"id": t["id"], "name": t["name"], "population": t["population"]}
+            for t in self.towns.values()
+        ]}}
+
+    def _town_demands(self, town_id: str) -> Dict[str, int]:
+        supply = self.town_supply[town_id]
+        out = {}
+        for cargo, limit in self.town_limits[town_id].items():
+            demand = int(max(0.0, limit - supply.get(cargo, 0.0)))
+            if demand > 0:
+                out[cargo] = demand
+        return out
+
+    def query_town_demands(self, params: Dict) -> Dict:
+        towns = []
+        for town in self.towns.values():
+            entry = dict(town)
+            entry["cargo_demands"] = ", ".join(
+                f"{c}:{n}" for c, n in self._town_demands(town["id"]).items())
+            towns.append(entry)
+        return {"status": "ok", "data": {"towns": towns}}
+
+    def query_town_supply(self, params: Dict) -> Dict:
+        towns = []
+        for tid, town in self.towns.items():
+            supply = self.town_supply[tid]
+            cargos = []
+            for cargo, limit in self.town_limits[tid].items():
+                have = int(supply.get(cargo, 0.0))
+                cargos.append({"cargo": cargo, "supply": str(have), "limit": str(int(limit)),
+                               "demand": str(max(0, int(limit) - have))})
+            towns.append({"id": tid, "name": town["name"], "cargos": cargos})
+        return {"status": "ok", "data": {"towns": towns}}
+
+    def query_industry_recipe(self, params: Dict) -> Dict:
+        if not params.get("industry_id"):
+            return {"status": "error", "message": "Need industry_id parameter"}
+        detail = self.world.recipe_detail(str(params["industry_id"]))
+        if detail is None:
+            return {"status": "error", "message": f"Industry not found: {params['industry_id']}"}
+        return {"status": "ok", "data": detail}
+
+    def query_industry_recipes(self, params: Dict) -> Dict:
+        raw = str(params.get("industry_ids", "") or "")
+        ids = [i for i in raw.split(",") if i] or None
+        return {"status": "ok", "data": self.world.recipes_payload(ids)}
+
+    def query_construction_recipe(self, params: Dict) -> Dict:
+        if not params.get("file_name"):
+            return {"status": "error", "message": "Need file_name parameter"}
+        file_name = str(params["file_name"])
+        itype = next((t for t in self.types.values() if t["file_name"] == file_name), None)
+        if itype is None:
+            return {"status": "error", "message": f"construction not found: {file_name}"}
+        return {"status": "ok", "data": {
+            "file_name": file_name,
+            "stockListConfig_stocks": list(itype["stocks"]),
+            "stockListConfig_rule": {
+                "input": [[str(n) for n in row] for row in itype["input_rows"]],
+                "output": {c: "1" for c in itype["outputs"]},
+                "capacity": "100",
+            },
+        }}
+
+    def query_lines(self, params: Dict) -> Dict:
+        lines = []
+        for line_id in sorted(self.lines, key=int):
+            line = self.lines[line_id]
+            count = len(line["vehicles"])
+            round_trip = self._round_trip_seconds(line)
+            frequency = count / round_trip if count else 0.0
+            transported = {c: str(int(v)) for c, v in line["transported"].items() if v > 0}
+            lines.append({
+                "id": line_id,
+                "name": line["name"],
+                "vehicle_count": str(count),
+                "stop_count": "2",
+                "rate": str(int(line.get("last_month", 0.0) * 12)),
+                "frequency": str(frequency),
+                "interval": str(int(1 / frequency)) if frequency > 0 else "0",
+                "transport_type": line["transport_type"],
+                "transported": transported,
+                "total_transported": str(int(sum(line["transported"].values()))),
+            })
+        return {"status": "ok", "data": {"lines": lines}}
+
+    def query_vehicles(self, params: Dict) -> Dict:
+        return {"status": "ok", "data": {"vehicles": [
+            {"id": vid, "line": line_id} for vid, line_id in self.vehicles.items()
+        ]}}
+
+    def query_stations(self, params: Dict) -> Dict:
+        return {"status": "ok", "data": {"stations": [
+            {"id": sid, "name": st["name"]} for sid, st in self.stations.items()
+        ]}}
+
+    def query_nearby_stations(self, params: Dict) -> Dict:
+        industry_id = str(params.get("industry_id", ""))
+        if not industry_id or industry_id == "null":
+            return {"status": "error", "message": "Need industry_id parameter"}
+        ind = self.industries.get(industry_id)
+        if ind is None:
+            return {"status": "error", "message": "Invalid industry ID"}
+        radius = _num(params.get("radius"), 300.0)
+        ix, iy = _num(ind["x"]), _num(ind["y"])
+        nearby = []
+        for sid, st in self.stations.items():
+            dist = math.hypot(st["x"] - ix, st["y"] - iy)
+            if dist < radius:
+                nearby.append({
+                    "id": sid, "name": st["name"], "type": st["type"],
+                    "distance": str(int(dist)),
+                    "x": str(int(st["x"])), "y": str(int(st["y"])),
+                })
+        return {"status": "ok", "data": {
+            "industry_id": industry_id,
+            "industry_x": str(int(ix)), "industry_y": str(int(iy)),
+            "radius": str(int(radius)),
+            "stations": nearby,
+            "station_count": str(len(nearby)),
+        }}
+
+    def check_water_path(self, params: Dict) -> Dict:
+        """Deterministic terrain stand-in: ~15% of long routes are navigable."""
+        x1, y1 = _num(params.get("x1")), _num(params.get("y1"))
+        x2, y2 = _num(params.get("x2")), _num(params.get("y2"))
+        samples = max(1, int(_num(params.get("samples"), 20)))
+        roll = _unit_hash(self.world.seed, int(x1), int(y1), int(x2), int(y2))
+        ratio = 0.8 if roll < 0.15 else roll * 0.5
+        water = int(round(ratio * (samples + 1)))
+        viable = ratio > 0.7
+        return {"status": "ok", "data": {
+            "water_points": str(water),
+            "land_points": str(samples + 1 - water),
+            "water_ratio": str(water / float(samples + 1)),
+            "has_water_path": "true" if viable else "false",
+            "start_near_water": "true" if viable else "false",
+            "end_near_water": "true" if viable else "false",
+            "ship_viable": "true" if viable else "false",
+        }}
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    def set_speed(self, params: Dict) -> Dict:
+        self.speed = int(min(4, max(0, _num(params.get("speed"), 4))))
+        return {"status": "ok", "data": {"speed": str(self.speed)}}
+
+    def set_calendar_speed(self, params: Dict) -> Dict:
+        self.calendar_speed = int(max(0, _num(params.get("speed"), 4)))
+        return {"status": "ok", "data": {"calendar_speed": str(self.calendar_speed)}}
+
+    def add_money(self, params: Dict) -> Dict:
+        amount = _num(params.get("amount"), 0.0)
+        self.money += amount
+        return {"status": "ok", "data": {"added": str(int(amount)), "money": str(int(self.money))}}
+
+    def _endpoint(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        return self.industries.get(entity_id) or self.towns.get(entity_id)
+
+    def _pick_cargo(self, source: Dict, target: Dict, cargo: Any) -> str:
+        cargo = str(cargo or "")
+        if cargo and cargo != "null":
+            return cargo.upper()
+        outputs = self.types[source["type"]]["outputs"]
+        if target["id"] in self.industries:
+            wanted = set(self.types[target["type"]]["stocks"])
+        else:
+            wanted = set(self.town_limits.get(target["id"], {}))
+        return next((c for c in outputs if c in wanted), outputs[0] if outputs else "")
+
+    def _add_station(self, entity: Dict, transport_type: str, offset: float) -> str:
+        sid = self._new_id()
+        angle = _unit_hash(entity["id"], transport_type, sid) * 2 * math.pi
+        self.stations[sid] = {
+            "name": f"{entity['name']} {STATION_WORDS.get(transport_type, 'Station')}",
+            "type": transport_type,
+            "x": _num(entity["x"]) + offset * math.cos(angle),
+            "y": _num(entity["y"]) + offset * math.sin(angle),
+        }
+        return sid
+
+    def _open_line(self, source_id: str, target_id: str, cargo: Any,
+                   transport_type: str) -> Dict:
+        source = self.industries.get(source_id)
+        if source is None:
+            return {"status": "error", "message": f"Industry not found: {source_id}"}
+        target = self._endpoint(target_id)
+        if target is None:
+            return {"status": "error", "message": f"Industry not found: {target_id}"}
+        transport_type = "water" if transport_type == "ship" else transport_type
+        if transport_type not in TRANSPORT_MODES:
+            transport_type = "road"
+        cargo_name = self._pick_cargo(source, target, cargo)
+        distance = math.hypot(_num(target["x"]) - _num(source["x"]),
+                              _num(target["y"]) - _num(source["y"]))
+
+        def apply():
+            mode = TRANSPORT_MODES[transport_type]
+            count = int(mode["initial_vehicles"])
+            cost = mode["build_base"] + mode["build_per_m"] * distance + count * mode["vehicle_price"]
+            if cost > self.money:
+                self.failed_builds += 1
+                return
+            self.money -= cost
+            line_id = self._new_id()
+            line = {
+                "name": f"{source['name']} - {target['name']} {cargo_name}",
+                "source_id": source_id,
+                "target_id": target_id,
+                "cargo": cargo_name,
+                "transport_type": transport_type,
+                "distance": max(100.0, distance),
+                "vehicles": [],
+                "transported": {},
+                "load_mode": "load_if_available",
+                "last_month": 0.0,
+            }
+            self.lines[line_id] = line
+            for _ in range(count):
+                vid = self._new_id()
+                line["vehicles"].append(vid)
+                self.vehicles[vid] = line_id
+            self._add_station(source, transport_type, 80.0)
+            self._add_station(target, transport_type, 80.0)
+
+        self._schedule(apply)
+        return {"status": "ok", "data": {
+            "industry1": source["name"], "industry2": target["name"],
+            "cargo": cargo_name, "transport_type": transport_type,
+        }}
+
+    def build_connection(self, params: Dict) -> Dict:
+        if not params.get("industry1_id") or not params.get("industry2_id"):
+            return {"status": "error", "message": "Missing industry1_id or industry2_id"}
+        return self._open_line(str(params["industry1_id"]), str(params["industry2_id"]),
+                               params.get("cargo"), str(params.get("transport_type", "road")))
+
+    def build_industry_connection(self, params: Dict) -> Dict:
+        resp = self.build_connection(params)
+        if resp.get("status") == "ok":
+            resp["data"] = {"industry1_id": str(params["industry1_id"]),
+                            "industry2_id": str(params["industry2_id"])}
+        return resp
+
+    def build_cargo_to_town(self, params: Dict) -> Dict:
+        if not params.get("industry_id") or not params.get("town_id"):
+            return {"status": "error", "message": "Need industry_id and town_id"}
+        town_id = str(params["town_id"])
+        if town_id not in self.towns:
+            return {"status": "error", "message": f"Town not found: {town_id}"}
+        resp = self._open_line(str(params["industry_id"]), town_id,
+                               params.get("cargo"), str(params.get("transport_type", "road")))
+        if resp.get("status") == "ok":
+            data = resp["data"]
+            resp["data"] = {"industry": data["industry1"], "town": data["industry2"],
+                            "cargo": data["cargo"], "transport_type": data["transport_type"]}
+        return resp
+
+    def build_rail_station(self, params: Dict) -> Dict:
+        industry_id = str(params.get("industry_id", ""))
+        ind = self.industries.get(industry_id)
+        if ind is None:
+            return {"status": "error", "message": "Invalid industry_id"}
+        distance = _num(params.get("distance"), 20.0)
+
+        def apply():
+            sid = self._add_station(ind, "rail", distance + 40.0)
+            if params.get("name"):
+                self.stations[sid]["name"] = str(params["name"])
+
+        self._schedule(apply)
+        return {"status": "ok", "data": {
+            "message": f"Rail station '{params.get('name', 'Rail Station')}' build initiated",
+            "industry_id": industry_id,
+            "position_x": ind["x"], "position_y": ind["y"],
+            "station_angle_deg": "0.0",
+        }}
+
+    def _line(self, params: Dict) -> Optional[Dict[str, Any]]:
+        return self.lines.get(str(params.get("line_id", "")))
+
+    def add_vehicle_to_line(self, params: Dict) -> Dict:
+        if not params.get("line_id"):
+            return {"status": "error", "message": "Need line_id parameter"}
+        count = int(_num(params.get("count"), 1))
+        if count < 1 or count > 10:
+            return {"status": "error", "message": "count must be 1-10"}
+        line_id = str(params["line_id"])
+        line = self.lines.get(line_id)
+        if line is None:
+            return {"status": "error", "message": f"Failed to add vehicles: Line not found: {line_id}"}
+        price = TRANSPORT_MODES[line["transport_type"]]["vehicle_price"]
+
+        def apply():
+            # Queued purchases the player cannot afford are dropped in game
+            for _ in range(count):
+                if line_id not in self.lines or self.money < price:
+                    return
+                self.money -= price
+                vid = self._new_id()
+                line["vehicles"].append(vid)
+                self.vehicles[vid] = line_id
+
+        self._schedule(apply)
+        return {"status": "ok", "data": {
+            "line_id": line_id, "vehicles_queued": str(count),
+            "carrier": line["transport_type"] if line["transport_type"] != "water" else "water",
+        }}
+
+    def _sell(self, vid: str):
+        line_id = self.vehicles.pop(vid, None)
+        line = self.lines.get(line_id) if line_id else None
+        if line is None:
+            return
+        line["vehicles"].remove(vid)
+        price = TRANSPORT_MODES[line["transport_type"]]["vehicle_price"]
+        self.money += price * VEHICLE_RESALE_FRACTION
+
+    def remove_vehicles_from_line(self, params: Dict) -> Dict:
+        if not params.get("line_id"):
+            return {"status": "error", "message": "Need line_id parameter"}
+        line = self._line(params)
+        if line is None or not line["vehicles"]:
+            return {"status": "ok", "data": {"removed": "0", "remaining": "0"}}
+        count = min(int(_num(params.get("count"), 1)), 20)
+        vehicles = list(line["vehicles"])
+        to_remove = min(count, len(vehicles) - 1)
+        if to_remove <= 0:
+            return {"status": "ok", "data": {"removed": "0", "remaining": str(len(vehicles))}}
+        for vid in vehicles[len(vehicles) - to_remove:]:
+            self._sell(vid)
+        return {"status": "ok", "data": {
+            "removed": str(to_remove),
+            "remaining": str(len(vehicles) - to_remove),
+            "line_id": str(params["line_id"]),
+        }}
+
+    def sell_vehicle(self, params: Dict) -> Dict:
+        if not params.get("vehicle_id"):
+            return {"status": "error", "message": "Need vehicle_id parameter"}
+        vid = str(params["vehicle_id"])
+        self._sell(vid)
+        return {"status": "ok", "message": "Vehicle sold", "vehicle_id": vid}
+
+    def delete_line(self, params: Dict) -> Dict:
+        if not params.get("line_id"):
+            return {"status": "error", "message": "Need line_id parameter"}
+        line_id = str(params["line_id"])
+        line = self.lines.get(line_id)
+        sold = 0
+        if line is not None:
+            for vid in list(line["vehicles"]):
+                self._sell(vid)
+                sold += 1
+            del self.lines[line_id]
+        return {"status": "ok", "message": "Line deleted", "data": {
+            "vehicles_sold": str(sold), "line_id": line_id,
+        }}
+
+    def set_line_load_mode(self, params: Dict) -> Dict:
+        line = self._line(params)
+        if line is None:
+            return {"status": "error", "message": f"Line not found: {params.get('line_id')}"}
+        line["load_mode"] = str(params.get("mode") or "load_if_available")
+        return {"status": "ok", "data": {
+            "line_id": str(params["line_id"]), "mode": line["load_mode"], "stops_updated": "2",
+        }}
+
+    def set_line_all_terminals(self, params: Dict) -> Dict:
+        line = self._line(params)
+        if line is None:
+            return {"status": "error", "message": f"Line not found: {params.get('line_id')}"}
+        return {"status": "ok", "data": {
+            "line_id": str(params["line_id"]), "stops_updated": "2", "terminals_added": "2",
+        }}
+
+    def batch(self, params: Dict) -> Dict:
+        commands = params.get("commands")
+        if not isinstance(commands, list):
+            return {"status": "error", "message": "Need commands list"}
+        results = []
+        for idx, sub in enumerate(commands, start=1):
+            sub = sub if isinstance(sub, dict) else {}
+            if sub.get("cmd") == "batch":
+                resp = {"status": "error", "message": "Nested batch not allowed"}
+            else:
+                resp = self.run_command(sub.get("cmd", ""), sub.get("params"))
+            resp["id"] = sub.get("id", str(idx))
+            results.append(resp)
+        return {"status": "ok", "data": {"results": results}}
+
+
+class FileIPCServer:
+    """Serves SimGame over the spool and legacy command files."""
+
+    def __init__(self, game: SimGame, cmd_file: str = CMD_FILE, resp_file: str = RESP_FILE,
+                 spool_dir: str = SPOOL_DIR, tick: float = 0.01,
+                 latency: Optional[Dict[str, float]] = None, default_latency: float = 0.0,
+                 serve_spool: bool = True, verbose: bool = False):
+        self.game = game
+        self.cmd_file = cmd_file
+        self.resp_file = resp_file
+        self.spool_dir = spool_dir
+        self.tick = tick
+        self.latency = dict(latency or {})
+        self.default_latency = default_latency
+        self.serve_spool = serve_spool
+        self.verbose = verbose
+        self.spool_ready = False
+        self.spool_next_slot = 0
+        self.last_cmd_id: Optional[str] = None
+        self.running = False
+        # command -> {"count", "seconds"} (handler time, latency included)
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.started_at = time.time()
+
+    def reset_files(self):
+        for path in (self.cmd_file, self.resp_file,
+                     os.path.join(self.spool_dir, SPOOL_READY_FILE)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def serve_forever(self):
+        self.reset_files()
+        self.running = True
+        last = time.time()
+        while self.running:
+            now = time.time()
+            self.game.advance(now - last)
+            last = now
+            self.poll()
+            time.sleep(self.tick)
+        self.reset_files()
+
+    def poll(self):
+        if self.serve_spool:
+            self._drain_spool()
+        cmd = self._read_json(self.cmd_file)
+        if cmd is None:
+            return
+        cmd_id = cmd.get("id")
+        if cmd_id == self.last_cmd_id:
+            return
+        self.last_cmd_id = cmd_id
+        resp = self._run(cmd)
+        resp["id"] = cmd_id
+        try:
+            os.remove(self.cmd_file)
+        except OSError:
+            pass
+        self._write_json(self.resp_file, resp)
+
+    def _drain_spool(self):
+        if not self.spool_ready:
+            if not os.path.isdir(self.spool_dir):
+                return
+            with open(os.path.join(self.spool_dir, SPOOL_READY_FILE), "w") as f:
+                f.write("1")
+            self.spool_ready = True
+            print(f"[tf2_sim] Serving spool {self.spool_dir}")
+        processed = 0
+        for i in range(SPOOL_SLOTS):
+            if processed >= SPOOL_MAX_PER_TICK:
+                break
+            path = os.path.join(self.spool_dir, f"cmd_{(self.spool_next_slot + i) % SPOOL_SLOTS}.json")
+            cmd = self._read_json(path)
+            if cmd is None:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            cmd_id = str(cmd.get("id", ""))
+            if not cmd_id.replace("_", "").isalnum():
+                continue
+            processed += 1
+            resp = self._run(cmd)
+            resp["id"] = cmd_id
+            self._write_json(os.path.join(self.spool_dir, f"resp_{cmd_id}.json"), resp)
+        self.spool_next_slot = (self.spool_next_slot + 1) % SPOOL_SLOTS
+
+    def _run(self, cmd: Dict[str, Any]) -> Dict:
+        command = str(cmd.get("cmd", ""))
+        started = time.perf_counter()
+        resp = self.game.run_command(command, cmd.get("params"))
+        entries = cmd.get("params", {}).get("commands", []) if command == "batch" else [cmd]
+        delay = sum(self.latency.get(str(e.get("cmd", "")), self.default_latency)
+                    for e in entries if isinstance(e, dict))
+        if delay > 0:
+            time.sleep(delay)
+        entry = self.stats.setdefault(command, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += time.perf_counter() - started
+        if self.verbose:
+            print(f"[tf2_sim] {command} -> {resp.get('status')}")
+        return resp
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as f:
+                content = f.read()
+        except OSError:
+            return None
+        if not content:
+            return None
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            return None  # half-written; picked up next tick
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def _write_json(path: str, payload: Dict):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def summary(self) -> Dict[str, Any]:
+        game = self.game
+        return {
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "commands": {
+                cmd: {"count": int(s["count"]), "seconds": round(s["seconds"], 4)}
+                for cmd, s in sorted(self.stats.items())
+            },
+            "game": {
+                "months": game._months_done,
+                "money": int(game.money),
+                "lines": len(game.lines),
+                "vehicles": len(game.vehicles),
+                "failed_builds": game.failed_builds,
+            },
+        }
+
+
+def _parse_latency(values: List[str]) -> Dict[str, float]:
+    out = {}
+    for item in values:
+        command, _, seconds = item.partition("=")
+        out[command.strip()] = float(seconds)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local TF2 IPC simulator")
+    parser.add_argument("--towns", type=int, default=12)
+    parser.add_argument("--industries", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--year", type=int, default=1900)
+    parser.add_argument("--money", type=int, default=10_000_000)
+    parser.add_argument("--seconds-per-month", type=float, default=10.0,
+                        help="Wall seconds per game month (0 = advance per command)")
+    parser.add_argument("--months-per-command", type=float, default=0.01)
+    parser.add_argument("--build-delay", type=float, default=0.0,
+                        help="Wall seconds before builds and purchases take effect")
+    parser.add_argument("--latency", action="append", default=[], metavar="CMD=SECONDS",
+                        help="Extra handler latency for one command (repeatable)")
+    parser.add_argument("--default-latency", type=float, default=0.0,
+                        help="Handler latency for every other command")
+    parser.add_argument("--tick", type=float, default=0.01, help="Poll interval in seconds")
+    parser.add_argument("--legacy-only", action="store_true",
+                        help="Do not advertise the spool protocol")
+    parser.add_argument("--game-root", type=Path, default=DEFAULT_GAME_ROOT,
+                        help="Where to write the world's .con files (TF2_GAME_ROOT)")
+    parser.add_argument("--stats-file", type=Path, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    world = SyntheticWorld(
+        towns=args.towns, industries=args.industries, seed=args.seed, year=args.year,
+        industry_types=vanilla_industry_types(), town_cargos=VANILLA_TOWN_CARGOS,
+    )
+    con_root = args.game_root / "mods" / "tf2_sim" / "res" / "construction"
+    world.write_con_files(con_root)
+
+    game = SimGame(world, money=args.money, seconds_per_month=args.seconds_per_month,
+                   months_per_command=args.months_per_command, build_delay=args.build_delay)
+    server = FileIPCServer(game, tick=args.tick, latency=_parse_latency(args.latency),
+                           default_latency=args.default_latency,
+                           serve_spool=not args.legacy_only, verbose=args.verbose)
+
+    def stop(signum, frame):
+        server.running = False
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"[tf2_sim] {len(world.towns)} towns, {len(world.industries)} industries; "
+          f"recipes under {con_root}")
+    print(f"[tf2_sim] export TF2_GAME_ROOT={args.game_root} TF2_BUILD_WAIT_SCALE=0")
+    server.serve_forever()
+
+    summary = server.summary()
+    served = sum(c["count"] for c in summary["commands"].values())
+    print(f"[tf2_sim] Served {served} commands in {summary['wall_seconds']}s; "
+          f"{summary['game']['lines']} lines, money ${summary['game']['money']:,}")
+    if args.stats_file is not None:
+        args.stats_file.parent.mkdir(parents=True, exist_ok=True)
+        FileIPCServer._write_json(str(args.stats_file), summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Bounded-length loop enumeration for multi-stop truck candidates.
+
+A loop is a simple directed path of loaded arcs (DAG flow edges) closed
+by one more leg back to the first stop: another loaded arc if one exists,
+otherwise an empty (deadhead) run. Nodes are dense integers; callers
+intern ids so that integer order matches id order.
+
+Duplicates are avoided structurally instead of by hashing every rotation:
+
+- all-loaded loops are only reported from their minimum node, the one
+  rotation every other traversal would also reach;
+- a loop with a deadhead closing leg has exactly one valid rotation (its
+  loaded path), so it is reported wherever that path starts.
+
+The path is pushed and popped in place. Partial paths that can no longer
+close loaded are pruned by an upper bound on the achievable
+loaded-distance ratio, both against `min_ratio` and, once `top_k` loops
+are held, against the weakest loop kept. That keeps 5-6 stop searches
+tractable.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# (target, distance, flow_score, arc index)
+Arc = Tuple[int, float, float, int]
+
+
+def loop_score(loaded_distance: float, total_distance: float,
+               loaded_legs: int, stop_count: int, flow_score: float) -> float:
+    """Rank score: loaded distance share first, then legs, flow and length."""
+    return (
+        (loaded_distance / total_distance) * 100.0
+        + (loaded_legs / float(stop_count)) * 20.0
+        + min(30.0, flow_score / 20.0)
+        - total_distance / 3000.0
+    )
+
+
+class CycleEngine:
+    """Top-k loop search over a loaded-arc graph with deadhead closings."""
+
+    def __init__(
+        self,
+        node_count: int,
+        arcs: Sequence[Tuple[int, int, float, float]],
+        deadhead: np.ndarray,
+        plan_distance: Optional[np.ndarray] = None,
+    ):
+        """
+        Args:
+            node_count: number of interned nodes.
+            arcs: (source, target, distance, flow_score) loaded arcs, in the
+                order successors should be explored.
+            deadhead: (n, n) closing distance for unloaded legs.
+            plan_distance: (n, n) straight-line distance consistent with
+                arc distances, a lower bound of `deadhead` used for pruning.
+                None disables geometric pruning.
+        """
+        self.node_count = node_count
+        self.arcs = [tuple(a) for a in arcs]
+        self.succ: List[List[Arc]] = [[] for _ in range(node_count)]
+        self.loaded: Dict[Tuple[int, int], int] = {}
+        has_pred_above = [False] * node_count
+        for idx, (u, v, dist, flow) in enumerate(self.arcs):
+            self.succ[u].append((v, float(dist), float(flow), idx))
+            self.loaded.setdefault((u, v), idx)
+            if u > v:
+                has_pred_above[v] = True
+        self.has_pred_above = has_pred_above
+        self.deadhead = np.asarray(deadhead, dtype=np.float64)
+        self.plan_distance = (
+            None if plan_distance is None
+            else np.asarray(plan_distance, dtype=np.float64)
+        )
+        # Every remaining loaded leg is at most this long (+ rounding slack).
+        self.max_arc = max((float(a[2]) for a in self.arcs), default=0.0)
+
+    def search(
+        self,
+        min_stops: int = 3,
+        max_stops: int = 6,
+        min_ratio: float = 0.75,
+        top_k: int = 30,
+        starts: Optional[Sequence[int]] = None,
+    ) -> List[Dict]:
+        """Return up to `top_k` loops, best first.
+
+        Ranking is by (loaded distance ratio, loaded leg ratio, score) with
+        ratios rounded to 3 places and score to 2, ties kept in discovery
+        order (shorter loops first, then `starts` order). Each result holds
+        node and arc indices plus the loop's distances and ratios.
+        """
+        if top_k <= 0 or max_stops < min_stops or not self.arcs:
+            return []
+        if starts is None:
+            starts = range(self.node_count)
+
+        heap: List[Tuple[Tuple, Tuple[int, int], Dict]] = []
+        seq = 0
+        path: List[int] = []
+        path_arcs: List[int] = []
+        on_path = [False] * self.node_count
+        max_arc = self.max_arc
+        # Distances *to* the current start, pulled once per start.
+        deadhead: List[float] = []
+        plan: Optional[List[float]] = None
+
+
+        def ratio_floor() -> float:
+            """Ratio a new loop must reach (rounded) to enter the heap."""
+            if len(heap) < top_k:
+                return -1.0
+            return heap[0][0][0]
+
+        def close(start: int, end: int, depth: int, loaded_dist: float,
+                  flow: float, all_above: bool) -> None:
+            nonlocal seq
+            closing = self.loaded.get((end, start))
+            if closing is not None:
+                if not all_above:
+                    return  # reported from the loop's minimum node instead
+                closing_dist = float(self.arcs[closing][2])
+                loop_loaded = loaded_dist + closing_dist
+                total = loop_loaded
+                loaded_legs = depth
+                flow += float(self.arcs[closing][3])
+            else:
+                closing_dist = deadhead[end]
+                loop_loaded = loaded_dist
+                total = loaded_dist + closing_dist
+                loaded_legs = depth - 1
+            if total <= 0:
+                return
+            ratio = loop_loaded / total
+            if ratio < min_ratio:
+                return
+            leg_ratio = loaded_legs / float(depth)
+            score = loop_score(loop_loaded, total, loaded_legs, depth, flow)
+            rank = (round(ratio, 3), round(leg_ratio, 3), round(score, 2))
+            seq += 1
+            order = (-depth, -seq)
+            if len(heap) >= top_k and (rank, order) <= heap[0][:2]:
+                return
+            loop = {
+                "stop_count": depth,
+                "nodes": list(path),
+                "arcs": list(path_arcs),
+                "closing_arc": closing,
+                "closing_distance": closing_dist,
+                "loaded_distance": loop_loaded,
+                "total_distance": total,
+                "loaded_legs": loaded_legs,
+                "loaded_leg_ratio": leg_ratio,
+                "loaded_distance_ratio": ratio,
+                "flow_score": flow,
+                "score": score,
+            }
+            if len(heap) < top_k:
+                heapq.heappush(heap, (rank, order, loop))
+            else:
+                heapq.heapreplace(heap, (rank, order, loop))
+
+        def hopeless(start: int, cur: int, depth: int, loaded_dist: float,
+                     all_above: bool) -> bool:
+            """True if no extension of this path can still qualify."""
+            if all_above and self.has_pred_above[start]:
+                return False  # may still close loaded at ratio 1.0
+            if plan is None:
+                return False
+            remaining = max_stops - depth
+            reach = remaining * max_arc
+            gap = plan[cur] - remaining * (max_arc + 0.5)
+            best_loaded = loaded_dist + reach
+            best_total = best_loaded + max(0.0, gap)
+            if best_total <= 0:
+                return False
+            bound = best_loaded / best_total
+            if bound < min_ratio:
+                return True
+            return round(bound, 3) < ratio_floor()
+
+        def extend(start: int, cur: int, loaded_dist: float, flow: float,
+                   below: int) -> None:
+            depth = len(path)
+            if depth >= min_stops:
+                close(start, cur, depth, loaded_dist, flow, below == 0)
+            if depth >= max_stops:
+                return
+            for nxt, dist, arc_flow, idx in self.succ[cur]:
+                if on_path[nxt]:
+                    continue
+                next_below = below + (1 if nxt < start else 0)
+                next_loaded = loaded_dist + dist
+                if hopeless(start, nxt, depth + 1, next_loaded, next_below == 0):
+                    continue
+                path.append(nxt)
+                path_arcs.append(idx)
+                on_path[nxt] = True
+                extend(start, nxt, next_loaded, flow + arc_flow, next_below)
+                on_path[nxt] = False
+                path_arcs.pop()
+                path.pop()
+
+        for start in starts:
+            if not self.succ[start]:
+                continue
+            deadhead = self.deadhead[:, start].tolist()
+            if self.plan_distance is not None:
+                plan = self.plan_distance[:, start].tolist()
+            path.append(start)
+            on_path[start] = True
+            extend(start, start, 0.0, 0.0, 0)
+            on_path[start] = False
+            path.pop()
+
+        ordered = sorted(heap, key=lambda e: (e[0], e[1]), reverse=True)
+        return [loop for _, _, loop in ordered]
@@ -5,11 +5,15 @@ Builds the DAG dynamically backwards from town demands to suppliers,
 using live industry instances plus recipes parsed from actual `.con`
 files (base game construction zip + installed workshop/local mods).
 
-Also converts the tree into legacy flat chain format for backward
-compatibility with downstream agents (Surveyor, Strategist, Planner).
+Each industry is a single shared node referenced by every consumer, so
+the supply graph is built in time linear in industries plus supplier
+edges. It is converted into the legacy flat chain format for downstream
+agents (Surveyor, Strategist, Planner); `legacy_tree()` materialises the
+old nested per-town tree on demand.
 
 Usage:
     python dag_builder.py
+    python dag_builder.py --index     # pre-parse every industry .con
 
     # Or programmatically:
     from dag_builder import DAGBuilder
@@ -19,16 +23,30 @@ Usage:
         print(f"{chain['score']}: {chain['final_cargo']} -> {chain['town']}")
 """
 
-import math
+import argparse
+import hashlib
+import heapq
+import json
 import os
+import pickle
 import re
 import sys
+import tempfile
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
+from cycle_engine import CycleEngine
+from geo_index import GeoIndex
+from graph_core import GraphCore
 from ipc_client import get_ipc
+from recipe_catalog import DEFAULT_CATALOG_FILE, RecipeCatalog
+from spatial_index import GridIndex
 
 
 # Cargos that towns can demand (kept for backward compat with surveyor import)
@@ -45,30 +63,95 @@ CARGO_VALUE = {
 MAX_CHAIN_VARIANTS_PER_ROOT = 24
 # Keep nearest suppliers per OR alternative to avoid map-wide explosion.
 MAX_OR_SUPPLIERS_PER_ALTERNATIVE = 1
+# Suppliers referenced per (consumer, input cargo), nearest first. Chain
+# flattening only uses the closest, so a handful is plenty (None = all).
+SUPPLIER_NEAREST_K = 5
+# Ignore suppliers farther than this many metres (None = unbounded).
+SUPPLIER_RADIUS: Optional[float] = None
+# Longest multi-stop truck loop to search for (CycleEngine prunes by ratio).
+# Search cost grows ~6x per extra stop; 5-6 stops are opt-in per builder.
+MULTI_STOP_MAX_STOPS = 4
+# Industries per query_industry_recipes request (keeps responses bounded).
+RECIPE_QUERY_CHUNK = 200
+# Recipe-detail fields fixed for an industry's lifetime; only these are
+# cached. items_produced/items_consumed change as the game runs.
+INDUSTRY_DETAIL_STATIC_KEYS = ("industry_id", "name", "file_name", "type", "ai_params")
+# Industry fields that shape the supply graph. Only these are fingerprinted;
+# live production_amount is refreshed into reused nodes instead.
+INDUSTRY_FINGERPRINT_KEYS = (
+    "id", "type", "file_name", "x", "y", "z",
+    "outputs", "input_templates", "output_source", "input_source",
+)
+# Only industry constructions carry production recipes worth pre-indexing.
+INDEX_PREFIX = "industry/"
+# Below this many files a process pool costs more than it saves.
+INDEX_MIN_PARALLEL_FILES = 32
+# Parallel edge/chain extraction (opt-in) only pays off on larger maps.
+EXTRACT_MIN_PARALLEL_TOWNS = 8
+# Last build, persisted so fresh processes (agent_helper run-cycle) start warm.
+DEFAULT_SNAPSHOT_FILE = Path(__file__).parent / "memory" / "dag_snapshot.pkl"
+# Bump whenever the build state or result layout changes.
+SNAPSHOT_VERSION = 2
 
 
 class DAGBuilder:
-    def __init__(self, strict_recipes: bool = True):
+    def __init__(self, strict_recipes: bool = True,
+                 catalog_path: Optional[Path] = DEFAULT_CATALOG_FILE,
+                 supplier_k: Optional[int] = SUPPLIER_NEAREST_K,
+                 supplier_radius: Optional[float] = SUPPLIER_RADIUS,
+                 extract_workers: Optional[int] = None,
+                 snapshot_path: Optional[Path] = DEFAULT_SNAPSHOT_FILE,
+                 multi_stop_max_stops: int = MULTI_STOP_MAX_STOPS):
         self.ipc = get_ipc()
         self.strict_recipes = strict_recipes
+        self.supplier_k = supplier_k
+        self.supplier_radius = supplier_radius
+        # >1 shards edge/chain extraction across towns in a process pool;
+        # output is identical to the serial walk.
+        self.extract_workers = extract_workers
+        self.multi_stop_max_stops = multi_stop_max_stops
         self.recipe_cache: Dict[str, Dict] = {}
+        # Parsed recipes persisted across processes and pre-filled by
+        # `dag_builder.py --index` (None = memory only)
+        self.recipe_catalog = RecipeCatalog(catalog_path) if catalog_path else None
+        self._base_zip: Optional[zipfile.ZipFile] = None
+        # Static recipe detail (INDUSTRY_DETAIL_STATIC_KEYS) per
+        # (industry_id, type); file names and construction params do not
+        # change during a game, so this survives across builds.
+        self.industry_detail_cache: Dict[Tuple[str, str], Dict] = {}
         self.base_zip_path, self.construction_roots = self._discover_con_paths()
         self.last_recipe_audit: Dict[str, Any] = {}
+        # Previous successful build, for incremental rebuilds.
+        self._last_build: Optional[Dict[str, Any]] = None
+        self.last_build_stats: Dict[str, Any] = {}
+        # On-disk copy of _last_build used by load_or_build() (None = off)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._snapshot_checked = False
 
     def build(self) -> Dict:
         """Build the complete supply chain DAG from live game data.
 
-        Returns a dict with both the raw supply tree AND legacy flat
+        Returns a dict with both the shared supply graph AND legacy flat
         chain format for backward compatibility.
+
+        Builds are incremental: the industry list and each town's parsed
+        demands are fingerprinted, and only what changed since the last
+        build is recomputed (an unchanged world returns the cached result
+        with fresh game state). `build_stats` in the result, also kept as
+        `last_build_stats`, reports what was reused.
         """
+        started = time.perf_counter()
         # 1. Get game state
         game_state_resp = self.ipc.send('query_game_state')
         game_state = game_state_resp.get('data', {}) if game_state_resp else {}
 
-        # 2. Build supply tree dynamically from live entities + parsed .con files
-        tree, recipe_audit = self._build_supply_tree()
+        # 2. Build the shared supply graph from live entities + parsed .con files
+        previous = self._last_build
+        graph, recipe_audit = self._build_supply_graph(previous)
         self.last_recipe_audit = recipe_audit
-        if not tree:
+        if self.recipe_catalog is not None:
+            self.recipe_catalog.save()
+        if not graph:
             return {"error": "Could not build supply tree", "recipe_audit": recipe_audit}
 
         unresolved_instances = recipe_audit.get("unresolved_instances", [])
@@ -81,27 +164,108 @@ class DAGBuilder:
                 ),
                 "recipe_audit": recipe_audit,
             }
-        towns_data = tree.get('towns', [])
-
-        # 3. Parse tree into legacy formats
-        town_demands = self._extract_town_demands(towns_data)
-        raw_producers, processors = self._extract_industries(towns_data)
-        edges = self._extract_edges(towns_data, town_demands)
-        chains = self._extract_chains(towns_data, town_demands)
-        multi_stop_candidates = self._discover_multi_stop_candidates(
-            edges=edges,
-            raw_producers=raw_producers,
-            processors=processors,
-            town_demands=town_demands,
-            max_stops=4,
-            min_loaded_distance_ratio=0.75,
-            max_leg_distance=10000.0,
-            top_k=30,
-        )
 
-        return {
+        fingerprints = graph['fingerprints']
+        stats: Dict[str, Any] = dict(graph['reuse'])
+        if previous is not None and previous['fingerprints'] == fingerprints:
+            result = dict(previous['result'])
+            result['game_state'] = game_state
+            result['recipe_audit'] = recipe_audit
+            # The shared nodes already hold this build's production amounts.
+            nodes = graph['nodes']
+            for key in ('raw_producers', 'processors'):
+                result[key] = [
+                    dict(info, production_amount=nodes[info['id']]['production_amount'])
+                    if info['id'] in nodes else info
+                    for info in result[key]
+                ]
+            stats.update({
+                'mode': 'cached',
+                'chain_towns_reused': len(previous['town_chains']),
+                'chain_towns_recomputed': 0,
+                'edges': 'reused',
+                'multi_stop': 'reused',
+            })
+            return self._finish_build(result, stats, started)
+
+        # 3. Walk the graph into legacy formats. With the same industries,
+        # nodes are shared with the last build, so its per-town chains and
+        # feeder variants stay valid for towns whose demands are unchanged.
+        same_industries = (
+            previous is not None
+            and previous['fingerprints']['industries'] == fingerprints['industries']
+        )
+        town_chains: Dict[str, List[Dict]] = {}
+        variant_memo: Dict[Tuple, List[Dict]] = {}
+        if same_industries:
+            prev_towns = previous['fingerprints']['towns']
+            town_chains = {
+                tid: town_list for tid, town_list in previous['town_chains'].items()
+                if prev_towns.get(tid) == fingerprints['towns'].get(tid)
+            }
+            variant_memo = previous['variant_memo']
+        chain_towns_reused = len(town_chains)
+
+        town_demands = self._extract_town_demands(graph['towns'])
+        raw_producers, processors = self._extract_industries(graph)
+        workers = min(self.extract_workers or 1, os.cpu_count() or 1)
+        if workers > 1 and len(graph['towns']) >= EXTRACT_MIN_PARALLEL_TOWNS:
+            edges, fresh_chains = self._extract_parallel(
+                graph, town_demands, workers,
+                chain_town_ids={t['id'] for t in graph['towns'] if t['id'] not in town_chains},
+            )
+            town_chains.update(fresh_chains)
+        else:
+            workers = 1
+            edges = self._extract_edges(graph, town_demands)
+        chains = self._extract_chains(
+            graph, town_demands, town_chains=town_chains, variant_memo=variant_memo,
+        )
+        stats['extract_workers'] = workers
+
+        # Loops only see edges and stop positions (not production amounts).
+        prev_result = previous['result'] if previous is not None else {}
+        if (
+            prev_result.get('edges') == edges
+            and self._without_production(prev_result.get('raw_producers')) == self._without_production(raw_producers)
+            and self._without_production(prev_result.get('processors')) == self._without_production(processors)
+            and prev_result.get('town_demands') == town_demands
+            and previous['fingerprints'].get('multi_stop') == fingerprints['multi_stop']
+        ):
+            multi_stop_candidates = prev_result['multi_stop_candidates']
+            stats['multi_stop'] = 'reused'
+        else:
+            multi_stop_candidates = self._discover_multi_stop_candidates(
+                edges=edges,
+                raw_producers=raw_producers,
+                processors=processors,
+                town_demands=town_demands,
+                geo=graph.get('geo'),
+                max_stops=self.multi_stop_max_stops,
+                min_loaded_distance_ratio=0.75,
+                max_leg_distance=10000.0,
+                top_k=30,
+            )
+            stats['multi_stop'] = 'recomputed'
+        graph_core = GraphCore.build(
+            raw_producers, processors, town_demands, edges, chains,
+            geo=graph.get('geo'),
+        )
+        stats.update({
+            'mode': 'incremental' if same_industries else 'full',
+            'chain_towns_reused': chain_towns_reused,
+            'chain_towns_recomputed': len(town_chains) - chain_towns_reused,
+            'edges': 'recomputed',
+        })
+
+        result = {
             'game_state': game_state,
-            'supply_tree': tree,  # New: raw tree data
+            # Shared DAG; use legacy_tree()/format_for_llm() for the nested view
+            'supply_graph': graph,
+            # Interned positions for vectorised distance queries downstream
+            'geo_index': graph.get('geo'),
+            # Typed, integer-indexed view of the lists below
+            'graph_core': graph_core,
             'raw_producers': raw_producers,
             'processors': processors,
             'unknown_types': [],
@@ -111,12 +275,136 @@ class DAGBuilder:
             'multi_stop_candidates': multi_stop_candidates,
             'recipe_audit': recipe_audit,
         }
+        self._last_build = {
+            'fingerprints': fingerprints,
+            'graph': graph,
+            'town_chains': town_chains,
+            'variant_memo': variant_memo,
+            'result': result,
+        }
+        return self._finish_build(result, stats, started)
+
+    def load_or_build(self) -> Dict:
+        """build(), warm-started from the on-disk snapshot in a fresh process.
+
+        The first call loads the snapshot (if its version matches) as the
+        previous build, so an unchanged world comes straight back from the
+        fingerprint check without re-deriving anything. A snapshot from a
+        later game year than the live game (another save) is discarded.
+        Every build that computed something is written back.
+        """
+        loaded_year = None
+        if not self._snapshot_checked:
+            self._snapshot_checked = True
+            if self._last_build is None:
+                loaded_year = self._load_snapshot()
+
+        dag = self.build()
+        if 'error' in dag:
+            return dag
+        if loaded_year is not None:
+            year = self._game_year(dag.get('game_state', {}))
+            if year is not None and year < loaded_year:
+                print(f"[dag_builder] Snapshot is from year {loaded_year}, game is at "
+                      f"{year}; rebuilding")
+                self._last_build = None
+                self.industry_detail_cache.clear()
+                dag = self.build()
+                if 'error' in dag:
+                    return dag
+        if dag['build_stats']['mode'] != 'cached':
+            self.save_snapshot(dag.get('game_state', {}))
+        return dag
+
+    def save_snapshot(self, game_state: Optional[Dict] = None) -> bool:
+        """Write the last build to `snapshot_path` (atomic replace).
+
+        Each writer pickles into its own temp file, so concurrent writers
+        (orchestrator, agent_helper run-cycle) never interleave; the last
+        os.replace wins with a complete snapshot.
+        """
+        if self.snapshot_path is None or self._last_build is None:
+            return False
+        state = dict(self._last_build)
+        # Feeder variants are rebuilt on demand; keep the snapshot compact.
+        state['variant_memo'] = {}
+        payload = {
+            'version': SNAPSHOT_VERSION,
+            'fingerprints': state['fingerprints'],
+            'game_year': self._game_year(game_state or {}),
+            'saved_at': time.time(),
+            'state': state,
+            'industry_detail_cache': self.industry_detail_cache,
+        }
+        tmp_path = None
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=self.snapshot_path.parent,
+                prefix=self.snapshot_path.name + ".",
+                suffix=".tmp",
+                delete=False,
+            ) as f:
+                tmp_path = f.name
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, str(self.snapshot_path))
+        except OSError as e:
+            print(f"[dag_builder] Could not write snapshot {self.snapshot_path}: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return False
+        return True
+
+    def _load_snapshot(self) -> Optional[int]:
+        """Adopt a compatible snapshot as the previous build; returns its year."""
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:  # truncated/foreign pickle: just build cold
+            print(f"[dag_builder] Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return None
+        if not isinstance(payload, dict) or payload.get('version') != SNAPSHOT_VERSION:
+            return None
+        self._last_build = payload['state']
+        for key, detail in (payload.get('industry_detail_cache') or {}).items():
+            self.industry_detail_cache.setdefault(key, detail)
+        year = payload.get('game_year')
+        return year if year is not None else -1
+
+    @staticmethod
+    def _game_year(game_state: Dict) -> Optional[int]:
+        try:
+            return int(float(game_state.get('year')))
+        except (TypeError, ValueError):
+            return None
+
+    def _finish_build(self, result: Dict, stats: Dict[str, Any], started: float) -> Dict:
+        """Attach and log reuse statistics for one build()."""
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        self.last_build_stats = stats
+        result['build_stats'] = stats
+        print(
+            f"[dag_builder] build {stats['mode']}: "
+            f"towns {stats['towns_reused']} reused / {stats['towns_recomputed']} recomputed, "
+            f"nodes {stats['nodes_reused']} reused / {stats['nodes_built']} built, "
+            f"chains {stats['chain_towns_reused']} towns reused / "
+            f"{stats['chain_towns_recomputed']} recomputed, "
+            f"edges {stats['edges']}, multi-stop {stats['multi_stop']} "
+            f"({stats['seconds']}s)"
+        )
+        return result
 
     # ------------------------------------------------------------------
     # Dynamic supply tree construction
     # ------------------------------------------------------------------
 
-    def _discover_con_paths(self) -> Tuple[str, List[str]]:
+    @staticmethod
+    def _discover_con_paths() -> Tuple[str, List[str]]:
         """Discover base zip and mod construction roots."""
         home = os.path.expanduser("~")
 
@@ -177,9 +465,42 @@ class DAGBuilder:
         base_zip = os.path.join(game_root, "res", "construction", "construction.zip")
         return base_zip, roots
 
-    def _build_supply_tree(self) -> Tuple[Dict, Dict]:
+    def _build_supply_graph(self, previous: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+        """Build the shared supply DAG from live entities + parsed .con files.
+
+        Every industry instance becomes exactly one node whose input groups
+        reference supplier ids (with the supplier -> consumer distance)
+        instead of embedding copies of their subtrees, so construction is
+        linear in industries plus supplier edges. Supplier references come
+        from a per-cargo GridIndex (nearest `supplier_k` within
+        `supplier_radius`), and nodes are only built for industries reachable
+        from a town's direct producers. Supplier cycles are detected once via
+        SCCs (`cyclic`); walkers only track ancestors inside a node's own
+        SCC, which reproduces the old per-path `visited` semantics.
+
+        With `previous` (the last build's state) and an unchanged industry
+        fingerprint, nodes and the town entries of towns whose fingerprint
+        matches are reused; only new roots are expanded. The graph's
+        "fingerprints" and "reuse" keys record what happened.
+        """
         towns = self._query_town_demands()
         industries = self._query_industries_with_recipes()
+        fingerprints = {
+            "industries": self._fingerprint([
+                [{key: ind.get(key) for key in INDUSTRY_FINGERPRINT_KEYS} for ind in industries],
+                self.supplier_k,
+                self.supplier_radius,
+            ]),
+            "towns": {town["id"]: self._fingerprint(town) for town in towns},
+            "multi_stop": self.multi_stop_max_stops,
+        }
+        prev_graph = None
+        if previous is not None and (
+            previous["fingerprints"]["industries"] == fingerprints["industries"]
+        ):
+            prev_graph = previous["graph"]
+        reuse = {"towns_reused": 0, "towns_recomputed": 0,
+                 "nodes_reused": 0, "nodes_built": 0}
 
         unresolved_instances = []
         for inst in industries:
@@ -205,39 +526,46 @@ class DAGBuilder:
             "resolved_instances": len(industries) - len(unresolved_instances),
         }
 
+        geo = GeoIndex.from_entities(industries, towns)
         if not towns:
-            return {"towns": []}, audit
+            return {"towns": [], "nodes": {}, "cyclic": {}, "geo": geo,
+                    "fingerprints": fingerprints, "reuse": reuse}, audit
 
         instances_by_cargo: Dict[str, List[Dict]] = {}
         for inst in industries:
             for cargo in inst.get("outputs", []):
                 instances_by_cargo.setdefault(cargo, []).append(inst)
+        instances_by_id = {inst["id"]: inst for inst in industries}
+
+        prev_entries: Dict[str, Dict] = {}
+        if prev_graph is not None:
+            prev_town_fps = previous["fingerprints"]["towns"]
+            prev_entries = {
+                town["id"]: town for town in prev_graph["towns"]
+                if prev_town_fps.get(town["id"]) == fingerprints["towns"].get(town["id"])
+            }
 
-        town_trees = []
+        town_entries = []
         for town in towns:
-            supply_trees = {}
-            for cargo, demand in town.get("demands", {}).items():
-                roots = []
-                for producer in instances_by_cargo.get(cargo, []):
-                    node = self._build_supplier_node(
-                        instance=producer,
-                        target_x=town["x"],
-                        target_y=town["y"],
-                        instances_by_cargo=instances_by_cargo,
-                        visited=set(),
-                        depth=0,
-                    )
-                    if node:
-                        node["distance_to_town"] = str(
-                            round(self._distance_xy(producer["x"], producer["y"], town["x"], town["y"]))
-                        )
-                        roots.append(node)
-
-                roots.sort(key=lambda n: int(n.get("distance_to_town", "999999")))
-                if roots:
-                    supply_trees[cargo] = roots
-
-            town_trees.append(
+            entry = prev_entries.get(town["id"])
+            if entry is not None:
+                town_entries.append(entry)
+                reuse["towns_reused"] += 1
+                continue
+            reuse["towns_recomputed"] += 1
+            roots: Dict[str, List[Dict]] = {}
+            for cargo in town.get("demands", {}):
+                producer_ids = [p["id"] for p in instances_by_cargo.get(cargo, [])]
+                distances = geo.one_to_many(town["id"], producer_ids).tolist()
+                refs = [
+                    {"id": pid, "distance": round(dist)}
+                    for pid, dist in zip(producer_ids, distances)
+                ]
+                refs.sort(key=lambda r: r["distance"])
+                if refs:
+                    roots[cargo] = refs
+
+            town_entries.append(
                 {
                     "id": town["id"],
                     "name": town["name"],
@@ -245,12 +573,68 @@ class DAGBuilder:
                     "y": str(round(town["y"])),
                     "z": str(round(town.get("z", 0.0))),
                     "demands": {k: str(v) for k, v in town.get("demands", {}).items()},
-                    "supply_trees": supply_trees,
+                    "roots": roots,
                 }
             )
 
-        town_trees.sort(key=lambda t: t["name"])
-        return {"towns": town_trees}, audit
+        town_entries.sort(key=lambda t: t["name"])
+
+        # Expand lazily from the town roots: only industries that some
+        # consumer actually references become nodes. Nodes depend on the
+        # industry list alone, so an unchanged list lends its nodes.
+        known: Dict[str, Dict] = prev_graph["nodes"] if prev_graph is not None else {}
+        supplier_index: Optional[Dict[str, GridIndex]] = None
+        nodes: Dict[str, Dict] = {}
+        pending = [
+            ref["id"]
+            for town in town_entries
+            for refs in town["roots"].values()
+            for ref in refs
+        ]
+        while pending:
+            node_id = pending.pop()
+            if node_id in nodes:
+                continue
+            node = known.get(node_id)
+            if node is not None:
+                reuse["nodes_reused"] += 1
+            else:
+                if supplier_index is None:
+                    supplier_index = {
+                        cargo: GridIndex([(p["id"], p["x"], p["y"]) for p in producers])
+                        for cargo, producers in instances_by_cargo.items()
+                    }
+                node = self._build_graph_node(instances_by_id[node_id], supplier_index)
+                reuse["nodes_built"] += 1
+            nodes[node_id] = node
+            # Reused nodes carry last build's live amount; refresh it.
+            node["production_amount"] = instances_by_id[node_id].get("production_amount", "0")
+            for group in node["input_groups"]:
+                for _, ref in self._group_supplier_refs(group):
+                    if ref["id"] not in nodes:
+                        pending.append(ref["id"])
+
+        graph = {
+            "towns": town_entries,
+            "nodes": nodes,
+            "cyclic": self._supplier_sccs(nodes),
+            "geo": geo,
+            "fingerprints": fingerprints,
+            "reuse": reuse,
+        }
+        return graph, audit
+
+    @staticmethod
+    def _without_production(items: Optional[List[Dict]]) -> Optional[List[Dict]]:
+        if items is None:
+            return None
+        return [{k: v for k, v in item.items() if k != 'production_amount'} for item in items]
+
+    @staticmethod
+    def _fingerprint(value: Any) -> str:
+        """Stable digest of parsed game data (same across processes)."""
+        payload = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
     def _query_town_demands(self) -> List[Dict]:
         resp = self.ipc.send("query_town_demands")
@@ -295,11 +679,13 @@ class DAGBuilder:
         if not resp or resp.get("status") != "ok":
             return []
 
+        raw_industries = resp.get("data", {}).get("industries", [])
+        details = self._fetch_industry_details(raw_industries)
+
         industries = []
-        for ind in resp.get("data", {}).get("industries", []):
+        for ind in raw_industries:
             ind_id = str(ind.get("id", ""))
-            detail_resp = self.ipc.send("query_industry_recipe", {"industry_id": ind_id})
-            detail = detail_resp.get("data", {}) if detail_resp and detail_resp.get("status") == "ok" else {}
+            detail = details.get(ind_id, {})
 
             file_name = detail.get("file_name") or f"industry/{ind.get('type', '')}.con"
             recipe = self._get_recipe(file_name)
@@ -348,6 +734,61 @@ class DAGBuilder:
 
         return industries
 
+    def _fetch_industry_details(self, raw_industries: List[Dict]) -> Dict[str, Dict]:
+        """Recipe detail per industry id.
+
+        Every industry is queried on every build, so the live
+        items_produced/items_consumed tables are always current: with the
+        bulk query_industry_recipes command (one request per
+        RECIPE_QUERY_CHUNK ids), or on mod builds without it with
+        query_industry_recipe for each id in one send_batch exchange.
+        Only the static fields are cached; an industry whose query fails
+        falls back to its cached static detail.
+        """
+        types_by_id = {str(ind.get("id", "")): str(ind.get("type", "")) for ind in raw_industries}
+        ids = [ind_id for ind_id in types_by_id if ind_id]
+        fetched: Dict[str, Dict] = {}
+        bulk_supported = True
+        for i in range(0, len(ids), RECIPE_QUERY_CHUNK):
+            chunk = ids[i:i + RECIPE_QUERY_CHUNK]
+            resp = self.ipc.send(
+                "query_industry_recipes",
+                {"industry_ids": ",".join(chunk)},
+                timeout=60.0,
+            )
+            if resp and resp.get("status") == "ok":
+                for detail in resp.get("data", {}).get("recipes", []) or []:
+                    if isinstance(detail, dict):
+                        fetched[str(detail.get("industry_id", ""))] = detail
+            elif resp and "Unknown command" in str(resp.get("message", "")):
+                bulk_supported = False
+                break
+
+        if not bulk_supported:
+            fetched = {}
+            responses = self.ipc.send_batch(
+                [("query_industry_recipe", {"industry_id": ind_id}) for ind_id in ids]
+            ) if ids else []
+            for ind_id, detail_resp in zip(ids, responses):
+                if detail_resp and detail_resp.get("status") == "ok":
+                    fetched[ind_id] = detail_resp.get("data", {}) or {}
+
+        details: Dict[str, Dict] = {}
+        for ind_id in ids:
+            key = (ind_id, types_by_id[ind_id])
+            detail = fetched.get(ind_id)
+            if detail is None:
+                cached = self.industry_detail_cache.get(key)
+                if cached is not None:
+                    details[ind_id] = cached
+                continue
+            details[ind_id] = detail
+            self.industry_detail_cache[key] = {
+                k: detail[k] for k in INDUSTRY_DETAIL_STATIC_KEYS if k in detail
+            }
+
+        return details
+
     def _first_production_value(self, produced: Dict) -> str:
         for _, val in produced.items():
             try:
@@ -423,82 +864,228 @@ class DAGBuilder:
 
         return templates
 
-    def _build_supplier_node(
-        self,
-        instance: Dict,
-        target_x: float,
-        target_y: float,
-        instances_by_cargo: Dict[str, List[Dict]],
-        visited: set,
-        depth: int,
-    ) -> Optional[Dict]:
-        if depth > 10:
-            return None
-        if instance["id"] in visited:
-            return None
+    def _build_graph_node(self, instance: Dict, supplier_index: Dict[str, GridIndex]) -> Dict:
+        """One shared DAG node; suppliers are {"id", "distance"} references.
+
+        Only the `supplier_k` nearest producers within `supplier_radius` are
+        referenced, nearest first.
+        """
 
-        visited.add(instance["id"])
-        distance = round(self._distance_xy(instance["x"], instance["y"], target_x, target_y))
+        def supplier_refs(cargo: str) -> List[Dict]:
+            index = supplier_index.get(cargo)
+            if index is None:
+                return []
+            hits = index.nearest(
+                instance["x"],
+                instance["y"],
+                k=self.supplier_k,
+                radius=self.supplier_radius,
+                exclude=instance["id"],
+            )
+            return [{"id": pid, "distance": round(dist)} for pid, dist in hits]
 
         input_groups = []
         for template in instance.get("input_templates", []):
             if template.get("type") == "and":
                 cargo = template.get("cargo", "")
-                suppliers = []
-                for producer in instances_by_cargo.get(cargo, []):
-                    if producer["id"] in visited:
-                        continue
-                    sub = self._build_supplier_node(
-                        producer, instance["x"], instance["y"], instances_by_cargo, visited, depth + 1
-                    )
-                    if sub:
-                        suppliers.append(sub)
                 input_groups.append(
                     {
                         "type": "and",
                         "cargo": cargo,
                         "sources_count": str(template.get("sources_count", 1)),
-                        "suppliers": suppliers,
+                        "suppliers": supplier_refs(cargo),
                     }
                 )
             elif template.get("type") == "or":
                 alts = template.get("alternatives", [])
-                suppliers_map = {}
-                for cargo in alts:
-                    cargo_suppliers = []
-                    for producer in instances_by_cargo.get(cargo, []):
-                        if producer["id"] in visited:
-                            continue
-                        sub = self._build_supplier_node(
-                            producer, instance["x"], instance["y"], instances_by_cargo, visited, depth + 1
-                        )
-                        if sub:
-                            cargo_suppliers.append(sub)
-                    suppliers_map[cargo] = cargo_suppliers
                 input_groups.append(
                     {
                         "type": "or",
                         "alternatives": alts,
-                        "suppliers": suppliers_map,
+                        "suppliers": {cargo: supplier_refs(cargo) for cargo in alts},
                     }
                 )
 
-        node = {
+        return {
             "producer_id": instance["id"],
             "producer_name": instance["name"],
             "producer_type": instance["type"],
             "x": str(round(instance["x"])),
             "y": str(round(instance["y"])),
             "z": str(round(instance.get("z", 0.0))),
-            "distance": str(distance),
             "outputs": instance.get("outputs", []),
             "production_amount": instance.get("production_amount", "0"),
             "input_groups": input_groups,
             "is_raw": "true" if not input_groups else "false",
         }
 
-        visited.remove(instance["id"])
-        return node
+    @staticmethod
+    def _group_supplier_refs(group: Dict) -> List[Tuple[str, Dict]]:
+        """(cargo, ref) pairs for an input group, in declaration order."""
+        if group.get("type") == "or":
+            suppliers_map = group.get("suppliers", {})
+            return [
+                (cargo, ref)
+                for cargo, refs in suppliers_map.items()
+                if isinstance(refs, list)
+                for ref in refs
+            ]
+        cargo = group.get("cargo", "")
+        return [(cargo, ref) for ref in group.get("suppliers", [])]
+
+    @classmethod
+    def _supplier_sccs(cls, nodes: Dict[str, Dict]) -> Dict[str, int]:
+        """Map node id -> SCC index for nodes that sit on a supplier cycle.
+
+        Iterative Tarjan over consumer -> supplier edges; nodes outside any
+        cycle are omitted, so an empty dict means the graph is acyclic.
+        """
+        adjacency: Dict[str, List[str]] = {}
+        for node_id, node in nodes.items():
+            seen = set()
+            out = []
+            for group in node.get("input_groups", []):
+                for _, ref in cls._group_supplier_refs(group):
+                    sid = ref["id"]
+                    if sid in nodes and sid not in seen:
+                        seen.add(sid)
+                        out.append(sid)
+            adjacency[node_id] = out
+
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack = set()
+        scc_of: Dict[str, int] = {}
+        scc_count = 0
+        counter = 0
+
+        for start in nodes:
+            if start in index:
+                continue
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            work = [(start, iter(adjacency[start]))]
+            while work:
+                v, children = work[-1]
+                descended = False
+                for w in children:
+                    if w not in index:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack.add(w)
+                        work.append((w, iter(adjacency[w])))
+                        descended = True
+                        break
+                    if w in on_stack:
+                        low[v] = min(low[v], index[w])
+                if descended:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        members.append(w)
+                        if w == v:
+                            break
+                    if len(members) > 1:
+                        for m in members:
+                            scc_of[m] = scc_count
+                        scc_count += 1
+
+        return scc_of
+
+    @staticmethod
+    def _cycle_context(graph: Dict, node_id: str, path: frozenset) -> frozenset:
+        """Ancestors that can affect `node_id`'s expansion (same SCC only).
+
+        An ancestor outside the node's SCC is unreachable from it, so the
+        expansion of a node depends only on (node_id, context).
+        """
+        scc = graph["cyclic"].get(node_id)
+        if scc is None or not path:
+            return frozenset()
+        return frozenset(p for p in path if graph["cyclic"].get(p) == scc)
+
+    @staticmethod
+    def _child_path(graph: Dict, node_id: str, context: frozenset) -> frozenset:
+        """Suppliers excluded while expanding `node_id`: itself + cyclic ancestors."""
+        if node_id not in graph["cyclic"]:
+            return frozenset()
+        return context | {node_id}
+
+    def legacy_tree(self, graph: Dict) -> Dict:
+        """Materialise the old nested per-town tree from the shared graph."""
+        return {"towns": [self._legacy_town(graph, town) for town in graph.get("towns", [])]}
+
+    def _legacy_town(self, graph: Dict, town: Dict) -> Dict:
+        supply_trees = {}
+        for cargo, refs in town.get("roots", {}).items():
+            roots = []
+            for ref in refs:
+                node = self._legacy_node(graph, ref["id"], ref["distance"], frozenset())
+                node["distance_to_town"] = str(ref["distance"])
+                roots.append(node)
+            supply_trees[cargo] = roots
+        out = {k: v for k, v in town.items() if k != "roots"}
+        out["supply_trees"] = supply_trees
+        return out
+
+    def _legacy_node(self, graph: Dict, node_id: str, distance: int, path: frozenset) -> Dict:
+        node = graph["nodes"][node_id]
+        child_path = self._child_path(graph, node_id, self._cycle_context(graph, node_id, path))
+
+        def expand(refs: List[Dict]) -> List[Dict]:
+            return [
+                self._legacy_node(graph, ref["id"], ref["distance"], child_path)
+                for ref in refs
+                if ref["id"] not in child_path
+            ]
+
+        input_groups = []
+        for group in node.get("input_groups", []):
+            if group.get("type") == "and":
+                input_groups.append(
+                    {
+                        "type": "and",
+                        "cargo": group.get("cargo", ""),
+                        "sources_count": group.get("sources_count", "1"),
+                        "suppliers": expand(group.get("suppliers", [])),
+                    }
+                )
+            elif group.get("type") == "or":
+                input_groups.append(
+                    {
+                        "type": "or",
+                        "alternatives": group.get("alternatives", []),
+                        "suppliers": {
+                            cargo: expand(refs)
+                            for cargo, refs in group.get("suppliers", {}).items()
+                        },
+                    }
+                )
+
+        return {
+            "producer_id": node["producer_id"],
+            "producer_name": node["producer_name"],
+            "producer_type": node["producer_type"],
+            "x": node["x"],
+            "y": node["y"],
+            "z": node["z"],
+            "distance": str(distance),
+            "outputs": node["outputs"],
+            "production_amount": node["production_amount"],
+            "input_groups": input_groups,
+            "is_raw": node["is_raw"],
+        }
 
     def _get_recipe(self, file_name: str) -> Dict:
         if file_name in self.recipe_cache:
@@ -509,66 +1096,128 @@ class DAGBuilder:
             "input_rows": [],
         }
 
-        text = self._read_con_text(file_name)
-        if text:
-            stocks, input_rows, outputs = self._parse_con_recipe(text)
-            parsed_rows = []
-            for row in input_rows:
-                mapped = {}
-                for idx, amount in enumerate(row):
-                    if idx >= len(stocks):
-                        continue
-                    if amount > 0:
-                        mapped[stocks[idx]] = int(amount)
-                if mapped:
-                    parsed_rows.append(mapped)
-
-            recipe["outputs"] = outputs
-            recipe["input_rows"] = parsed_rows
+        rel = self._con_rel_path(file_name)
+        source = self._locate_con(rel)
+        if source:
+            source_key, kind, location = source
+            cached = None
+            if self.recipe_catalog is not None:
+                cached = self.recipe_catalog.lookup(rel, source_key)
+            if cached is not None:
+                recipe = cached
+            else:
+                text = self._read_con_source(kind, location)
+                if text:
+                    recipe = self._recipe_from_text(text)
+                    if self.recipe_catalog is not None:
+                        self.recipe_catalog.store(rel, source_key, recipe)
 
         self.recipe_cache[file_name] = recipe
         return recipe
 
-    def _read_con_text(self, file_name: str) -> Optional[str]:
+    @classmethod
+    def _recipe_from_text(cls, text: str) -> Dict:
+        stocks, input_rows, outputs = cls._parse_con_recipe(text)
+        parsed_rows = []
+        for row in input_rows:
+            mapped = {}
+            for idx, amount in enumerate(row):
+                if idx >= len(stocks):
+                    continue
+                if amount > 0:
+                    mapped[stocks[idx]] = int(amount)
+            if mapped:
+                parsed_rows.append(mapped)
+        return {"outputs": outputs, "input_rows": parsed_rows}
+
+    @staticmethod
+    def _con_rel_path(file_name: str) -> str:
         rel = file_name
         if rel.startswith("construction/"):
             rel = rel[len("construction/"):]
+        return rel
+
+    def _locate_con(self, rel: str) -> Optional[Tuple[str, str, str]]:
+        """Find the `.con` that wins resolution without reading it.
 
+        Returns (source_key, kind, location) where kind is "file" (location
+        is a path) or "zip" (location is the member name), or None.
+        """
         for root in self.construction_roots:
             path = os.path.join(root, rel)
-            if os.path.isfile(path):
-                try:
-                    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                        return f.read()
-                except OSError:
-                    continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+            return f"file:{path}:{st.st_size}:{st.st_mtime_ns}", "file", path
+
+        if self.base_zip_path:
+            if self.recipe_catalog is not None:
+                members = self.recipe_catalog.zip_members(self.base_zip_path)
+            else:
+                members = self._zip_members_uncached()
+            crc = members.get(rel)
+            if crc is not None:
+                return f"zip:{self.base_zip_path}:{crc}", "zip", rel
 
-        if self.base_zip_path and os.path.isfile(self.base_zip_path):
+        return None
+
+    def _zip_members_uncached(self) -> Dict[str, int]:
+        zf = self._open_base_zip()
+        if zf is None:
+            return {}
+        return {info.filename: info.CRC for info in zf.infolist()}
+
+    def _open_base_zip(self) -> Optional[zipfile.ZipFile]:
+        """Open the base construction zip once per builder."""
+        if self._base_zip is None and self.base_zip_path and os.path.isfile(self.base_zip_path):
             try:
-                with zipfile.ZipFile(self.base_zip_path, "r") as zf:
-                    if rel in zf.namelist():
-                        return zf.read(rel).decode("utf-8", errors="ignore")
+                self._base_zip = zipfile.ZipFile(self.base_zip_path, "r")
             except (OSError, zipfile.BadZipFile):
+                self._base_zip = None
+        return self._base_zip
+
+    def _read_con_source(self, kind: str, location: str) -> Optional[str]:
+        if kind == "file":
+            try:
+                with open(location, "r", encoding="utf-8", errors="ignore") as f:
+                    return f.read()
+            except OSError:
                 return None
+        zf = self._open_base_zip()
+        if zf is None:
+            return None
+        try:
+            return zf.read(location).decode("utf-8", errors="ignore")
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return None
 
-        return None
+    def _read_con_text(self, file_name: str) -> Optional[str]:
+        source = self._locate_con(self._con_rel_path(file_name))
+        if not source:
+            return None
+        _, kind, location = source
+        return self._read_con_source(kind, location)
 
-    def _parse_con_recipe(self, text: str) -> Tuple[List[str], List[List[int]], List[str]]:
+    @classmethod
+    def _parse_con_recipe(cls, text: str) -> Tuple[List[str], List[List[int]], List[str]]:
         stock_idx = text.find("stockListConfig")
         start = stock_idx if stock_idx >= 0 else 0
 
-        stocks_block, _ = self._extract_named_block(text, "stocks", start)
+        stocks_block, _ = cls._extract_named_block(text, "stocks", start)
         stocks = re.findall(r'"([A-Z_0-9]+)"', stocks_block) if stocks_block else []
 
-        rule_block, _ = self._extract_named_block(text, "rule", start)
+        rule_block, _ = cls._extract_named_block(text, "rule", start)
         input_rows: List[List[int]] = []
         outputs: List[str] = []
         if rule_block:
-            input_block, _ = self._extract_named_block(rule_block, "input", 0)
-            output_block, _ = self._extract_named_block(rule_block, "output", 0)
+            input_block, _ = cls._extract_named_block(rule_block, "input", 0)
+            output_block, _ = cls._extract_named_block(rule_block, "output", 0)
 
             if input_block is not None:
-                for row in self._extract_top_level_rows(input_block):
+                for row in cls._extract_top_level_rows(input_block):
                     nums = [int(n) for n in re.findall(r"-?\d+", row)]
                     if nums:
                         input_rows.append(nums)
@@ -578,14 +1227,16 @@ class DAGBuilder:
 
         return stocks, input_rows, outputs
 
-    def _extract_named_block(self, text: str, key: str, start: int) -> Tuple[Optional[str], int]:
+    @classmethod
+    def _extract_named_block(cls, text: str, key: str, start: int) -> Tuple[Optional[str], int]:
         m = re.search(rf"\b{re.escape(key)}\s*=\s*\{{", text[start:])
         if not m:
             return None, -1
         brace_start = start + m.end() - 1
-        return self._extract_brace_block(text, brace_start)
+        return cls._extract_brace_block(text, brace_start)
 
-    def _extract_brace_block(self, text: str, brace_start: int) -> Tuple[Optional[str], int]:
+    @staticmethod
+    def _extract_brace_block(text: str, brace_start: int) -> Tuple[Optional[str], int]:
         if brace_start < 0 or brace_start >= len(text) or text[brace_start] != "{":
             return None, -1
 
@@ -600,12 +1251,13 @@ class DAGBuilder:
                     return text[brace_start + 1:idx], idx + 1
         return None, -1
 
-    def _extract_top_level_rows(self, block: str) -> List[str]:
+    @classmethod
+    def _extract_top_level_rows(cls, block: str) -> List[str]:
         rows: List[str] = []
         i = 0
         while i < len(block):
             if block[i] == "{":
-                content, end = self._extract_brace_block(block, i)
+                content, end = cls._extract_brace_block(block, i)
                 if content is not None:
                     rows.append(content)
                     i = end
@@ -634,20 +1286,21 @@ class DAGBuilder:
                 }
         return result
 
-    def _extract_industries(self, towns: List[Dict]):
-        """Extract unique raw producers and processors from tree nodes."""
+    def _extract_industries(self, graph: Dict):
+        """Extract unique raw producers and processors reachable from towns."""
+        nodes = graph["nodes"]
         seen_ids = set()
         raw_producers = []
         processors = []
 
-        def walk_node(node):
-            pid = node.get('producer_id', '')
-            if pid in seen_ids:
+        def walk_node(node_id: str):
+            if node_id in seen_ids:
                 return
-            seen_ids.add(pid)
+            seen_ids.add(node_id)
+            node = nodes[node_id]
 
             info = {
-                'id': pid,
+                'id': node_id,
                 'name': node.get('producer_name', ''),
                 'type': node.get('producer_type', ''),
                 'x': node.get('x', '0'),
@@ -677,179 +1330,252 @@ class DAGBuilder:
 
             # Recurse into suppliers
             for group in node.get('input_groups', []):
-                if group.get('type') == 'or':
-                    suppliers_map = group.get('suppliers', {})
-                    for cargo_key, suppliers in suppliers_map.items():
-                        if isinstance(suppliers, list):
-                            for s in suppliers:
-                                walk_node(s)
-                elif group.get('type') == 'and':
-                    for s in group.get('suppliers', []):
-                        walk_node(s)
+                for _, ref in self._group_supplier_refs(group):
+                    walk_node(ref['id'])
 
-        for town in towns:
-            for cargo, trees in town.get('supply_trees', {}).items():
-                for tree_node in trees:
-                    walk_node(tree_node)
+        for town in graph.get('towns', []):
+            for refs in town.get('roots', {}).values():
+                for ref in refs:
+                    walk_node(ref['id'])
 
         return raw_producers, processors
 
-    def _extract_edges(self, towns: List[Dict], town_demands: Dict) -> List[Dict]:
-        """Extract edges from tree, producing legacy edge format."""
+    def _extract_edges(self, graph: Dict, town_demands: Dict) -> List[Dict]:
+        """Extract edges from the graph, producing legacy edge format.
+
+        Each (node, cycle context) is expanded once; revisits only add the
+        edge into the new consumer. Distances come from the graph's supplier
+        references rather than being recomputed from node coordinates.
+        """
+        edges = self._walk_town_edges(graph, graph.get('towns', []), town_demands)
+        edges.sort(key=lambda e: e['distance'])
+        return edges
+
+    def _walk_town_edges(self, graph: Dict, towns: List[Dict],
+                         town_demands: Dict) -> List[Dict]:
+        """Edges reachable from `towns`, deduplicated, in discovery order.
+
+        Walking a contiguous run of towns and then merging runs in town
+        order with `_merge_edge_runs` gives the same list as one walk over
+        all towns: subtrees skipped as already expanded only hold edges an
+        earlier town already emitted.
+        """
+        nodes = graph["nodes"]
         edges = []
         seen_edges = set()
-
-        def walk_edges(node, target_id, target_name, target_x, target_y,
-                       edge_type, cargo_delivered=None):
-            pid = node.get('producer_id', '')
-            px = float(node.get('x', 0))
-            py = float(node.get('y', 0))
-            tx = float(target_x)
-            ty = float(target_y)
-            dist = self._distance_xy(px, py, tx, ty)
-
-            # If cargo_delivered is specified, this is the edge cargo
-            if cargo_delivered:
-                edge_key = (pid, target_id, cargo_delivered)
-                if edge_key not in seen_edges:
-                    seen_edges.add(edge_key)
-                    edge = {
-                        'source_id': pid,
-                        'source_name': node.get('producer_name', ''),
-                        'target_id': target_id,
-                        'target_name': target_name,
-                        'cargo': cargo_delivered,
-                        'distance': round(dist),
-                        'type': edge_type,
-                    }
-                    if edge_type == 'processor_to_town':
-                        td = town_demands.get(target_id, {})
-                        edge['town_demand'] = td.get('demands', {}).get(
-                            cargo_delivered, 0)
-                    edges.append(edge)
+        expanded = set()
+
+        def walk_edges(node_id, path, target_id, target_name, distance,
+                       edge_type, cargo_delivered):
+            node = nodes[node_id]
+
+            edge_key = (node_id, target_id, cargo_delivered)
+            if edge_key not in seen_edges:
+                seen_edges.add(edge_key)
+                edge = {
+                    'source_id': node_id,
+                    'source_name': node.get('producer_name', ''),
+                    'target_id': target_id,
+                    'target_name': target_name,
+                    'cargo': cargo_delivered,
+                    'distance': distance,
+                    'type': edge_type,
+                }
+                if edge_type == 'processor_to_town':
+                    td = town_demands.get(target_id, {})
+                    edge['town_demand'] = td.get('demands', {}).get(
+                        cargo_delivered, 0)
+                edges.append(edge)
+
+            context = self._cycle_context(graph, node_id, path)
+            if (node_id, context) in expanded:
+                return
+            expanded.add((node_id, context))
+            child_path = self._child_path(graph, node_id, context)
 
             # Recurse into suppliers
             for group in node.get('input_groups', []):
-                if group.get('type') == 'or':
-                    suppliers_map = group.get('suppliers', {})
-                    for cargo_key, suppliers in suppliers_map.items():
-                        if isinstance(suppliers, list):
-                            for s in suppliers:
-                                s_type = ('raw_to_processor'
-                                          if s.get('is_raw') == 'true'
-                                          else 'processor_to_processor')
-                                walk_edges(s, pid, node.get('producer_name', ''),
-                                           px, py, s_type, cargo_key)
-                elif group.get('type') == 'and':
-                    cargo = group.get('cargo', '')
-                    for s in group.get('suppliers', []):
-                        s_type = ('raw_to_processor'
-                                  if s.get('is_raw') == 'true'
-                                  else 'processor_to_processor')
-                        walk_edges(s, pid, node.get('producer_name', ''),
-                                   px, py, s_type, cargo)
+                for cargo, ref in self._group_supplier_refs(group):
+                    sid = ref['id']
+                    if sid in child_path:
+                        continue
+                    s_type = ('raw_to_processor'
+                              if nodes[sid].get('is_raw') == 'true'
+                              else 'processor_to_processor')
+                    walk_edges(sid, child_path, node_id,
+                               node.get('producer_name', ''), ref['distance'],
+                               s_type, cargo)
 
         for town in towns:
             tid = town['id']
             tname = town.get('name', '')
-            tx = town.get('x', '0')
-            ty = town.get('y', '0')
-            for cargo, trees in town.get('supply_trees', {}).items():
-                for tree_node in trees:
-                    walk_edges(tree_node, tid, tname, tx, ty,
+            for cargo, refs in town.get('roots', {}).items():
+                for ref in refs:
+                    walk_edges(ref['id'], frozenset(), tid, tname, ref['distance'],
                                'processor_to_town', cargo)
 
-        edges.sort(key=lambda e: e['distance'])
         return edges
 
-    def _extract_chains(self, towns: List[Dict],
-                        town_demands: Dict) -> List[Dict]:
-        """Convert tree nodes into legacy flat chain format.
+    def _extract_parallel(self, graph: Dict, town_demands: Dict, workers: int,
+                          chain_town_ids: set) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Edges for all towns plus chains for `chain_town_ids`, across a pool.
 
-        Each tree node that produces a town-demanded cargo becomes a chain.
-        We flatten the tree into legs (edges) for backward compat.
+        Towns are split into `workers` contiguous shards; each worker gets
+        the graph once (pool initializer) and walks its shard like the
+        serial code. Edge runs are merged in shard order with the serial
+        dedup rule, so the result equals `_extract_edges` exactly.
         """
+        towns = graph['towns']
+        bounds = np.linspace(0, len(towns), workers + 1).round().astype(int).tolist()
+        shards = [
+            (lo, hi, [t['id'] for t in towns[lo:hi] if t['id'] in chain_town_ids])
+            for lo, hi in zip(bounds, bounds[1:])
+            if hi > lo
+        ]
+        payload = {
+            "towns": towns,
+            "nodes": graph["nodes"],
+            "cyclic": graph["cyclic"],
+        }
+        with ProcessPoolExecutor(
+            max_workers=len(shards),
+            initializer=_init_extract_worker,
+            initargs=(payload, town_demands),
+        ) as pool:
+            results = list(pool.map(_extract_town_shard, shards))
+
+        edges = self._merge_edge_runs([run for run, _ in results])
+        edges.sort(key=lambda e: e['distance'])
+        town_chains: Dict[str, List[Dict]] = {}
+        for _, shard_chains in results:
+            town_chains.update(shard_chains)
+        return edges, town_chains
+
+    @staticmethod
+    def _merge_edge_runs(runs: List[List[Dict]]) -> List[Dict]:
+        """Concatenate per-shard edge runs, keeping each edge key's first copy."""
+        merged = []
+        seen_edges = set()
+        for run in runs:
+            for edge in run:
+                edge_key = (edge['source_id'], edge['target_id'], edge['cargo'])
+                if edge_key in seen_edges:
+                    continue
+                seen_edges.add(edge_key)
+                merged.append(edge)
+        return merged
+
+    def _extract_chains(self, graph: Dict,
+                        town_demands: Dict,
+                        town_chains: Optional[Dict[str, List[Dict]]] = None,
+                        variant_memo: Optional[Dict[Tuple, List[Dict]]] = None) -> List[Dict]:
+        """Convert graph roots into legacy flat chain format.
+
+        Each producer of a town-demanded cargo becomes a chain. We flatten
+        its feeder subgraph into legs (edges) for backward compat; feeder
+        variants are memoised per node, so shared upstream industries are
+        expanded once per build.
+
+        `town_chains` maps town id -> that town's chains: entries present
+        are reused, missing ones are computed and stored.
+        """
+        if town_chains is None:
+            town_chains = {}
+        if variant_memo is None:
+            variant_memo = {}
         chains = []
 
-        for town in towns:
-            tid = town['id']
-            tname = town.get('name', '')
-            tx = float(town.get('x', 0))
-            ty = float(town.get('y', 0))
+        for town in graph.get('towns', []):
+            town_list = town_chains.get(town['id'])
+            if town_list is None:
+                town_list = self._extract_town_chains(graph, town, variant_memo)
+                town_chains[town['id']] = town_list
+            chains.extend(town_list)
 
-            for cargo, trees in town.get('supply_trees', {}).items():
-                demand_amount = int(town.get('demands', {}).get(cargo, 0))
-
-                for tree_node in trees:
-                    pid = tree_node.get('producer_id', '')
-                    pname = tree_node.get('producer_name', '')
-                    px = float(tree_node.get('x', 0))
-                    py = float(tree_node.get('y', 0))
-                    delivery_dist = round(self._distance_xy(px, py, tx, ty))
-
-                    # Delivery leg (processor -> town)
-                    delivery_leg = {
-                        'source_id': pid,
-                        'source_name': pname,
-                        'target_id': tid,
-                        'target_name': tname,
-                        'cargo': cargo,
-                        'distance': delivery_dist,
-                        'type': 'processor_to_town',
+        chains.sort(key=lambda c: c['score'], reverse=True)
+        return chains
+
+    def _extract_town_chains(self, graph: Dict, town: Dict,
+                             variant_memo: Dict[Tuple, List[Dict]]) -> List[Dict]:
+        """Chains ending at one town, in root order (unsorted)."""
+        nodes = graph["nodes"]
+        chains = []
+        tid = town['id']
+        tname = town.get('name', '')
+
+        for cargo, refs in town.get('roots', {}).items():
+            demand_amount = int(town.get('demands', {}).get(cargo, 0))
+
+            for ref in refs:
+                pid = ref['id']
+                tree_node = nodes[pid]
+                pname = tree_node.get('producer_name', '')
+                delivery_dist = ref['distance']
+
+                # Delivery leg (processor -> town)
+                delivery_leg = {
+                    'source_id': pid,
+                    'source_name': pname,
+                    'target_id': tid,
+                    'target_name': tname,
+                    'cargo': cargo,
+                    'distance': delivery_dist,
+                    'type': 'processor_to_town',
+                    'town_demand': demand_amount,
+                }
+                feeder_variants = self._flatten_feeder_variants(
+                    graph,
+                    pid,
+                    max_variants=MAX_CHAIN_VARIANTS_PER_ROOT,
+                    memo=variant_memo,
+                )
+                if not feeder_variants:
+                    feeder_variants = [self._empty_variant()]
+
+                seen_variant_keys = set()
+                for variant in feeder_variants:
+                    feeder_legs = list(variant.get("legs", []))
+                    legs = [delivery_leg] + feeder_legs
+                    missing_inputs = list(variant.get("missing_inputs", []))
+                    variant_key = self._chain_variant_key(legs, missing_inputs)
+                    if variant_key in seen_variant_keys:
+                        continue
+                    seen_variant_keys.add(variant_key)
+
+                    total_distance = delivery_dist + sum(
+                        max(0, int(float(l.get('distance', 0) or 0)))
+                        for l in feeder_legs
+                    )
+                    feasible = len(missing_inputs) == 0
+
+                    # Collect all industry IDs
+                    industry_ids = set()
+                    for leg in legs:
+                        industry_ids.add(str(leg['source_id']))
+                        if leg['type'] != 'processor_to_town':
+                            industry_ids.add(str(leg['target_id']))
+
+                    chain = {
+                        'final_cargo': cargo,
+                        'town': tname,
+                        'town_id': tid,
                         'town_demand': demand_amount,
+                        'processor': pname,
+                        'processor_id': pid,
+                        'processor_type': tree_node.get('producer_type', ''),
+                        'delivery_distance': delivery_dist,
+                        'legs': legs,
+                        'missing_inputs': missing_inputs,
+                        'feasible': feasible,
+                        'total_distance': total_distance,
+                        'industry_ids': list(industry_ids),
+                        # Shared graph groups: suppliers are id references
+                        'input_groups': tree_node.get('input_groups', []),
+                        'branch_choices': list(variant.get("branch_choices", [])),
                     }
-                    feeder_variants = self._flatten_feeder_variants(
-                        tree_node,
-                        max_variants=MAX_CHAIN_VARIANTS_PER_ROOT,
-                    )
-                    if not feeder_variants:
-                        feeder_variants = [{"legs": [], "missing_inputs": [], "branch_choices": []}]
-
-                    seen_variant_keys = set()
-                    for variant in feeder_variants:
-                        feeder_legs = list(variant.get("legs", []))
-                        legs = [delivery_leg] + feeder_legs
-                        missing_inputs = list(variant.get("missing_inputs", []))
-                        variant_key = self._chain_variant_key(legs, missing_inputs)
-                        if variant_key in seen_variant_keys:
-                            continue
-                        seen_variant_keys.add(variant_key)
-
-                        total_distance = delivery_dist + sum(
-                            max(0, int(float(l.get('distance', 0) or 0)))
-                            for l in feeder_legs
-                        )
-                        feasible = len(missing_inputs) == 0
-
-                        # Collect all industry IDs
-                        industry_ids = set()
-                        for leg in legs:
-                            industry_ids.add(str(leg['source_id']))
-                            if leg['type'] != 'processor_to_town':
-                                industry_ids.add(str(leg['target_id']))
-
-                        chain = {
-                            'final_cargo': cargo,
-                            'town': tname,
-                            'town_id': tid,
-                            'town_demand': demand_amount,
-                            'processor': pname,
-                            'processor_id': pid,
-                            'processor_type': tree_node.get('producer_type', ''),
-                            'delivery_distance': delivery_dist,
-                            'legs': legs,
-                            'missing_inputs': missing_inputs,
-                            'feasible': feasible,
-                            'total_distance': total_distance,
-                            'industry_ids': list(industry_ids),
-                            # New fields from tree
-                            'input_groups': tree_node.get('input_groups', []),
-                            'branch_choices': list(variant.get("branch_choices", [])),
-                        }
-                        chain['score'] = self._score_chain(chain)
-                        chains.append(chain)
+                    chain['score'] = self._score_chain(chain)
+                    chains.append(chain)
 
-        chains.sort(key=lambda c: c['score'], reverse=True)
         return chains
 
     @staticmethod
@@ -872,133 +1598,136 @@ class DAGBuilder:
 
     def _flatten_feeder_variants(
         self,
-        node: Dict,
-        visited: Optional[set] = None,
+        graph: Dict,
+        node_id: str,
+        path: frozenset = frozenset(),
         max_variants: int = MAX_CHAIN_VARIANTS_PER_ROOT,
+        memo: Optional[Dict[Tuple, List[Dict]]] = None,
     ) -> List[Dict]:
-        """Expand feeder trees into variant chains, including all OR branches."""
-        if visited is None:
-            visited = set()
-
-        producer_id = str(node.get("producer_id", ""))
-        if producer_id and producer_id in visited:
-            return [{"legs": [], "missing_inputs": [f"CYCLE:{producer_id}"], "branch_choices": []}]
-
-        next_visited = set(visited)
-        if producer_id:
-            next_visited.add(producer_id)
+        """Expand a node's feeder subgraph into variant chains, including all OR branches.
 
+        Returns at most `max_variants` variants, best first by
+        (missing_count, total_distance, leg_count); each carries that tuple
+        as "cost". `path` holds excluded cyclic ancestors. Results are
+        memoised per (node, cycle context) in `memo` and must be treated as
+        read-only.
+        """
+        if memo is None:
+            memo = {}
+        context = self._cycle_context(graph, node_id, path)
+        memo_key = (node_id, context, max_variants)
+        cached = memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        node = graph["nodes"][node_id]
         if node.get('is_raw') == 'true':
-            return [{"legs": [], "missing_inputs": [], "branch_choices": []}]
-
-        input_groups = node.get('input_groups', [])
-        if not input_groups:
+            variants = [self._empty_variant()]
+        elif not node.get('input_groups'):
             unresolved = f"UNRESOLVED_RECIPE:{node.get('producer_type', 'unknown')}"
-            return [{"legs": [], "missing_inputs": [unresolved], "branch_choices": []}]
-
-        variants = [{"legs": [], "missing_inputs": [], "branch_choices": []}]
-        for group in input_groups:
-            group_variants = self._expand_input_group_variants(
-                node,
-                group,
-                visited=next_visited,
-                max_variants=max_variants,
-            )
-            variants = self._combine_variant_lists(
-                variants,
-                group_variants,
-                max_variants=max_variants,
-            )
-            if not variants:
-                break
-        return self._prune_variants(variants, max_variants=max_variants)
+            variants = [self._empty_variant([unresolved])]
+        else:
+            child_path = self._child_path(graph, node_id, context)
+            variants = [self._empty_variant()]
+            for group in node['input_groups']:
+                group_variants = self._expand_input_group_variants(
+                    graph,
+                    node,
+                    group,
+                    path=child_path,
+                    max_variants=max_variants,
+                    memo=memo,
+                )
+                variants = self._combine_variant_lists(
+                    variants,
+                    group_variants,
+                    max_variants=max_variants,
+                )
+                if not variants:
+                    break
+
+        memo[memo_key] = variants
+        return variants
 
     def _expand_input_group_variants(
         self,
+        graph: Dict,
         node: Dict,
         group: Dict,
-        visited: set,
+        path: frozenset,
         max_variants: int,
+        memo: Dict[Tuple, List[Dict]],
     ) -> List[Dict]:
         gtype = str(group.get("type", "")).lower()
         node_id = str(node.get("producer_id", ""))
         node_name = str(node.get("producer_name", ""))
+        nodes = graph["nodes"]
 
         if gtype == "and":
             cargo = str(group.get("cargo", ""))
-            suppliers = group.get("suppliers", [])
+            suppliers = [r for r in group.get("suppliers", []) if r["id"] not in path]
             if not suppliers:
                 token = cargo if cargo else "MISSING_AND_INPUT"
-                return [{"legs": [], "missing_inputs": [token], "branch_choices": []}]
-            best = min(
-                suppliers,
-                key=lambda s: int(float(s.get("distance", 999999) or 999999)),
-            )
-            leg = self._supplier_leg(best, node, cargo)
+                return [self._empty_variant([token])]
+            best = min(suppliers, key=lambda r: r["distance"])
+            leg = self._supplier_leg(nodes[best["id"]], best["distance"], node, cargo)
             sub_variants = self._flatten_feeder_variants(
-                best,
-                visited=visited,
+                graph,
+                best["id"],
+                path=path,
                 max_variants=max_variants,
+                memo=memo,
             )
-            out = []
-            for sub in sub_variants:
-                out.append(
-                    {
-                        "legs": [leg] + list(sub.get("legs", [])),
-                        "missing_inputs": list(sub.get("missing_inputs", [])),
-                        "branch_choices": list(sub.get("branch_choices", [])),
-                    }
-                )
-            return self._prune_variants(out, max_variants=max_variants)
+            # Prefixing one leg shifts every cost equally: order and
+            # distinctness of the (already k-best) sub-variants carry over.
+            return [self._extend_variant(leg, sub) for sub in sub_variants]
 
         if gtype == "or":
             alternatives = [str(c) for c in group.get("alternatives", []) if str(c)]
             suppliers_map = group.get("suppliers", {})
-            out: List[Dict] = []
+            branches: List[List[Dict]] = []
 
             for alt_cargo in alternatives:
-                alt_suppliers = suppliers_map.get(alt_cargo, [])
-                if not isinstance(alt_suppliers, list) or not alt_suppliers:
+                alt_suppliers = [
+                    r for r in suppliers_map.get(alt_cargo, []) or []
+                    if r["id"] not in path
+                ]
+                if not alt_suppliers:
                     continue
-                ordered = sorted(
-                    alt_suppliers,
-                    key=lambda s: int(float(s.get("distance", 999999) or 999999)),
-                )
-                for supplier in ordered[:max(1, MAX_OR_SUPPLIERS_PER_ALTERNATIVE)]:
-                    leg = self._supplier_leg(supplier, node, alt_cargo)
+                ordered = sorted(alt_suppliers, key=lambda r: r["distance"])
+                for ref in ordered[:max(1, MAX_OR_SUPPLIERS_PER_ALTERNATIVE)]:
+                    supplier = nodes[ref["id"]]
+                    leg = self._supplier_leg(supplier, ref["distance"], node, alt_cargo)
+                    choice = {
+                        "group": "or",
+                        "node_id": node_id,
+                        "node_name": node_name,
+                        "selected_cargo": alt_cargo,
+                        "supplier_id": str(supplier.get("producer_id", "")),
+                        "supplier_name": str(supplier.get("producer_name", "")),
+                    }
                     sub_variants = self._flatten_feeder_variants(
-                        supplier,
-                        visited=visited,
+                        graph,
+                        ref["id"],
+                        path=path,
                         max_variants=max_variants,
+                        memo=memo,
+                    )
+                    branches.append(
+                        [self._extend_variant(leg, sub, choice) for sub in sub_variants]
                     )
-                    for sub in sub_variants:
-                        branch_choices = list(sub.get("branch_choices", []))
-                        branch_choices.insert(
-                            0,
-                            {
-                                "group": "or",
-                                "node_id": node_id,
-                                "node_name": node_name,
-                                "selected_cargo": alt_cargo,
-                                "supplier_id": str(supplier.get("producer_id", "")),
-                                "supplier_name": str(supplier.get("producer_name", "")),
-                            },
-                        )
-                        out.append(
-                            {
-                                "legs": [leg] + list(sub.get("legs", [])),
-                                "missing_inputs": list(sub.get("missing_inputs", [])),
-                                "branch_choices": branch_choices,
-                            }
-                        )
-
-            if out:
-                return self._prune_variants(out, max_variants=max_variants)
+
+            if branches:
+                # Each branch is sorted: a k-way merge yields the k best overall.
+                return self._take_distinct(
+                    heapq.merge(*branches, key=self._variant_cost),
+                    max_variants,
+                )
 
             missing_token = "|".join(alternatives) if alternatives else "MISSING_OR_INPUT"
-            return [{"legs": [], "missing_inputs": [missing_token], "branch_choices": []}]
+            return [self._empty_variant([missing_token])]
 
-        return [{"legs": [], "missing_inputs": [f"UNSUPPORTED_GROUP:{gtype or '?'}"], "branch_choices": []}]
+        return [self._empty_variant([f"UNSUPPORTED_GROUP:{gtype or '?'}"])]
 
     def _combine_variant_lists(
         self,
@@ -1006,25 +1735,119 @@ class DAGBuilder:
         right: List[Dict],
         max_variants: int,
     ) -> List[Dict]:
+        """k best left x right combinations without building the cross product.
+
+        With both inputs sorted by cost, pair (i, j) never costs less than
+        (i-1, j) or (i, j-1), so a frontier heap pops pairs in
+        (summed cost, i, j) order and stops after k distinct variants:
+        O(k log k) instead of |left| * |right|. Costs stop being additive
+        when both sides report the same missing token (it is merged, not
+        counted twice); that rare case falls back to the full product.
+        """
         if not left:
             return self._prune_variants(right, max_variants=max_variants)
         if not right:
             return self._prune_variants(left, max_variants=max_variants)
 
+        left = sorted(left, key=self._variant_cost)
+        right = sorted(right, key=self._variant_cost)
+        left_missing = {str(t) for v in left for t in v.get("missing_inputs", [])}
+        if any(str(t) in left_missing for v in right for t in v.get("missing_inputs", [])):
+            return self._prune_variants(
+                [self._join_variants(lvar, rvar) for lvar in left for rvar in right],
+                max_variants=max_variants,
+            )
+
+        left_costs = [self._variant_cost(v) for v in left]
+        right_costs = [self._variant_cost(v) for v in right]
+        limit = max(1, max_variants)
+
+        def pair_cost(i: int, j: int) -> Tuple[int, int, int]:
+            lc, rc = left_costs[i], right_costs[j]
+            return (lc[0] + rc[0], lc[1] + rc[1], lc[2] + rc[2])
+
+        frontier = [(pair_cost(0, 0), 0, 0)]
+        queued = {(0, 0)}
         combined: List[Dict] = []
-        for lvar in left:
-            for rvar in right:
-                combined.append(
-                    {
-                        "legs": list(lvar.get("legs", [])) + list(rvar.get("legs", [])),
-                        "missing_inputs": self._merge_missing_inputs(
-                            list(lvar.get("missing_inputs", [])),
-                            list(rvar.get("missing_inputs", [])),
-                        ),
-                        "branch_choices": list(lvar.get("branch_choices", [])) + list(rvar.get("branch_choices", [])),
-                    }
-                )
-        return self._prune_variants(combined, max_variants=max_variants)
+        seen_keys = set()
+        while frontier and len(combined) < limit:
+            _, i, j = heapq.heappop(frontier)
+            variant = self._join_variants(left[i], right[j])
+            key = self._variant_key(variant)
+            if key not in seen_keys:
+                seen_keys.add(key)
+                combined.append(variant)
+
+            for ni, nj in ((i + 1, j), (i, j + 1)):
+                if ni < len(left) and nj < len(right) and (ni, nj) not in queued:
+                    queued.add((ni, nj))
+                    heapq.heappush(frontier, (pair_cost(ni, nj), ni, nj))
+
+        return combined
+
+    @classmethod
+    def _join_variants(cls, lvar: Dict, rvar: Dict) -> Dict:
+        missing = cls._merge_missing_inputs(
+            list(lvar.get("missing_inputs", [])),
+            list(rvar.get("missing_inputs", [])),
+        )
+        lcost, rcost = cls._variant_cost(lvar), cls._variant_cost(rvar)
+        return {
+            "legs": list(lvar.get("legs", [])) + list(rvar.get("legs", [])),
+            "missing_inputs": missing,
+            "branch_choices": list(lvar.get("branch_choices", [])) + list(rvar.get("branch_choices", [])),
+            "cost": (len(missing), lcost[1] + rcost[1], lcost[2] + rcost[2]),
+        }
+
+    @staticmethod
+    def _empty_variant(missing_inputs: Optional[List[str]] = None) -> Dict:
+        missing = list(missing_inputs or [])
+        return {
+            "legs": [],
+            "missing_inputs": missing,
+            "branch_choices": [],
+            "cost": (len(missing), 0, 0),
+        }
+
+    @classmethod
+    def _extend_variant(cls, leg: Dict, sub: Dict, choice: Optional[Dict] = None) -> Dict:
+        """Prefix `leg` (and an OR choice) to a sub-variant, updating its cost."""
+        missing_count, distance, leg_count = cls._variant_cost(sub)
+        branch_choices = list(sub.get("branch_choices", []))
+        if choice is not None:
+            branch_choices.insert(0, choice)
+        return {
+            "legs": [leg] + list(sub.get("legs", [])),
+            "missing_inputs": list(sub.get("missing_inputs", [])),
+            "branch_choices": branch_choices,
+            "cost": (
+                missing_count,
+                distance + max(0, int(float(leg.get("distance", 0) or 0))),
+                leg_count + 1,
+            ),
+        }
+
+    @classmethod
+    def _variant_cost(cls, variant: Dict) -> Tuple[int, int, int]:
+        """Carried (missing_count, total_distance, leg_count), else computed."""
+        cost = variant.get("cost")
+        if cost is None:
+            cost = cls._variant_sort_key(variant)
+        return cost
+
+    def _take_distinct(self, ordered, max_variants: int) -> List[Dict]:
+        """First `max_variants` distinct variants from a cost-ordered iterable."""
+        out: List[Dict] = []
+        seen_keys = set()
+        for variant in ordered:
+            key = self._variant_key(variant)
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            out.append(variant)
+            if len(out) >= max(1, max_variants):
+                break
+        return out
 
     @staticmethod
     def _merge_missing_inputs(left: List[str], right: List[str]) -> List[str]:
@@ -1071,13 +1894,13 @@ class DAGBuilder:
         for variant in variants:
             key = self._variant_key(variant)
             existing = by_key.get(key)
-            if existing is None or self._variant_sort_key(variant) < self._variant_sort_key(existing):
+            if existing is None or self._variant_cost(variant) < self._variant_cost(existing):
                 by_key[key] = variant
-        ordered = sorted(by_key.values(), key=self._variant_sort_key)
+        ordered = sorted(by_key.values(), key=self._variant_cost)
         return ordered[:max(1, max_variants)]
 
     @staticmethod
-    def _supplier_leg(supplier: Dict, node: Dict, cargo: str) -> Dict:
+    def _supplier_leg(supplier: Dict, distance: int, node: Dict, cargo: str) -> Dict:
         edge_type = (
             'raw_to_processor'
             if supplier.get('is_raw') == 'true'
@@ -1089,14 +1912,14 @@ class DAGBuilder:
             'target_id': node.get('producer_id', ''),
             'target_name': node.get('producer_name', ''),
             'cargo': cargo,
-            'distance': int(float(supplier.get('distance', 0) or 0)),
+            'distance': int(distance),
             'type': edge_type,
         }
 
-    def _flatten_feeders(self, node: Dict, legs: List[Dict],
+    def _flatten_feeders(self, graph: Dict, node_id: str, legs: List[Dict],
                          missing: List[str]):
         """Backward-compatible wrapper around variant expansion."""
-        variants = self._flatten_feeder_variants(node, max_variants=1)
+        variants = self._flatten_feeder_variants(graph, node_id, max_variants=1)
         if not variants:
             return
         variant = variants[0]
@@ -1105,7 +1928,10 @@ class DAGBuilder:
 
     def _flatten_feeders_legacy(self, node: Dict, legs: List[Dict],
                                 missing: List[str]):
-        """Legacy single-branch flattener kept for reference/debugging."""
+        """Legacy single-branch flattener kept for reference/debugging.
+
+        Operates on nested nodes from legacy_tree().
+        """
         if node.get('is_raw') != 'true' and not node.get('input_groups'):
             unresolved = f"UNRESOLVED_RECIPE:{node.get('producer_type', 'unknown')}"
             if unresolved not in missing:
@@ -1207,16 +2033,19 @@ class DAGBuilder:
         raw_producers: List[Dict],
         processors: List[Dict],
         town_demands: Dict[str, Dict],
-        max_stops: int = 4,
+        geo: Optional[GeoIndex] = None,
+        max_stops: int = MULTI_STOP_MAX_STOPS,
         min_loaded_distance_ratio: float = 0.75,
         max_leg_distance: float = 10000.0,
         top_k: int = 30,
     ) -> List[Dict]:
-        """Find triangle/square loop candidates with high loaded utilization.
+        """Find 3..max_stops stop loop candidates with high loaded utilization.
 
-        A candidate is a stop loop with 3 or 4 stops where all consecutive legs
-        are loaded (directed flow edges from the DAG), and the closing leg may be
-        loaded or deadhead. We rank by loaded-distance ratio, not only leg count.
+        A candidate is a stop loop where all consecutive legs are loaded
+        (directed flow edges from the DAG), and the closing leg may be loaded
+        or deadhead. We rank by loaded-distance ratio, not only leg count.
+        Enumeration and top-k selection run in CycleEngine; all-loaded loops
+        are listed from their smallest stop id.
         """
         if not edges:
             return []
@@ -1271,140 +2100,98 @@ class DAGBuilder:
 
         node_info = self._build_node_index(raw_producers, processors, town_demands)
 
-        def canonical_rotation(node_ids: List[str]) -> Tuple[str, ...]:
-            rots = [tuple(node_ids[i:] + node_ids[:i]) for i in range(len(node_ids))]
-            return min(rots)
-
-        candidates: List[Dict[str, Any]] = []
-        seen_cycles: set = set()
-
-        for stop_count in (3, 4):
-            if stop_count > max_stops:
-                continue
-
-            def dfs(start_id: str, current_id: str, path_nodes: List[str], path_edges: List[Dict[str, Any]]):
-                if len(path_nodes) == stop_count:
-                    cycle_key = (stop_count, canonical_rotation(path_nodes))
-                    if cycle_key in seen_cycles:
-                        return
-                    seen_cycles.add(cycle_key)
-                    candidate = build_candidate(path_nodes, path_edges)
-                    if candidate:
-                        candidates.append(candidate)
-                    return
-
-                for next_edge in adjacency.get(current_id, []):
-                    nid = next_edge["target_id"]
-                    if nid in path_nodes:
-                        continue
-                    dfs(start_id, nid, path_nodes + [nid], path_edges + [next_edge])
-
-            def build_candidate(path_nodes: List[str], path_edges: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-                if len(path_nodes) != stop_count or len(path_edges) != stop_count - 1:
-                    return None
-
-                loaded_distance = sum(e["distance"] for e in path_edges)
-                flow_score = sum(e["flow_score"] for e in path_edges)
-
-                start_id = path_nodes[0]
-                end_id = path_nodes[-1]
-                closing = pair_map.get((end_id, start_id))
-                if closing:
-                    closing_distance = closing["distance"]
-                    closing_loaded = True
-                    loaded_distance += closing_distance
-                    flow_score += closing["flow_score"]
-                else:
-                    closing_loaded = False
-                    a = node_info.get(end_id, {})
-                    b = node_info.get(start_id, {})
-                    closing_distance = self._distance_xyz(
-                        as_float(a.get("x", 0), 0.0),
-                        as_float(a.get("y", 0), 0.0),
-                        as_float(a.get("z", 0), 0.0),
-                        as_float(b.get("x", 0), 0.0),
-                        as_float(b.get("y", 0), 0.0),
-                        as_float(b.get("z", 0), 0.0),
-                    )
-
-                total_distance = sum(e["distance"] for e in path_edges) + closing_distance
-                if total_distance <= 0:
-                    return None
-
-                loaded_legs = len(path_edges) + (1 if closing_loaded else 0)
-                loaded_leg_ratio = loaded_legs / float(stop_count)
-                loaded_distance_ratio = loaded_distance / float(total_distance)
-                if loaded_distance_ratio < min_loaded_distance_ratio:
-                    return None
+        # Deadhead closing legs: one vectorised 3D matrix over loop nodes.
+        if geo is None:
+            geo = GeoIndex.from_entities(node_info.values())
+        loop_ids = set(adjacency.keys())
+        loop_ids.update(pair["target_id"] for pair in pair_map.values())
+        # Intern in id order so the engine's "minimum node" is the minimum id.
+        ranked_ids = sorted(loop_ids)
+        rank = {nid: i for i, nid in enumerate(ranked_ids)}
+        deadhead = np.nan_to_num(geo.pairwise(ranked_ids, use_z=True))
+        plan_distance = np.nan_to_num(geo.pairwise(ranked_ids))
+        pairs = list(pair_map.values())
+        engine = CycleEngine(
+            len(ranked_ids),
+            [
+                (rank[p["source_id"]], rank[p["target_id"]], p["distance"], p["flow_score"])
+                for p in pairs
+            ],
+            deadhead,
+            # Edge distances are rounded 2D distances, so 2D straight lines
+            # bound the 3D deadhead legs from below (the engine adds slack).
+            plan_distance,
+        )
+        loops = engine.search(
+            min_stops=3,
+            max_stops=max_stops,
+            min_ratio=min_loaded_distance_ratio,
+            top_k=top_k,
+            starts=[rank[nid] for nid in adjacency],
+        )
 
-                legs = []
-                for edge in path_edges:
-                    legs.append(
-                        {
-                            "source_id": edge["source_id"],
-                            "source_name": node_info.get(edge["source_id"], {}).get("name", edge["source_id"]),
-                            "target_id": edge["target_id"],
-                            "target_name": node_info.get(edge["target_id"], {}).get("name", edge["target_id"]),
-                            "distance": round(edge["distance"]),
-                            "cargos": sorted(edge["cargos"]),
-                            "loaded": True,
-                        }
-                    )
+        def stop_name(nid: str) -> str:
+            return node_info.get(nid, {}).get("name", nid)
 
+        candidates: List[Dict[str, Any]] = []
+        for loop in loops:
+            path_nodes = [ranked_ids[i] for i in loop["nodes"]]
+            legs = []
+            for arc in loop["arcs"]:
+                edge = pairs[arc]
                 legs.append(
                     {
-                        "source_id": end_id,
-                        "source_name": node_info.get(end_id, {}).get("name", end_id),
-                        "target_id": start_id,
-                        "target_name": node_info.get(start_id, {}).get("name", start_id),
-                        "distance": round(closing_distance),
-                        "cargos": sorted(closing["cargos"]) if closing else [],
-                        "loaded": bool(closing_loaded),
+                        "source_id": edge["source_id"],
+                        "source_name": stop_name(edge["source_id"]),
+                        "target_id": edge["target_id"],
+                        "target_name": stop_name(edge["target_id"]),
+                        "distance": round(edge["distance"]),
+                        "cargos": sorted(edge["cargos"]),
+                        "loaded": True,
                     }
                 )
 
-                score = (
-                    loaded_distance_ratio * 100.0
-                    + loaded_leg_ratio * 20.0
-                    + min(30.0, flow_score / 20.0)
-                    - total_distance / 3000.0
-                )
+            start_id = path_nodes[0]
+            end_id = path_nodes[-1]
+            closing = pairs[loop["closing_arc"]] if loop["closing_arc"] is not None else None
+            legs.append(
+                {
+                    "source_id": end_id,
+                    "source_name": stop_name(end_id),
+                    "target_id": start_id,
+                    "target_name": stop_name(start_id),
+                    "distance": round(loop["closing_distance"]),
+                    "cargos": sorted(closing["cargos"]) if closing else [],
+                    "loaded": closing is not None,
+                }
+            )
 
-                return {
-                    "stop_count": stop_count,
+            candidates.append(
+                {
+                    "stop_count": loop["stop_count"],
                     "stops": [
                         {
                             "id": nid,
-                            "name": node_info.get(nid, {}).get("name", nid),
+                            "name": stop_name(nid),
                             "x": node_info.get(nid, {}).get("x", 0),
                             "y": node_info.get(nid, {}).get("y", 0),
                             "z": node_info.get(nid, {}).get("z", 0),
                         }
                         for nid in path_nodes
                     ],
-                    "loaded_legs": loaded_legs,
-                    "total_legs": stop_count,
-                    "loaded_leg_ratio": round(loaded_leg_ratio, 3),
-                    "loaded_distance_ratio": round(loaded_distance_ratio, 3),
-                    "total_distance": round(total_distance),
-                    "loaded_distance": round(loaded_distance),
-                    "flow_score": round(flow_score, 1),
-                    "score": round(score, 2),
+                    "loaded_legs": loop["loaded_legs"],
+                    "total_legs": loop["stop_count"],
+                    "loaded_leg_ratio": round(loop["loaded_leg_ratio"], 3),
+                    "loaded_distance_ratio": round(loop["loaded_distance_ratio"], 3),
+                    "total_distance": round(loop["total_distance"]),
+                    "loaded_distance": round(loop["loaded_distance"]),
+                    "flow_score": round(loop["flow_score"], 1),
+                    "score": round(loop["score"], 2),
                     "legs": legs,
                 }
+            )
 
-            for start in adjacency.keys():
-                dfs(start, start, [start], [])
-
-        candidates.sort(
-            key=lambda c: (
-                c.get("loaded_distance_ratio", 0.0),
-                c.get("loaded_leg_ratio", 0.0),
-                c.get("score", 0.0),
-            ),
-            reverse=True,
-        )
-        return candidates[:top_k]
+        return candidates
 
     def _build_node_index(
         self,
@@ -1445,9 +2232,18 @@ class DAGBuilder:
     # ------------------------------------------------------------------
 
     def format_for_llm(self, tree_data: Dict) -> str:
-        """Format the supply tree as readable text for Claude LLM."""
+        """Format the supply tree as readable text for Claude LLM.
+
+        Accepts the shared supply graph (expanded into the nested view one
+        town at a time) or an already materialised legacy tree.
+        """
+        if 'nodes' in tree_data:
+            towns = (self._legacy_town(tree_data, t) for t in tree_data.get('towns', []))
+        else:
+            towns = tree_data.get('towns', [])
+
         lines = []
-        for town in tree_data.get('towns', []):
+        for town in towns:
             demands_str = ', '.join(
                 f"{c}:{a}" for c, a in town.get('demands', {}).items())
             lines.append(f"=== {town['name']} ({demands_str}) ===")
@@ -1500,39 +2296,204 @@ class DAGBuilder:
                 else:
                     lines.append(f"{prefix}  {cargo} [AND]: [NO SUPPLIER]")
 
-    # ------------------------------------------------------------------
-    # Utilities
-    # ------------------------------------------------------------------
 
-    @staticmethod
-    def _distance(a: Dict, b: Dict) -> float:
-        """Euclidean distance between two entities."""
-        ax, ay = float(a.get('x', 0)), float(a.get('y', 0))
-        bx, by = float(b.get('x', 0)), float(b.get('y', 0))
-        return math.sqrt((ax - bx) ** 2 + (ay - by) ** 2)
+# ============================================================================
+# Parallel extraction workers
+# ============================================================================
 
-    @staticmethod
-    def _distance_xy(x1: float, y1: float, x2: float, y2: float) -> float:
-        """Euclidean distance between two points."""
-        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+# Graph and town demands, shipped once per pool worker by the initializer.
+_extract_state: Dict[str, Any] = {}
+
+
+def _init_extract_worker(graph: Dict, town_demands: Dict) -> None:
+    _extract_state["graph"] = graph
+    _extract_state["town_demands"] = town_demands
 
-    @staticmethod
-    def _distance_xyz(
-        x1: float, y1: float, z1: float,
-        x2: float, y2: float, z2: float,
-    ) -> float:
-        """Euclidean distance between two 3D points."""
-        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
+
+def _extract_town_shard(
+    shard: Tuple[int, int, List[str]],
+) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Edge run for towns[lo:hi] and chains for the listed town ids."""
+    lo, hi, chain_town_ids = shard
+    graph = _extract_state["graph"]
+    # Extraction only reads the graph; skip __init__ (IPC, .con discovery).
+    builder = DAGBuilder.__new__(DAGBuilder)
+    towns = graph["towns"][lo:hi]
+    edges = builder._walk_town_edges(graph, towns, _extract_state["town_demands"])
+    wanted = set(chain_town_ids)
+    variant_memo: Dict[Tuple, List[Dict]] = {}
+    chains = {
+        town["id"]: builder._extract_town_chains(graph, town, variant_memo)
+        for town in towns
+        if town["id"] in wanted
+    }
+    return edges, chains
+
+
+# ============================================================================
+# Recipe pre-indexing
+# ============================================================================
+
+# Per-process handles on the base zip so each pool worker opens it once.
+_index_zip_handles: Dict[str, zipfile.ZipFile] = {}
+
+
+def _parse_indexed_con(task: Tuple[str, str, str]) -> Optional[Dict]:
+    """Pool worker: read one `.con` source and parse its recipe."""
+    kind, location, zip_path = task
+    if kind == "file":
+        try:
+            with open(location, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        except OSError:
+            return None
+    else:
+        zf = _index_zip_handles.get(zip_path)
+        if zf is None:
+            try:
+                zf = zipfile.ZipFile(zip_path, "r")
+            except (OSError, zipfile.BadZipFile):
+                return None
+            _index_zip_handles[zip_path] = zf
+        try:
+            text = zf.read(location).decode("utf-8", errors="ignore")
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return None
+    if not text:
+        return None
+    return DAGBuilder._recipe_from_text(text)
+
+
+def _collect_index_sources(
+    base_zip_path: str,
+    roots: List[str],
+    catalog: RecipeCatalog,
+) -> Dict[str, Tuple[str, str, str]]:
+    """Map each industry `.con` path to its winning (source_key, kind, location).
+
+    Resolution order matches DAGBuilder._locate_con: mod roots in discovery
+    order first, then the base zip.
+    """
+    sources: Dict[str, Tuple[str, str, str]] = {}
+    for root in roots:
+        top = os.path.join(root, INDEX_PREFIX.rstrip("/"))
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if not name.endswith(".con"):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                if rel in sources:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                sources[rel] = (f"file:{path}:{st.st_size}:{st.st_mtime_ns}", "file", path)
+
+    if base_zip_path:
+        for rel, crc in catalog.zip_members(base_zip_path).items():
+            if rel.startswith(INDEX_PREFIX) and rel not in sources:
+                sources[rel] = (f"zip:{base_zip_path}:{crc}", "zip", rel)
+    return sources
+
+
+def build_recipe_index(
+    catalog_path: Path = DEFAULT_CATALOG_FILE,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Parse every industry `.con` across all construction roots into the catalog.
+
+    Files whose fingerprint already matches the catalog are skipped unless
+    `force` is set. Parsing is spread over a process pool; DAGBuilder picks
+    the result up through its RecipeCatalog at construction time.
+    """
+    started = time.perf_counter()
+    base_zip_path, roots = DAGBuilder._discover_con_paths()
+    catalog = RecipeCatalog(catalog_path)
+    sources = _collect_index_sources(base_zip_path, roots, catalog)
+
+    pending: List[Tuple[str, str, str, str]] = []
+    for rel, (source_key, kind, location) in sorted(sources.items()):
+        entry = catalog.entries.get(rel)
+        if not force and entry is not None and entry.get("source") == source_key:
+            continue
+        pending.append((rel, source_key, kind, location))
+    pruned = catalog.prune(set(sources), prefix=INDEX_PREFIX)
+
+    tasks = [(kind, location, base_zip_path) for _, _, kind, location in pending]
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers > 1 and len(tasks) >= INDEX_MIN_PARALLEL_FILES:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            recipes = list(pool.map(_parse_indexed_con, tasks, chunksize=chunksize))
+    else:
+        workers = 1
+        recipes = [_parse_indexed_con(task) for task in tasks]
+        for zf in _index_zip_handles.values():
+            zf.close()
+        _index_zip_handles.clear()
+
+    failed = 0
+    for (rel, source_key, _, _), recipe in zip(pending, recipes):
+        if recipe is None:
+            failed += 1
+            continue
+        catalog.store(rel, source_key, recipe)
+
+    elapsed = time.perf_counter() - started
+    meta = {
+        "indexed_at": int(time.time()),
+        "base_zip": base_zip_path,
+        "roots": roots,
+        "files": len(sources),
+        "parsed": len(pending) - failed,
+        "reused": len(sources) - len(pending),
+        "failed": failed,
+        "pruned": pruned,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(len(sources) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    catalog.set_index_meta(meta)
+    catalog.save()
+    return meta
 
 
 # ============================================================================
 # CLI
 # ============================================================================
 
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="TF2 supply chain DAG builder")
+    parser.add_argument("--index", action="store_true",
+                        help="Pre-parse all industry .con files into the recipe catalog and exit")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --index (default: CPU count), or for "
+                             "parallel edge/chain extraction when building (default: serial)")
+    parser.add_argument("--force", action="store_true",
+                        help="With --index, re-parse files even if their fingerprint is unchanged")
+    return parser.parse_args()
+
+
 def main():
+    args = _parse_args()
+    if args.index:
+        meta = build_recipe_index(workers=args.workers, force=args.force)
+        print(
+            f"[dag_builder] Indexed {meta['files']} industry .con files from "
+            f"{len(meta['roots'])} mod roots + base zip in {meta['seconds']:.2f}s "
+            f"({meta['files_per_second']:.0f} files/s, {meta['workers']} workers): "
+            f"{meta['parsed']} parsed, {meta['reused']} reused, "
+            f"{meta['pruned']} pruned, {meta['failed']} unreadable"
+        )
+        return
+
     print("=== TF2 Supply Chain DAG Builder (Dynamic) ===\n")
 
-    builder = DAGBuilder()
+    builder = DAGBuilder(extract_workers=args.workers)
     dag = builder.build()
 
     if 'error' in dag:
@@ -1547,7 +2508,7 @@ def main():
     print(f"Town demands: {len(dag['town_demands'])}")
 
     # Print tree view
-    tree = dag.get('supply_tree', {})
+    tree = dag.get('supply_graph', {})
     if tree:
         print(f"\n=== Supply Chain Trees ===")
         print(builder.format_for_llm(tree))
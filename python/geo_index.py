@@ -0,0 +1,170 @@
+"""
+GeoIndex - interned entity ids with float64 coordinate arrays.
+
+Built once per survey (DAGBuilder.build() attaches it to the DAG as
+`geo_index`) so distance queries stop re-parsing the stringified "x"/"y"
+fields of DAG nodes and looping over `math.sqrt` pair by pair. Ids are
+interned to row numbers; coordinates live in one (n, 3) float64 array and
+all queries are vectorised.
+
+    geo = GeoIndex.from_dag(dag)
+    geo.distance("1001", "1002")                  # scalar, None if unknown
+    geo.one_to_many("50", ["1001", "1002"])       # 1-D array, NaN if unknown
+    geo.pairwise(["1001", "1002"])                # square matrix
+
+For compatibility with the old `{id: {"x": .., "y": ..}}` position dicts,
+`geo.get(id)` returns a coordinate dict.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class GeoIndex:
+    """Interned ids + float64 coordinates with vectorised distance queries."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._rows: List[Tuple[float, float, float]] = []
+        self._xyz: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def add(self, entity_id: str, x: Any, y: Any, z: Any = 0.0) -> int:
+        """Intern an entity and return its row; the first position wins."""
+        key = str(entity_id)
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        row = len(self.ids)
+        self.ids.append(key)
+        self.index[key] = row
+        self._rows.append((_as_float(x), _as_float(y), _as_float(z)))
+        self._xyz = None
+        return row
+
+    @classmethod
+    def from_entities(
+        cls,
+        industries: Iterable[Dict[str, Any]] = (),
+        towns: Iterable[Dict[str, Any]] = (),
+    ) -> "GeoIndex":
+        """Build from dicts carrying id/x/y/z (numbers or numeric strings)."""
+        geo = cls()
+        for ind in industries:
+            if str(ind.get("id", "")):
+                geo.add(ind["id"], ind.get("x", 0), ind.get("y", 0), ind.get("z", 0))
+        for town in towns:
+            if str(town.get("id", "")):
+                geo.add(town["id"], town.get("x", 0), town.get("y", 0), town.get("z", 0))
+        return geo
+
+    @classmethod
+    def from_dag(cls, dag: Dict[str, Any]) -> "GeoIndex":
+        """Reuse the DAG's index, or build one from its node lists."""
+        existing = dag.get("geo_index")
+        if isinstance(existing, cls):
+            return existing
+        industries = list(dag.get("raw_producers", []) or []) + list(dag.get("processors", []) or [])
+        towns = [
+            {"id": tid, "x": t.get("x", 0), "y": t.get("y", 0), "z": t.get("z", 0)}
+            for tid, t in (dag.get("town_demands", {}) or {}).items()
+        ]
+        return cls.from_entities(industries, towns)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The coordinate array is rebuilt on demand.
+        state = dict(self.__dict__)
+        state["_xyz"] = None
+        return state
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    @property
+    def xyz(self) -> np.ndarray:
+        if self._xyz is None:
+            self._xyz = np.array(self._rows, dtype=np.float64).reshape(-1, 3)
+        return self._xyz
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return str(entity_id) in self.index
+
+    def __bool__(self) -> bool:
+        return bool(self.ids)
+
+    def get(self, entity_id: Any, default: Any = None) -> Any:
+        """Position dict {"x", "y", "z"} (drop-in for old position maps)."""
+        row = self.index.get(str(entity_id))
+        if row is None:
+            return default
+        x, y, z = self._rows[row]
+        return {"x": x, "y": y, "z": z}
+
+    def rows(self, entity_ids: Iterable[Any]) -> np.ndarray:
+        """Row numbers for ids; -1 where unknown."""
+        return np.fromiter(
+            (self.index.get(str(eid), -1) for eid in entity_ids),
+            dtype=np.int64,
+        )
+
+    # ------------------------------------------------------------------
+    # Distance queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def pairwise_points(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Euclidean distance matrix between (n, d) and (m, d) point arrays."""
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        diff = a[:, None, :] - b[None, :, :]
+        return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+    def _coords(self, rows: np.ndarray, use_z: bool) -> np.ndarray:
+        cols = 3 if use_z else 2
+        out = np.full((len(rows), cols), np.nan)
+        known = rows >= 0
+        out[known] = self.xyz[rows[known], :cols]
+        return out
+
+    def distance(self, a: Any, b: Any, use_z: bool = False) -> Optional[float]:
+        ra = self.index.get(str(a))
+        rb = self.index.get(str(b))
+        if ra is None or rb is None:
+            return None
+        cols = 3 if use_z else 2
+        diff = self.xyz[ra, :cols] - self.xyz[rb, :cols]
+        return float(np.sqrt(diff @ diff))
+
+    def one_to_many(self, source: Any, targets: Iterable[Any],
+                    use_z: bool = False) -> np.ndarray:
+        """Distances from one entity to many; NaN for unknown ids."""
+        target_rows = self.rows(targets)
+        row = self.index.get(str(source))
+        if row is None:
+            return np.full(len(target_rows), np.nan)
+        cols = 3 if use_z else 2
+        diff = self._coords(target_rows, use_z) - self.xyz[row, :cols]
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def pairwise(self, ids_a: Iterable[Any], ids_b: Optional[Iterable[Any]] = None,
+                 use_z: bool = False) -> np.ndarray:
+        """Distance matrix between two id lists (square if ids_b is None)."""
+        rows_a = self.rows(ids_a)
+        rows_b = rows_a if ids_b is None else self.rows(ids_b)
+        return self.pairwise_points(self._coords(rows_a, use_z), self._coords(rows_b, use_z))
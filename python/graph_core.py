@@ -0,0 +1,352 @@
+"""
+GraphCore - integer-indexed, typed view of the supply DAG.
+
+DAGBuilder's legacy outputs are lists of dicts with string ids and
+stringified numbers, which consumers re-parse on every pass. GraphCore is
+built once per survey (DAGBuilder.build() attaches it as `graph_core`) and
+keeps the same information in compact form:
+
+- node ids interned to rows, with kind / producer type columns
+- cargo names interned to small ints
+- flow edges in CSR order by source (`indptr`, `edge_dst`, ...), with
+  distance, town demand and chain pull as typed columns
+- town demand as a CSR over town rows
+
+Positions come from the survey's GeoIndex (`geo`), mapped per row.
+
+    core = GraphCore.from_dag(dag)
+    core.node_type("1001")                     # "steel_mill"
+    core.chain_pull("1001", "1002", "COAL")     # int
+    for e in core.out_edges("1001"): ...        # edge rows
+
+The legacy dict lists stay in the DAG as its serialized form (JSON dumps,
+LLM formatting); hot consumers should read the core instead.
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from geo_index import GeoIndex
+
+
+def _as_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(float(str(value)))
+    except (TypeError, ValueError):
+        return default
+
+
+class GraphCore:
+    """Interned nodes/cargos with CSR flow edges and typed columns."""
+
+    # Node kinds
+    RAW = 0
+    PROCESSOR = 1
+    TOWN = 2
+    UNKNOWN = 3
+
+    # Edge kinds, indexed like EDGE_TYPES
+    EDGE_TYPES = ("raw_to_processor", "processor_to_processor", "processor_to_town")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.types: List[str] = [""]
+        self.cargos: List[str] = []
+        self.cargo_index: Dict[str, int] = {}
+        self.geo: GeoIndex = GeoIndex()
+
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.type_id = np.zeros(0, dtype=np.int32)
+        self.geo_row = np.zeros(0, dtype=np.int64)
+
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.edge_src = np.zeros(0, dtype=np.int32)
+        self.edge_dst = np.zeros(0, dtype=np.int32)
+        self.edge_cargo = np.zeros(0, dtype=np.int16)
+        self.edge_kind = np.zeros(0, dtype=np.int8)
+        self.edge_distance = np.zeros(0, dtype=np.int32)
+        self.edge_town_demand = np.zeros(0, dtype=np.int32)
+        self.edge_pull = np.zeros(0, dtype=np.int64)
+        # True for edges only seen as chain legs (not in the DAG edge list)
+        self.edge_chain_only = np.zeros(0, dtype=bool)
+        # Position of each CSR row in the legacy edge list (-1 for chain-only)
+        self.edge_order = np.zeros(0, dtype=np.int64)
+
+        self.demand_indptr = np.zeros(1, dtype=np.int64)
+        self.demand_cargo = np.zeros(0, dtype=np.int16)
+        self.demand_amount = np.zeros(0, dtype=np.int32)
+
+        self._kinds: List[int] = []
+        self._type_ids: List[int] = []
+        self._type_index: Dict[str, int] = {"": 0}
+        self._edge_lookup: Dict[Tuple[int, int, int], int] = {}
+        self._type_map: Optional[Dict[str, str]] = None
+        self._pull_map: Optional[Dict[Tuple[str, str, str], int]] = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _intern_node(self, node_id: Any, name: str = "", kind: int = UNKNOWN,
+                     ptype: str = "") -> int:
+        key = str(node_id)
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        row = len(self.ids)
+        self.ids.append(key)
+        self.index[key] = row
+        self.names.append(str(name or key))
+        self._kinds.append(kind)
+        self._type_ids.append(self._intern_type(ptype))
+        return row
+
+    def _intern_type(self, ptype: str) -> int:
+        ptype = str(ptype or "").lower()
+        tid = self._type_index.get(ptype)
+        if tid is None:
+            tid = len(self.types)
+            self.types.append(ptype)
+            self._type_index[ptype] = tid
+        return tid
+
+    def cargo_id(self, cargo: Any, create: bool = False) -> int:
+        """Small-int id for a cargo name (case-insensitive); -1 if unknown."""
+        key = str(cargo or "").upper()
+        cid = self.cargo_index.get(key)
+        if cid is None:
+            if not create or not key:
+                return -1
+            cid = len(self.cargos)
+            self.cargos.append(key)
+            self.cargo_index[key] = cid
+        return cid
+
+    @classmethod
+    def build(
+        cls,
+        raw_producers: Iterable[Dict[str, Any]],
+        processors: Iterable[Dict[str, Any]],
+        town_demands: Dict[str, Dict[str, Any]],
+        edges: Iterable[Dict[str, Any]],
+        chains: Iterable[Dict[str, Any]] = (),
+        geo: Optional[GeoIndex] = None,
+    ) -> "GraphCore":
+        """Build from DAGBuilder's legacy lists (parsed exactly once)."""
+        core = cls()
+        raw_producers = list(raw_producers or [])
+        processors = list(processors or [])
+        town_demands = town_demands or {}
+        for node in raw_producers:
+            if str(node.get("id", "")):
+                core._intern_node(node["id"], node.get("name", ""), cls.RAW, node.get("type", ""))
+        for node in processors:
+            if str(node.get("id", "")):
+                core._intern_node(node["id"], node.get("name", ""), cls.PROCESSOR, node.get("type", ""))
+        for tid, town in town_demands.items():
+            if str(tid):
+                core._intern_node(tid, town.get("name", ""), cls.TOWN)
+
+        # Town demand CSR (rows follow town interning order).
+        demand_rows: List[Tuple[int, int, int]] = []
+        for tid, town in town_demands.items():
+            row = core.index.get(str(tid))
+            if row is None:
+                continue
+            for cargo, amount in (town.get("demands", {}) or {}).items():
+                cid = core.cargo_id(cargo, create=True)
+                if cid >= 0:
+                    demand_rows.append((row, cid, _as_int(amount)))
+
+        # Flow edges, then chain legs folded in as pull.
+        src, dst, cargo_col, kind_col = array("i"), array("i"), array("h"), array("b")
+        dist_col, demand_col, order_col = array("i"), array("i"), array("q")
+        pull: List[int] = []
+        chain_only: List[bool] = []
+        edge_types = {name: i for i, name in enumerate(cls.EDGE_TYPES)}
+
+        def add_edge(record: Dict[str, Any], order: int) -> int:
+            sid = str(record.get("source_id", ""))
+            tid = str(record.get("target_id", ""))
+            cid = core.cargo_id(record.get("cargo", ""), create=True)
+            if not sid or not tid or cid < 0:
+                return -1
+            s = core._intern_node(sid, record.get("source_name", ""))
+            t = core._intern_node(tid, record.get("target_name", ""))
+            key = (s, t, cid)
+            row = core._edge_lookup.get(key)
+            if row is not None:
+                return row
+            row = len(src)
+            core._edge_lookup[key] = row
+            src.append(s)
+            dst.append(t)
+            cargo_col.append(cid)
+            kind_col.append(edge_types.get(str(record.get("type", "")), -1))
+            dist_col.append(_as_int(record.get("distance", 0)))
+            demand_col.append(_as_int(record.get("town_demand", 0)))
+            order_col.append(order)
+            pull.append(0)
+            chain_only.append(order < 0)
+            return row
+
+        for order, edge in enumerate(edges or []):
+            add_edge(edge, order)
+        for chain in chains or []:
+            demand = max(1, _as_int(chain.get("town_demand", 0)))
+            for leg in chain.get("legs", []):
+                row = add_edge(leg, -1)
+                if row >= 0:
+                    pull[row] += demand
+
+        core.kind = np.array(core._kinds, dtype=np.int8)
+        core.type_id = np.array(core._type_ids, dtype=np.int32)
+
+        core.geo = geo if geo is not None else GeoIndex.from_entities(
+            raw_producers + processors,
+            [{"id": tid, **t} for tid, t in town_demands.items()],
+        )
+        core.geo_row = core.geo.rows(core.ids)
+
+        core._set_edges(
+            np.array(src, dtype=np.int32),
+            np.array(dst, dtype=np.int32),
+            np.array(cargo_col, dtype=np.int16),
+            np.array(kind_col, dtype=np.int8),
+            np.array(dist_col, dtype=np.int32),
+            np.array(demand_col, dtype=np.int32),
+            np.array(pull, dtype=np.int64),
+            np.array(chain_only, dtype=bool),
+            np.array(order_col, dtype=np.int64),
+        )
+
+        n = len(core.ids)
+        if demand_rows:
+            demand = np.array(demand_rows, dtype=np.int64)
+            perm = np.argsort(demand[:, 0], kind="stable")
+            demand = demand[perm]
+            core.demand_cargo = demand[:, 1].astype(np.int16)
+            core.demand_amount = demand[:, 2].astype(np.int32)
+            counts = np.bincount(demand[:, 0], minlength=n)
+        else:
+            counts = np.zeros(n, dtype=np.int64)
+        core.demand_indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return core
+
+    def _set_edges(self, src, dst, cargo, kind, dist, demand, pull, chain_only, order):
+        """Store edge columns sorted by source (CSR) and re-key the lookup."""
+        perm = np.argsort(src, kind="stable")
+        self.edge_src = src[perm]
+        self.edge_dst = dst[perm]
+        self.edge_cargo = cargo[perm]
+        self.edge_kind = kind[perm]
+        self.edge_distance = dist[perm]
+        self.edge_town_demand = demand[perm]
+        self.edge_pull = pull[perm]
+        self.edge_chain_only = chain_only[perm]
+        self.edge_order = order[perm]
+        counts = np.bincount(self.edge_src, minlength=len(self.ids))
+        self.indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._edge_lookup = {
+            (s, t, c): row
+            for row, (s, t, c) in enumerate(zip(
+                self.edge_src.tolist(), self.edge_dst.tolist(), self.edge_cargo.tolist()
+            ))
+        }
+
+    @classmethod
+    def from_dag(cls, dag: Dict[str, Any]) -> "GraphCore":
+        """Reuse the DAG's core, or build one from its legacy lists."""
+        existing = dag.get("graph_core")
+        if isinstance(existing, cls):
+            return existing
+        core = cls.build(
+            dag.get("raw_producers", []),
+            dag.get("processors", []),
+            dag.get("town_demands", {}),
+            dag.get("edges", []),
+            dag.get("complete_chains", []),
+            geo=GeoIndex.from_dag(dag),
+        )
+        if isinstance(dag, dict) and dag:
+            dag["graph_core"] = core
+        return core
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: object) -> bool:
+        return str(node_id) in self.index
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.edge_src.shape[0])
+
+    def node_type(self, node_id: Any) -> str:
+        row = self.index.get(str(node_id))
+        if row is None:
+            return ""
+        return self.types[self.type_id[row]]
+
+    def type_map(self) -> Dict[str, str]:
+        """{industry id: lower-case producer type}, cached."""
+        if self._type_map is None:
+            industry = (self.kind == self.RAW) | (self.kind == self.PROCESSOR)
+            self._type_map = {
+                self.ids[row]: self.types[tid]
+                for row, tid in zip(np.flatnonzero(industry).tolist(),
+                                    self.type_id[industry].tolist())
+            }
+        return self._type_map
+
+    def edge_row(self, source_id: Any, target_id: Any, cargo: Any) -> int:
+        s = self.index.get(str(source_id))
+        t = self.index.get(str(target_id))
+        cid = self.cargo_id(cargo)
+        if s is None or t is None or cid < 0:
+            return -1
+        return self._edge_lookup.get((s, t, cid), -1)
+
+    def out_edges(self, node_id: Any) -> range:
+        """CSR edge rows leaving a node."""
+        row = self.index.get(str(node_id))
+        if row is None:
+            return range(0)
+        return range(int(self.indptr[row]), int(self.indptr[row + 1]))
+
+    def chain_pull(self, source_id: Any, target_id: Any, cargo: Any) -> int:
+        row = self.edge_row(source_id, target_id, cargo)
+        return int(self.edge_pull[row]) if row >= 0 else 0
+
+    def chain_pull_map(self) -> Dict[Tuple[str, str, str], int]:
+        """{(source_id, target_id, CARGO): summed town demand of chains}, cached."""
+        if self._pull_map is None:
+            rows = np.flatnonzero(self.edge_pull > 0)
+            ids, cargos = self.ids, self.cargos
+            self._pull_map = {
+                (ids[s], ids[t], cargos[c]): p
+                for s, t, c, p in zip(
+                    self.edge_src[rows].tolist(),
+                    self.edge_dst[rows].tolist(),
+                    self.edge_cargo[rows].tolist(),
+                    self.edge_pull[rows].tolist(),
+                )
+            }
+        return self._pull_map
+
+    def town_demand(self, town_id: Any, cargo: Any) -> int:
+        row = self.index.get(str(town_id))
+        cid = self.cargo_id(cargo)
+        if row is None or cid < 0:
+            return 0
+        lo, hi = int(self.demand_indptr[row]), int(self.demand_indptr[row + 1])
+        hits = np.flatnonzero(self.demand_cargo[lo:hi] == cid)
+        return int(self.demand_amount[lo + hits[0]]) if hits.size else 0
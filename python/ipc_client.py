@@ -6,26 +6,365 @@ Usage:
     ipc = IPCClient()
     resp = ipc.send('query_game_state')
     print(resp)  # {'status': 'ok', 'data': {'year': '1914', 'money': '187521196', ...}}
+
+    # Several reads in one file exchange (one game tick):
+    state, lines = ipc.send_batch(['query_game_state', 'query_lines'])
+
+Protocols (IPCClient(protocol=...)):
+    'auto'      spool when the game has advertised it, else legacy (default)
+    'spool'     one file per request in SPOOL_DIR; many commands in flight
+    'legacy'    single shared CMD_FILE/RESP_FILE pair
+
+Read cache: idempotent query_* responses are reused for a short per-command
+TTL (READ_CACHE_TTLS). Any other command except ping invalidates the whole
+cache, so reads issued after a build always see fresh state.
+    ipc.cache_stats()        # {'hits': ..., 'misses': ..., ...}
+    ipc.invalidate_cache()   # drop everything (e.g. at cycle start)
+
+Session traces: every send/send_batch, with its timing, can be recorded
+to a JSONL trace (gzip-compressed when the name ends in .gz) and served
+back by ipc_replay.ReplayIPC for offline profiling.
+    ipc.start_trace('/tmp/cycle.jsonl.gz')   # or TF2_IPC_TRACE=<path>
+    ipc.trace_mark('cycle 7')               # cycle boundaries for reports
+
+Telemetry: every uncached exchange feeds per-command latency histograms
+(count, p50/p95/p99, timeouts, response bytes, JSON decode time, stale
+responses discarded). Counters live in per-thread tables, so recording
+takes no lock; snapshots are appended to STATS_FILE every STATS_INTERVAL.
+    ipc.stats()              # {'commands': {'query_industries': {...}}, ...}
+
+Response wait strategies (IPCClient(wait_strategy=...)):
+    'auto'      inotify on Linux, otherwise adaptive polling (default)
+    'inotify'   block on an inotify watch of the response directory
+    'adaptive'  poll starting at 0.5 ms, backing off to 100 ms
+    'fixed'     legacy fixed 100 ms sleep
 """
 
+import atexit
+import bisect
+import copy
+import ctypes
+import ctypes.util
+import gzip
 import json
 import os
+import select
+import struct
+import sys
+import threading
 import time
 import uuid
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 
 CMD_FILE = "/tmp/tf2_cmd.json"
 RESP_FILE = "/tmp/tf2_resp.json"
 IPC_LOG = "/tmp/tf2_simple_ipc.log"
+# Per-request spool (see simple_ipc.lua): cmd_<slot>.json / resp_<id>.json
+SPOOL_DIR = "/tmp/tf2_ipc"
+SPOOL_SLOTS = 16
+SPOOL_READY_FILE = "ready"
+SPOOL_CLAIM_RETRY = 0.005
+# Orphaned responses (caller timed out) older than this are swept
+SPOOL_ORPHAN_MAX_AGE = 600
+PROTOCOLS = ("auto", "spool", "legacy")
+
+# Seconds a read-only response may be reused. Commands not listed here
+# (other than NON_MUTATING_COMMANDS) are treated as mutating.
+READ_CACHE_TTLS = {
+    "query_game_state": 2.0,
+    "query_lines": 5.0,
+    "query_vehicles": 5.0,
+    "query_stations": 5.0,
+    "query_nearby_stations": 5.0,
+    "query_town_demands": 10.0,
+    "query_town_supply": 10.0,
+    "query_towns": 30.0,
+    "query_industries": 30.0,
+    "query_industry_recipe": 300.0,
+    "query_industry_recipes": 30.0,
+    "query_construction_recipe": 300.0,
+}
+# Uncached commands that do not change game state
+NON_MUTATING_COMMANDS = {"ping", "batch"}
+
+# Record a session trace to this path when set (see ipc_replay.py)
+TRACE_ENV = "TF2_IPC_TRACE"
+TRACE_VERSION = 1
+
+# Telemetry snapshots are appended here as JSON lines ("" disables)
+STATS_FILE = os.environ.get("TF2_IPC_STATS_FILE", "/tmp/tf2_ipc_stats.jsonl")
+STATS_INTERVAL = 60.0
+# Rotated to <file>.1 beyond this size
+STATS_FILE_MAX_BYTES = 5 * 1024 * 1024
+# Latency histogram upper bounds: 0.1 ms growing 25% per bucket (~200 s)
+LATENCY_BUCKETS_MS = tuple(0.1 * 1.25 ** i for i in range(66))
+
+# A batch entry is either a bare command name or (command, params).
+BatchEntry = Union[str, Tuple[str, Optional[Dict[str, Any]]]]
+
+WAIT_STRATEGIES = ("auto", "inotify", "adaptive", "fixed")
+FIXED_POLL_INTERVAL = 0.1
+ADAPTIVE_POLL_MIN = 0.0005
+ADAPTIVE_POLL_MAX = 0.1
+ADAPTIVE_POLL_BACKOFF = 1.5
+# Re-check the response file at least this often even under inotify, in
+# case an event is missed (e.g. the directory watch was dropped).
+INOTIFY_MAX_BLOCK = 0.5
+WAKE_LATENCY_SAMPLES = 500
+
+# inotify(7) constants
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+
+
+class _InotifyWatch:
+    """Minimal ctypes inotify watch on a set of directories (Linux only)."""
+
+    def __init__(self, directories: Sequence[str]):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def drain(self) -> List[str]:
+        """Consume pending events and return the file names they refer to."""
+        names = []
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + 16 <= len(buf):
+                _, _, _, name_len = struct.unpack_from("iIII", buf, offset)
+                raw = buf[offset + 16:offset + 16 + name_len]
+                names.append(raw.split(b"\0", 1)[0].decode(errors="ignore"))
+                offset += 16 + name_len
+        return names
+
+    def wait(self, timeout: float) -> bool:
+        """Block until an event arrives or timeout elapses."""
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        return bool(ready)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _CommandStats:
+    """Counters for one command in one thread's telemetry table."""
+
+    __slots__ = ("count", "timeouts", "stale_discards", "latency_sum", "latency_max",
+                 "buckets", "resp_bytes", "resp_bytes_max", "decode_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.stale_discards = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.resp_bytes = 0
+        self.resp_bytes_max = 0
+        self.decode_seconds = 0.0
+
+
+class IPCTelemetry:
+    """Per-command IPC histograms; each thread writes only its own table."""
+
+    def __init__(self):
+        self.since = time.time()
+        self._local = threading.local()
+        self._tables: List[Dict[str, _CommandStats]] = []
+        # Taken once per thread, when its table is registered
+        self._tables_lock = threading.Lock()
+
+    def _entry(self, command: str) -> _CommandStats:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = {}
+            self._local.table = table
+            with self._tables_lock:
+                self._tables.append(table)
+        entry = table.get(command)
+        if entry is None:
+            entry = table[command] = _CommandStats()
+        return entry
+
+    def record(self, command: str, seconds: float, timed_out: bool,
+               resp_bytes: int = 0, decode_seconds: float = 0.0,
+               stale_discards: int = 0):
+        entry = self._entry(command)
+        latency_ms = seconds * 1000.0
+        entry.count += 1
+        entry.latency_sum += latency_ms
+        entry.latency_max = max(entry.latency_max, latency_ms)
+        entry.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        entry.timeouts += 1 if timed_out else 0
+        entry.stale_discards += stale_discards
+        entry.resp_bytes += resp_bytes
+        entry.resp_bytes_max = max(entry.resp_bytes_max, resp_bytes)
+        entry.decode_seconds += decode_seconds
+
+    @staticmethod
+    def _percentile(buckets: List[int], count: int, q: float, max_ms: float) -> float:
+        target = q * count
+        seen = 0
+        for i, n in enumerate(buckets):
+            seen += n
+            if n and seen >= target:
+                bound = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else max_ms
+                return round(min(bound, max_ms), 3)
+        return round(max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Merged per-command summary; percentiles are bucket upper bounds (<=25% high)."""
+        merged: Dict[str, _CommandStats] = {}
+        with self._tables_lock:
+            tables = list(self._tables)
+        for table in tables:
+            for command, entry in list(table.items()):
+                total = merged.get(command)
+                if total is None:
+                    total = merged[command] = _CommandStats()
+                total.count += entry.count
+                total.timeouts += entry.timeouts
+                total.stale_discards += entry.stale_discards
+                total.latency_sum += entry.latency_sum
+                total.latency_max = max(total.latency_max, entry.latency_max)
+                total.buckets = [a + b for a, b in zip(total.buckets, entry.buckets)]
+                total.resp_bytes += entry.resp_bytes
+                total.resp_bytes_max = max(total.resp_bytes_max, entry.resp_bytes_max)
+                total.decode_seconds += entry.decode_seconds
+
+        out = {}
+        for command in sorted(merged):
+            e = merged[command]
+            if not e.count:
+                continue
+            answered = max(1, e.count - e.timeouts)
+            out[command] = {
+                "count": e.count,
+                "timeouts": e.timeouts,
+                "stale_discards": e.stale_discards,
+                "total_ms": round(e.latency_sum, 3),
+                "mean_ms": round(e.latency_sum / e.count, 3),
+                "p50_ms": self._percentile(e.buckets, e.count, 0.50, e.latency_max),
+                "p95_ms": self._percentile(e.buckets, e.count, 0.95, e.latency_max),
+                "p99_ms": self._percentile(e.buckets, e.count, 0.99, e.latency_max),
+                "max_ms": round(e.latency_max, 3),
+                "resp_bytes_total": e.resp_bytes,
+                "resp_bytes_mean": int(e.resp_bytes / answered),
+                "resp_bytes_max": e.resp_bytes_max,
+                "decode_ms_total": round(e.decode_seconds * 1000.0, 3),
+            }
+        return out
+
+
+class _TraceWriter:
+    """Appends request/response records to a JSONL (optionally gzip) trace."""
+
+    def __init__(self, path: str):
+        self.path = path
+        opener = gzip.open if path.endswith(".gz") else open
+        self._file = opener(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._seq = 0
+        self.write({"kind": "header", "version": TRACE_VERSION,
+                    "started_at": time.time(), "pid": os.getpid()})
+
+    def write(self, record: Dict[str, Any], flush: bool = False):
+        with self._lock:
+            if self._file is None:
+                return
+            record["seq"] = self._seq
+            self._seq += 1
+            self._file.write(json.dumps(record, default=str) + "\n")
+            if flush:
+                self._file.flush()
+
+    def offset(self, perf_time: float) -> float:
+        return round(perf_time - self._t0, 6)
+
+    def mark(self, label: str):
+        # Flushed so a crashed run still leaves every completed cycle behind
+        self.write({"kind": "mark", "label": label,
+                    "t": self.offset(time.perf_counter())}, flush=True)
+
+    def close(self):
+        self.mark("end")
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
 
 
 class IPCClient:
     """File-based IPC client for Transport Fever 2."""
 
-    def __init__(self, cmd_file: str = CMD_FILE, resp_file: str = RESP_FILE):
+    def __init__(self, cmd_file: str = CMD_FILE, resp_file: str = RESP_FILE,
+                 wait_strategy: str = "auto", spool_dir: str = SPOOL_DIR,
+                 protocol: str = "auto",
+                 cache_ttls: Optional[Dict[str, float]] = None,
+                 trace_path: Optional[str] = None,
+                 stats_file: Optional[str] = None,
+                 stats_interval: float = STATS_INTERVAL):
+        if wait_strategy not in WAIT_STRATEGIES:
+            raise ValueError(
+                f"wait_strategy must be one of {WAIT_STRATEGIES}, got {wait_strategy!r}")
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"protocol must be one of {PROTOCOLS}, got {protocol!r}")
         self.cmd_file = cmd_file
         self.resp_file = resp_file
+        self.spool_dir = spool_dir
+        self.protocol = protocol
+        if protocol != "legacy":
+            os.makedirs(spool_dir, exist_ok=True)
+            self._sweep_orphaned_responses()
+        # inotify fds are per thread so concurrent callers never steal
+        # each other's wake-up events.
+        self._local = threading.local()
+        self._watches: List[_InotifyWatch] = []
+        self._watches_lock = threading.Lock()
+        self.wait_strategy = self._resolve_wait_strategy(wait_strategy)
+        # Seconds between the response file being written and us reading it
+        self._wake_latencies: deque = deque(maxlen=WAKE_LATENCY_SAMPLES)
+        # Read cache: {cache_key: (expires_at, response)}; pass {} to disable
+        self.cache_ttls = dict(READ_CACHE_TTLS if cache_ttls is None else cache_ttls)
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_invalidations = 0
+        self.telemetry = IPCTelemetry()
+        self.stats_file = STATS_FILE if stats_file is None else stats_file
+        self.stats_interval = stats_interval
+        self._next_stats_flush = time.time() + stats_interval
+        self._stats_flush_lock = threading.Lock()
+        if self.stats_file:
+            atexit.register(self.flush_stats)
+        self._trace: Optional[_TraceWriter] = None
+        trace_path = trace_path or os.environ.get(TRACE_ENV)
+        if trace_path:
+            self.start_trace(trace_path)
 
     def send(self, command: str, params: Dict[str, Any] = None,
              timeout: float = 30.0) -> Optional[Dict]:
@@ -41,6 +380,63 @@ class IPCClient:
             Response dict with 'status', 'data'/'message', 'id' keys.
             None if timeout.
         """
+        trace = self._trace
+        if trace is None:
+            return self._send(command, params, timeout)
+        started = time.perf_counter()
+        resp = self._send(command, params, timeout)
+        trace.write({
+            "kind": "send",
+            "t": trace.offset(started),
+            "elapsed": round(time.perf_counter() - started, 6),
+            "cmd": command,
+            "params": self._stringify(params or {}),
+            "resp": resp,
+        })
+        return resp
+
+    def _send(self, command: str, params: Optional[Dict[str, Any]],
+              timeout: float) -> Optional[Dict]:
+        """send() without trace recording."""
+        if command in self.cache_ttls:
+            key = self._cache_key(command, params)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            resp = self._exchange(command, params, timeout)
+            self._cache_put(key, command, resp)
+            return resp
+
+        mutating = command not in NON_MUTATING_COMMANDS
+        if mutating:
+            self.invalidate_cache()
+        resp = self._exchange(command, params, timeout)
+        if mutating:
+            # Drop reads another thread cached while the command ran
+            self.invalidate_cache()
+        return resp
+
+    def _exchange(self, command: str, params: Optional[Dict[str, Any]],
+                  timeout: float) -> Optional[Dict]:
+        """One uncached command/response round trip, with telemetry."""
+        # _try_read_response fills this thread's probe
+        probe = {"bytes": 0, "decode": 0.0, "stale": set()}
+        self._local.probe = probe
+        started = time.perf_counter()
+        try:
+            resp = self._round_trip(command, params, timeout)
+        finally:
+            self._local.probe = None
+        self.telemetry.record(
+            command, time.perf_counter() - started, resp is None,
+            probe["bytes"], probe["decode"], len(probe["stale"]),
+        )
+        if self.stats_file and time.time() >= self._next_stats_flush:
+            self.flush_stats(periodic=True)
+        return resp
+
+    def _round_trip(self, command: str, params: Optional[Dict[str, Any]],
+                    timeout: float) -> Optional[Dict]:
         request_id = uuid.uuid4().hex[:8]
 
         # CRITICAL: Stringify all values for Lua's JSON parser
@@ -53,9 +449,15 @@ class IPCClient:
             "params": str_params
         }
 
-        # Clear stale response
+        if self._use_spool():
+            return self._send_spool(cmd, timeout)
+
+        # Legacy single-slot exchange: clear stale response
+        watch = self._get_watch()
         if os.path.exists(self.resp_file):
             os.remove(self.resp_file)
+        if watch is not None:
+            watch.drain()
 
         # Write command atomically (tmp + rename prevents partial reads)
         tmp_file = self.cmd_file + ".tmp"
@@ -63,33 +465,428 @@ class IPCClient:
             json.dump(cmd, f)
         os.rename(tmp_file, self.cmd_file)
 
-        # Poll for response
-        start = time.time()
-        while time.time() - start < timeout:
-            if os.path.exists(self.resp_file):
+        return self._wait_for_response(request_id, self.resp_file, timeout)
+
+    def _use_spool(self) -> bool:
+        if self.protocol == "spool":
+            return True
+        if self.protocol == "legacy":
+            return False
+        return os.path.exists(os.path.join(self.spool_dir, SPOOL_READY_FILE))
+
+    def _send_spool(self, cmd: Dict[str, Any], timeout: float) -> Optional[Dict]:
+        """Queue a command in its own spool slot and wait for resp_<id>.json."""
+        request_id = cmd["id"]
+        deadline = time.time() + timeout
+        slot = self._claim_slot(deadline)
+        if slot is None:
+            return None  # Timeout: every slot stayed busy
+
+        lock_path, cmd_path = slot
+        resp_path = os.path.join(self.spool_dir, f"resp_{request_id}.json")
+        try:
+            self._get_watch()  # watch must exist before the game can answer
+            tmp_file = os.path.join(self.spool_dir, f".cmd_{request_id}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(cmd, f)
+            os.rename(tmp_file, cmd_path)
+
+            resp = self._wait_for_response(request_id, resp_path, deadline - time.time())
+            if resp is None:
+                # Withdraw the command if the game never picked it up
                 try:
-                    with open(self.resp_file) as f:
-                        resp = json.load(f)
-                    if resp.get("id") == request_id:
-                        os.remove(self.resp_file)
-                        return resp
-                except (json.JSONDecodeError, IOError):
+                    os.remove(cmd_path)
+                except OSError:
                     pass
-            time.sleep(0.1)
+            return resp
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+    def _claim_slot(self, deadline: float) -> Optional[Tuple[str, str]]:
+        """Atomically claim a free spool slot via an O_EXCL lock file."""
+        offset = (os.getpid() + threading.get_ident()) % SPOOL_SLOTS
+        while True:
+            for i in range(SPOOL_SLOTS):
+                slot = (offset + i) % SPOOL_SLOTS
+                lock_path = os.path.join(self.spool_dir, f"slot_{slot}.lock")
+                try:
+                    fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    self._reclaim_stale_lock(lock_path)
+                    continue
+                with os.fdopen(fd, "w") as f:
+                    f.write(str(os.getpid()))
+                return lock_path, os.path.join(self.spool_dir, f"cmd_{slot}.json")
+            if time.time() >= deadline:
+                return None
+            time.sleep(SPOOL_CLAIM_RETRY)
+
+    @staticmethod
+    def _reclaim_stale_lock(lock_path: str):
+        """Remove a slot lock whose owning process has exited."""
+        try:
+            with open(lock_path) as f:
+                pid = int(f.read().strip() or "0")
+        except (OSError, ValueError):
+            return
+        if pid <= 0 or pid == os.getpid():
+            return
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+        except PermissionError:
+            pass
+
+    def _sweep_orphaned_responses(self):
+        now = time.time()
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return
+        for name in names:
+            if not (name.startswith("resp_") and name.endswith(".json")):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if now - os.stat(path).st_mtime > SPOOL_ORPHAN_MAX_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _resolve_wait_strategy(self, requested: str) -> str:
+        if requested in ("adaptive", "fixed"):
+            return requested
+        if sys.platform.startswith("linux"):
+            try:
+                self._local.watch = self._new_watch()
+                return "inotify"
+            except (OSError, AttributeError) as e:
+                if requested == "inotify":
+                    print(f"[ipc] inotify unavailable ({e}), using adaptive polling")
+        elif requested == "inotify":
+            print("[ipc] inotify requires Linux, using adaptive polling")
+        return "adaptive"
+
+    def _new_watch(self) -> _InotifyWatch:
+        dirs = [os.path.dirname(os.path.abspath(self.resp_file))]
+        if self.protocol != "legacy" and os.path.abspath(self.spool_dir) not in dirs:
+            dirs.append(os.path.abspath(self.spool_dir))
+        watch = _InotifyWatch(dirs)
+        with self._watches_lock:
+            self._watches.append(watch)
+        return watch
+
+    def _get_watch(self) -> Optional[_InotifyWatch]:
+        """This thread's inotify watch, created on first use."""
+        if self.wait_strategy != "inotify":
+            return None
+        watch = getattr(self._local, "watch", None)
+        if watch is None:
+            watch = self._new_watch()
+            self._local.watch = watch
+        return watch
+
+    def _try_read_response(self, request_id: str, resp_path: str) -> Optional[Dict]:
+        if not os.path.exists(resp_path):
+            return None
+        probe = getattr(self._local, "probe", None)
+        try:
+            written_at = os.stat(resp_path).st_mtime
+            with open(resp_path) as f:
+                content = f.read()
+            decode_started = time.perf_counter()
+            resp = json.loads(content)
+            decode_seconds = time.perf_counter() - decode_started
+        except (json.JSONDecodeError, IOError, OSError):
+            return None
+        if resp.get("id") != request_id:
+            if probe is not None:
+                # Polls may see the same stale file repeatedly; count it once
+                probe["stale"].add(str(resp.get("id")))
+            return None
+        if probe is not None:
+            probe["bytes"] = len(content)
+            probe["decode"] = decode_seconds
+        self._wake_latencies.append(max(0.0, time.time() - written_at))
+        try:
+            os.remove(resp_path)
+        except OSError:
+            pass
+        return resp
+
+    def _wait_for_response(self, request_id: str, resp_path: str,
+                           timeout: float) -> Optional[Dict]:
+        resp_name = os.path.basename(resp_path)
+        watch = self._get_watch()
+        interval = ADAPTIVE_POLL_MIN
+        start = time.time()
+        while True:
+            resp = self._try_read_response(request_id, resp_path)
+            if resp is not None:
+                return resp
+
+            remaining = timeout - (time.time() - start)
+            if remaining <= 0:
+                return None  # Timeout
+
+            if watch is not None:
+                # Sleep until something in the directory changes; only
+                # re-check the file when our response name was touched.
+                deadline = time.time() + min(remaining, INOTIFY_MAX_BLOCK)
+                while time.time() < deadline:
+                    if not watch.wait(deadline - time.time()):
+                        break
+                    if resp_name in watch.drain():
+                        break
+            elif self.wait_strategy == "adaptive":
+                time.sleep(min(interval, remaining))
+                interval = min(ADAPTIVE_POLL_MAX, interval * ADAPTIVE_POLL_BACKOFF)
+            else:
+                time.sleep(min(FIXED_POLL_INTERVAL, remaining))
+
+    def wake_latency_stats(self) -> Dict[str, Any]:
+        """Observed delay between the game writing a response and us reading it."""
+        samples = sorted(self._wake_latencies)
+        if not samples:
+            return {"strategy": self.wait_strategy, "samples": 0}
+        n = len(samples)
+        return {
+            "strategy": self.wait_strategy,
+            "samples": n,
+            "mean_ms": round(sum(samples) / n * 1000.0, 3),
+            "p50_ms": round(samples[n // 2] * 1000.0, 3),
+            "p95_ms": round(samples[min(n - 1, int(n * 0.95))] * 1000.0, 3),
+            "max_ms": round(samples[-1] * 1000.0, 3),
+        }
+
+    @staticmethod
+    def _cache_key(command: str, params: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        return command, json.dumps(params or {}, sort_keys=True, default=str)
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._cache_hits += 1
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._cache[key]
+            self._cache_misses += 1
+            return None
+
+    def _cache_put(self, key: Tuple[str, str], command: str, resp: Optional[Dict]):
+        # Only successful answers are reused; errors and timeouts retry
+        if not resp or resp.get("status") != "ok":
+            return
+        ttl = self.cache_ttls.get(command, 0.0)
+        if ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.time() + ttl, copy.deepcopy(resp))
+
+    def invalidate_cache(self, command: Optional[str] = None):
+        """Drop cached reads (all of them, or only those for one command)."""
+        with self._cache_lock:
+            if command is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == command]:
+                    del self._cache[key]
+            self._cache_invalidations += 1
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Read-cache hit/miss counters."""
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": round(self._cache_hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self._cache_invalidations,
+                "entries": len(self._cache),
+            }
+
+    def start_trace(self, path: str):
+        """Record every send/send_batch with its timing to a JSONL trace."""
+        self.stop_trace()
+        self._trace = _TraceWriter(path)
+        atexit.register(self.stop_trace)
+        print(f"[ipc] Recording session trace to {path}")
+
+    def stop_trace(self):
+        trace, self._trace = self._trace, None
+        if trace is not None:
+            trace.close()
+
+    def trace_mark(self, label: str):
+        """Mark a boundary (e.g. a cycle start) in the trace, if recording."""
+        if self._trace is not None:
+            self._trace.mark(label)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-command telemetry plus read-cache counters."""
+        return {
+            "since": self.telemetry.since,
+            "commands": self.telemetry.snapshot(),
+            "cache": self.cache_stats(),
+        }
+
+    def flush_stats(self, periodic: bool = False):
+        """Append a stats() snapshot to stats_file (rotating it when large)."""
+        if not self.stats_file:
+            return
+        if not self._stats_flush_lock.acquire(blocking=False):
+            return  # another thread is writing this interval's snapshot
+        try:
+            now = time.time()
+            if periodic and now < self._next_stats_flush:
+                return
+            self._next_stats_flush = now + self.stats_interval
+            record = dict(self.stats(), ts=now, pid=os.getpid())
+            if not record["commands"]:
+                return
+            try:
+                if os.path.getsize(self.stats_file) > STATS_FILE_MAX_BYTES:
+                    os.replace(self.stats_file, self.stats_file + ".1")
+            except OSError:
+                pass
+            try:
+                with open(self.stats_file, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"[ipc] Could not append stats to {self.stats_file}: {e}")
+        finally:
+            self._stats_flush_lock.release()
+
+    def close(self):
+        """Flush telemetry, stop trace recording and release all inotify watches."""
+        self.flush_stats()
+        self.stop_trace()
+        with self._watches_lock:
+            for watch in self._watches:
+                watch.close()
+            self._watches = []
+        self._local = threading.local()
+
+    def send_batch(self, commands: Sequence[BatchEntry],
+                   timeout: float = 30.0) -> List[Optional[Dict]]:
+        """
+        Send several commands in a single file exchange.
 
-        return None  # Timeout
+        The Lua `batch` handler runs every sub-command within one poll tick,
+        so N reads cost one round trip instead of N.
+
+        Args:
+            commands: Command names or (command, params) tuples
+            timeout: Max seconds to wait for the whole batch
+
+        Returns:
+            One response dict per command, in request order. An entry is
+            None if the batch timed out or the game omitted that result.
+            Cached reads are answered locally and left out of the exchange.
+        """
+        trace = self._trace
+        if trace is None:
+            return self._send_batch(commands, timeout)
+        started = time.perf_counter()
+        results = self._send_batch(commands, timeout)
+        trace.write({
+            "kind": "batch",
+            "t": trace.offset(started),
+            "elapsed": round(time.perf_counter() - started, 6),
+            "commands": [
+                [item, {}] if isinstance(item, str) else [item[0], self._stringify(item[1] or {})]
+                for item in commands
+            ],
+            "results": results,
+        })
+        return results
+
+    def _send_batch(self, commands: Sequence[BatchEntry],
+                    timeout: float) -> List[Optional[Dict]]:
+        """send_batch() without trace recording."""
+        entries = []
+        for item in commands:
+            if isinstance(item, str):
+                command, params = item, None
+            else:
+                command, params = item
+            entries.append((command, params))
+        if not entries:
+            return []
+
+        results: List[Optional[Dict]] = [None] * len(entries)
+        pending: List[int] = []
+        mutating = False
+        for idx, (command, params) in enumerate(entries):
+            if command in self.cache_ttls and not mutating:
+                cached = self._cache_get(self._cache_key(command, params))
+                if cached is not None:
+                    results[idx] = cached
+                    continue
+            elif command not in self.cache_ttls and command not in NON_MUTATING_COMMANDS:
+                mutating = True
+            pending.append(idx)
+        if not pending:
+            return results
+        if mutating:
+            self.invalidate_cache()
+
+        sub_ids = {idx: f"{idx}_{uuid.uuid4().hex[:6]}" for idx in pending}
+        batch_params = {
+            "commands": [
+                {"id": sub_ids[idx], "cmd": entries[idx][0], "params": entries[idx][1] or {}}
+                for idx in pending
+            ]
+        }
+
+        resp = self._exchange("batch", batch_params, timeout)
+        if resp is None:
+            return results
+
+        if resp.get("status") != "ok":
+            # Older mod builds have no batch handler: fall back to one
+            # exchange per command so callers keep working.
+            if "Unknown command" in str(resp.get("message", "")):
+                for idx in pending:
+                    command, params = entries[idx]
+                    results[idx] = self._send(command, params, timeout)
+            return results
+
+        by_id = {}
+        for result in resp.get("data", {}).get("results", []):
+            if isinstance(result, dict):
+                by_id[str(result.get("id", ""))] = result
+        if mutating:
+            self.invalidate_cache()
+        for idx in pending:
+            result = by_id.get(sub_ids[idx])
+            results[idx] = result
+            command, params = entries[idx]
+            # Reads after a mutation in the same batch may already be stale
+            if command in self.cache_ttls and not mutating:
+                self._cache_put(self._cache_key(command, params), command, result)
+        return results
 
     def ping(self, timeout: float = 5.0) -> bool:
         """Check if the game is responding."""
         resp = self.send("ping", timeout=timeout)
         return resp is not None and resp.get("status") == "ok"
 
-    def _stringify(self, data: Any) -> Any:
+    @staticmethod
+    def _stringify(data: Any) -> Any:
         """Recursively convert all values to strings for Lua compatibility."""
         if isinstance(data, dict):
-            return {str(k): self._stringify(v) for k, v in data.items()}
+            return {str(k): IPCClient._stringify(v) for k, v in data.items()}
         elif isinstance(data, list):
-            return [self._stringify(v) for v in data]
+            return [IPCClient._stringify(v) for v in data]
         elif data is None:
             return "null"
         elif isinstance(data, bool):
@@ -109,6 +906,12 @@ def get_ipc() -> IPCClient:
     return _ipc
 
 
+def set_ipc(client) -> None:
+    """Replace the singleton, e.g. with an ipc_replay.ReplayIPC."""
+    global _ipc
+    _ipc = client
+
+
 # --- Convenience functions ---
 
 def query_game_state() -> Dict:
@@ -177,5 +980,6 @@ if __name__ == "__main__":
         if state:
             d = state.get('data', {})
             print(f"Year: {d.get('year')}, Money: ${int(d.get('money', 0)):,}, Speed: {d.get('speed')}")
+        print(f"Wake latency: {ipc.wake_latency_stats()}")
     else:
         print("Game not responding. Is TF2 running with the mod installed?")
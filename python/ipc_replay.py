@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded IPC session trace without the game.
+
+IPCClient records traces with start_trace(path) or TF2_IPC_TRACE=<path>
+(`python orchestrator.py --ipc-trace /tmp/run.jsonl.gz`); the
+orchestrator marks each cycle start. ReplayIPC answers send()/send_batch()
+from such a trace: requests are matched on command + (stringified) params
+and served in recorded order per match key, so a cycle that made the same
+decisions gets byte-identical responses.
+
+    python ipc_replay.py /tmp/run.jsonl.gz --report-only    # recorded wait vs compute
+    python ipc_replay.py /tmp/run.jsonl.gz --profile /tmp/run.prof
+    python ipc_replay.py /tmp/run.jsonl.gz --timing original --cycles 3
+
+Timing modes: 'fast' answers immediately (pure Python compute, e.g. under
+cProfile); 'original' sleeps each request's recorded duration. When a
+replayed cycle diverges and asks for something never recorded, the latest
+recorded response to the same command is reused ('fallback'), or None
+(a timeout) if the command never appeared; --strict raises instead.
+
+Wall-clock logic (cash-rate samples, grace windows) would see a fast
+replay compress minutes into milliseconds, so in fast mode the CLI
+points time.time at ReplayIPC.clock(): the recorded wall time of the
+last served response plus real time since (--real-clock disables this).
+
+Replayed cycles write memory/ like live ones; the CLI restores memory/
+afterwards unless --keep-memory is given. Start from the memory/ of the
+recorded run, with the same TF2_GAME_ROOT (.con recipes), for an exact
+reproduction.
+"""
+
+import argparse
+import bisect
+import copy
+import cProfile
+import gzip
+import json
+import pstats
+import shutil
+import tempfile
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ipc_client import TRACE_VERSION, BatchEntry, IPCClient
+
+
+TIMING_MODES = ("fast", "original")
+MEMORY_DIR = Path(__file__).parent / "memory"
+# pstats rows printed after a profiled replay
+PROFILE_TOP = 25
+
+
+class ReplayMismatch(LookupError):
+    """A strict replay was asked for a request the trace cannot answer."""
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """Load a trace written by IPCClient.start_trace (plain or gzip JSONL)."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # truncated tail of a crashed run
+    if records and records[0].get("kind") == "header":
+        version = records[0].get("version")
+        if version != TRACE_VERSION:
+            raise ValueError(f"trace version {version} not supported (want {TRACE_VERSION})")
+    return records
+
+
+def _key(command: str, params: Any) -> Tuple[str, str]:
+    return command, json.dumps(params or {}, sort_keys=True)
+
+
+def _segments(events: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Split time-stamped events at marks into per-cycle wait/compute totals.
+
+    Each event carries "t" (offset) and, for requests, "elapsed"; marks
+    carry "label". Concurrent requests can overlap, so the wait is capped
+    at the segment's wall time.
+    """
+    segments: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    last_end = 0.0
+    for event in events:
+        if event.get("kind") == "header":
+            continue
+        if event.get("kind") == "mark":
+            if current is not None:
+                current["wall_s"] = event["t"] - current["start"]
+                segments.append(current)
+            current = {"label": event["label"], "start": event["t"],
+                       "ipc_wait_s": 0.0, "requests": 0,
+                       "by_command": defaultdict(float)}
+            continue
+        if current is None:
+            current = {"label": "startup", "start": 0.0, "ipc_wait_s": 0.0,
+                       "requests": 0, "by_command": defaultdict(float)}
+        elapsed = float(event.get("elapsed", 0.0))
+        last_end = max(last_end, float(event.get("t", 0.0)) + elapsed)
+        current["ipc_wait_s"] += elapsed
+        current["requests"] += 1
+        command = event.get("cmd") or "batch"
+        current["by_command"][command] += elapsed
+    if current is not None and current["label"] != "end":
+        # No closing mark (crashed run): end at the last response
+        current["wall_s"] = last_end - current["start"]
+        segments.append(current)
+
+    report = []
+    for seg in segments:
+        if seg["label"] == "end":
+            continue
+        wall = max(0.0, seg["wall_s"])
+        wait = min(seg["ipc_wait_s"], wall)
+        top = sorted(seg["by_command"].items(), key=lambda kv: kv[1], reverse=True)[:3]
+        report.append({
+            "label": seg["label"],
+            "wall_s": round(wall, 4),
+            "ipc_wait_s": round(wait, 4),
+            "compute_s": round(wall - wait, 4),
+            "ipc_share": round(wait / wall, 3) if wall > 0 else 0.0,
+            "requests": seg["requests"],
+            "top_commands": {cmd: round(secs, 4) for cmd, secs in top},
+        })
+    return report
+
+
+def cycle_report(records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-cycle IPC wait vs Python compute of a recorded trace."""
+    return _segments(records)
+
+
+def print_report(report: List[Dict[str, Any]], title: str):
+    print(f"[replay] {title}")
+    total_wall = sum(r["wall_s"] for r in report)
+    total_wait = sum(r["ipc_wait_s"] for r in report)
+    for row in report:
+        tops = ", ".join(f"{c} {s:.3f}s" for c, s in row["top_commands"].items())
+        print(
+            f"[replay]   {row['label']:<12} wall {row['wall_s']:8.3f}s  "
+            f"ipc {row['ipc_wait_s']:8.3f}s  compute {row['compute_s']:8.3f}s  "
+            f"({row['ipc_share']:.0%} ipc, {row['requests']} req) {tops}"
+        )
+    if total_wall > 0:
+        print(f"[replay]   total        wall {total_wall:8.3f}s  ipc {total_wait:8.3f}s  "
+              f"compute {total_wall - total_wait:8.3f}s ({total_wait / total_wall:.0%} ipc)")
+
+
+class ReplayIPC:
+    """Serves a recorded trace through the IPCClient interface."""
+
+    def __init__(self, records: Sequence[Dict[str, Any]], timing: str = "fast",
+                 strict: bool = False):
+        if timing not in TIMING_MODES:
+            raise ValueError(f"timing must be one of {TIMING_MODES}, got {timing!r}")
+        self.timing = timing
+        self.strict = strict
+        self.cache_ttls: Dict[str, float] = {}
+        self._queues: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # command -> (seqs, (response, elapsed)) for out-of-trace fallbacks
+        self._by_command: Dict[str, Tuple[List[int], List[Tuple[Any, float]]]] = {}
+        self._position = -1
+        for rec in records:
+            kind = rec.get("kind")
+            if kind == "send":
+                self._queues[_key(rec["cmd"], rec.get("params"))].append(rec)
+                self._index(rec["cmd"], rec["seq"], rec.get("resp"), rec.get("elapsed", 0.0))
+            elif kind == "batch":
+                commands = rec.get("commands", [])
+                self._queues[_key("batch", commands)].append(rec)
+                share = float(rec.get("elapsed", 0.0)) / max(1, len(commands))
+                for (command, _), result in zip(commands, rec.get("results", [])):
+                    self._index(command, rec["seq"], result, share)
+        self.counts = {"exact": 0, "repeat": 0, "fallback": 0, "miss": 0}
+        self._t0 = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        header = records[0] if records and records[0].get("kind") == "header" else {}
+        self._started_at = float(header.get("started_at", 0.0)) or time.time()
+        self._clock_base = self._started_at
+        self._clock_anchor = time.perf_counter()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayIPC":
+        return cls(read_trace(path), **kwargs)
+
+    def _index(self, command: str, seq: int, resp: Any, elapsed: float):
+        seqs, values = self._by_command.setdefault(command, ([], []))
+        seqs.append(seq)
+        values.append((resp, float(elapsed)))
+
+    def _lookup(self, command: str, params: Any) -> Tuple[Any, float]:
+        key = _key(command, params)
+        queue = self._queues.get(key)
+        if queue:
+            rec = queue.popleft()
+            self._last[key] = rec
+            self._position = max(self._position, rec["seq"])
+            self._advance_clock(rec)
+            self.counts["exact"] += 1
+            payload = rec.get("resp") if command != "batch" else rec.get("results")
+            return payload, float(rec.get("elapsed", 0.0))
+        if self.strict:
+            raise ReplayMismatch(f"no recorded response left for {command} {key[1]}")
+        if key in self._last:
+            rec = self._last[key]
+            self.counts["repeat"] += 1
+            payload = rec.get("resp") if command != "batch" else rec.get("results")
+            return payload, float(rec.get("elapsed", 0.0))
+        indexed = self._by_command.get(command)
+        if indexed is None:
+            self.counts["miss"] += 1
+            return None, 0.0
+        seqs, values = indexed
+        # Latest response at or before the replay position, else the first
+        idx = max(0, bisect.bisect_right(seqs, self._position) - 1)
+        self.counts["fallback"] += 1
+        return values[idx]
+
+    def _advance_clock(self, rec: Dict[str, Any]):
+        recorded = self._started_at + float(rec.get("t", 0.0)) + float(rec.get("elapsed", 0.0))
+        self._clock_base = max(self.clock(), recorded)
+        self._clock_anchor = time.perf_counter()
+
+    def clock(self) -> float:
+        """Recorded wall time of the latest served response, plus real time since."""
+        return self._clock_base + (time.perf_counter() - self._clock_anchor)
+
+    def _serve(self, command: str, params: Any, started: float) -> Any:
+        payload, elapsed = self._lookup(command, params)
+        if self.timing == "original" and elapsed > 0:
+            time.sleep(elapsed)
+        self._events.append({
+            "kind": "send", "cmd": command, "t": started - self._t0,
+            "elapsed": time.perf_counter() - started,
+        })
+        return copy.deepcopy(payload)
+
+    def send(self, command: str, params: Dict[str, Any] = None,
+             timeout: float = 30.0) -> Optional[Dict]:
+        started = time.perf_counter()
+        return self._serve(command, IPCClient._stringify(params or {}), started)
+
+    def send_batch(self, commands: Sequence[BatchEntry],
+                   timeout: float = 30.0) -> List[Optional[Dict]]:
+        started = time.perf_counter()
+        entries = [
+            [item, {}] if isinstance(item, str) else [item[0], IPCClient._stringify(item[1] or {})]
+            for item in commands
+        ]
+        key = _key("batch", entries)
+        if self._queues.get(key) or key in self._last or self.strict:
+            results = self._serve("batch", entries, started)
+            return list(results or [None] * len(entries))
+        # Recorded with a different mix of cached reads: answer per command
+        return [self._serve(cmd, params, time.perf_counter()) for cmd, params in entries]
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def trace_mark(self, label: str):
+        self._events.append({"kind": "mark", "label": label,
+                             "t": time.perf_counter() - self._t0})
+
+    def invalidate_cache(self, command: Optional[str] = None):
+        pass
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "invalidations": 0, "entries": 0}
+
+    def wake_latency_stats(self) -> Dict[str, Any]:
+        return {"strategy": f"replay-{self.timing}", "samples": 0}
+
+    def close(self):
+        pass
+
+    def replay_stats(self) -> Dict[str, Any]:
+        """How requests were matched, and what is left unserved."""
+        return dict(self.counts, unserved=sum(len(q) for q in self._queues.values()))
+
+    def cycle_report(self) -> List[Dict[str, Any]]:
+        """Per-cycle served wait vs Python compute of this replay."""
+        events = list(self._events)
+        events.append({"kind": "mark", "label": "end", "t": time.perf_counter() - self._t0})
+        return _segments(events)
+
+
+def _cycle_numbers(records: Sequence[Dict[str, Any]]) -> List[int]:
+    numbers = []
+    for rec in records:
+        label = str(rec.get("label", "")) if rec.get("kind") == "mark" else ""
+        if label.startswith("cycle "):
+            try:
+                numbers.append(int(label.split()[1]))
+            except ValueError:
+                continue
+    return numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded IPC session trace")
+    parser.add_argument("trace", help="Trace file written by IPCClient.start_trace")
+    parser.add_argument("--timing", choices=TIMING_MODES, default="fast")
+    parser.add_argument("--cycles", type=int, default=0,
+                        help="Cycles to replay (0 = every recorded cycle)")
+    parser.add_argument("--profile", type=str, default=None,
+                        help="Run under cProfile and dump stats to this path")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail on any request the trace cannot answer exactly")
+    parser.add_argument("--report-only", action="store_true",
+                        help="Only print the recorded wait/compute report")
+    parser.add_argument("--real-clock", action="store_true",
+                        help="Leave time.time alone in fast mode")
+    parser.add_argument("--keep-memory", action="store_true",
+                        help="Keep memory/ changes made by the replayed cycles")
+    args = parser.parse_args()
+
+    records = read_trace(args.trace)
+    print_report(cycle_report(records), f"recorded {args.trace}")
+    if args.report_only:
+        return
+
+    cycles = _cycle_numbers(records) or [1]
+    if args.cycles > 0:
+        cycles = cycles[:args.cycles]
+
+    import ipc_client
+    replay = ReplayIPC(records, timing=args.timing, strict=args.strict)
+    ipc_client.set_ipc(replay)
+    import orchestrator
+    if args.timing == "fast":
+        orchestrator.BUILD_WAIT_SCALE = 0.0
+        if not args.real_clock:
+            time.time = replay.clock
+
+    backup = None
+    if not args.keep_memory and MEMORY_DIR.exists():
+        backup = Path(tempfile.mkdtemp(prefix="tf2_replay_memory_")) / "memory"
+        shutil.copytree(MEMORY_DIR, backup)
+
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        orch = orchestrator.Orchestrator()
+        for cycle in cycles:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                result = orch.run_cycle(cycle)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            orchestrator._print_result(cycle, result)
+    finally:
+        if not args.keep_memory:
+            shutil.rmtree(MEMORY_DIR, ignore_errors=True)
+            if backup is not None:
+                shutil.copytree(backup, MEMORY_DIR)
+                shutil.rmtree(backup.parent, ignore_errors=True)
+
+    print_report(replay.cycle_report(), f"replayed ({args.timing})")
+    print(f"[replay] Matches: {replay.replay_stats()}")
+    if profiler is not None:
+        profiler.dump_stats(args.profile)
+        print(f"[replay] Profile written to {args.profile}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+
+if __name__ == "__main__":
+    main()
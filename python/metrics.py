@@ -47,8 +47,11 @@ class MetricsCollector:
             'town_supply': {},
         }
 
+        # Game state, lines and town supply in one IPC exchange
+        game_resp, lines_resp, supply_resp = self.ipc.send_batch(
+            ['query_game_state', 'query_lines', 'query_town_supply'])
+
         # Game state (money, year)
-        game_resp = self.ipc.send('query_game_state')
         if not game_resp or game_resp.get('status') != 'ok':
             return None
         data = game_resp.get('data', {})
@@ -56,7 +59,6 @@ class MetricsCollector:
         snapshot['year'] = data.get('year', '0')
 
         # Lines
-        lines_resp = self.ipc.send('query_lines')
         if lines_resp and lines_resp.get('status') == 'ok':
             for line in lines_resp.get('data', {}).get('lines', []):
                 snapshot['lines'].append({
@@ -71,7 +73,6 @@ class MetricsCollector:
                 })
 
         # Town supply
-        supply_resp = self.ipc.send('query_town_supply')
         if supply_resp and supply_resp.get('status') == 'ok':
             for town in supply_resp.get('data', {}).get('towns', []):
                 town_id = town.get('id', '')
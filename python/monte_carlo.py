@@ -0,0 +1,510 @@
+"""
+Vectorised Monte Carlo engine for Strategist build candidates.
+
+Each candidate profile (cost, base utilization, monthly profit, volatility;
+see Strategist._action_monte_carlo_profile) is simulated over `trials`
+paths of `horizon` months. Trials are drawn in blocks of TRIAL_BLOCK, and a
+batch of profiles is stacked into (profiles, trials, horizon) arrays with
+profit paths from one cumsum.
+
+Simulation runs in two stages:
+
+1. simulate_paths() - cash-independent. A path's monthly profits do not
+   depend on starting cash, so each profile is reduced to per-trial mean
+   utilization, payback month, cumulative-profit minimum and end value.
+   PathCache memoises these per profile and grows them block by block.
+2. evaluate_paths() - per starting cash. Drawdown (min cash below the
+   reserve) and catastrophic loss (ending cash below zero) are threshold
+   counts on the sorted arrays, found by binary search.
+
+    cache = PathCache()
+    sims = simulate_profiles(profiles, current_money, trials=200, horizon=18,
+                             reserve=120_000, cache=cache)
+    sims[0]["utilization_p50"], sims[0]["drawdown_prob"], sims[0]["score"]
+
+Variance reduction: every profile reads the same standard-normal and
+uniform noise (common random numbers), so differences between candidates
+come from the candidates rather than from their draws, and each block is
+half antithetic (z, -z and u, 1-u). Block k is the same for any trial
+count, so a run of n trials is the prefix of any longer run and results
+are identical across batches, cash levels and repeated runs.
+
+simulate_adaptive() samples in growing runs of blocks and stops a profile as soon as
+a caller-supplied rule is satisfied by the confidence intervals ("ci")
+that evaluate_paths() reports on the score and on each tier statistic.
+
+A MonteCarloExecutor spreads the work over a thread or process pool:
+stage 1 in shards of profiles, stage 2 one cash level per task. Since
+noise depends only on the block index, sharding never changes a result.
+"""
+
+import math
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Per-month utilization clamp
+UTILIZATION_MIN = 0.10
+UTILIZATION_MAX = 0.98
+# Months added to the horizon when a path never recovers its starting cash
+PAYBACK_NEVER_MONTHS = 6
+# Profiles kept by a PathCache (oldest evicted first)
+PATH_CACHE_SIZE = 4096
+# Trials per block (even: the second half mirrors the first)
+TRIAL_BLOCK = 20
+# Seed of the shared noise stream
+NOISE_SEED = 0x7F2C
+# Normal quantile for the reported confidence intervals (~95%)
+CI_Z = 1.96
+# Smallest profile shard sent to a pool worker for stage 1
+PARALLEL_MIN_SHARD_PROFILES = 4
+# Profile fields a worker needs (profiles are trimmed to these before pickling)
+PROFILE_FIELDS = ("cost", "base_utilization", "monthly_profit", "volatility")
+
+
+@lru_cache(maxsize=256)
+def _noise_block(index: int, horizon: int) -> np.ndarray:
+    """(3, TRIAL_BLOCK, horizon) standard noise: normal, uniform(0, 1), normal."""
+    rng = np.random.default_rng([NOISE_SEED, index, horizon])
+    half = (TRIAL_BLOCK // 2, horizon)
+    util_z = rng.standard_normal(half)
+    travel_u = rng.random(half)
+    profit_z = rng.standard_normal(half)
+    block = np.stack([
+        np.concatenate([util_z, -util_z]),
+        np.concatenate([travel_u, 1.0 - travel_u]),
+        np.concatenate([profit_z, -profit_z]),
+    ])
+    block.setflags(write=False)
+    return block
+
+
+def _block_count(trials: int) -> int:
+    return max(1, -(-int(trials) // TRIAL_BLOCK))
+
+
+def _noise(first_block: int, blocks: int, horizon: int) -> np.ndarray:
+    """(3, blocks * TRIAL_BLOCK, horizon) noise for blocks [first_block, first_block + blocks)."""
+    parts = [_noise_block(first_block + k, horizon) for k in range(blocks)]
+    return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+
+def _simulate_blocks(profiles: Sequence[Dict[str, Any]], first_block: int, blocks: int,
+                     horizon: int) -> Tuple[np.ndarray, ...]:
+    """Per-trial (util_mean, payback, cum_min, cum_end), each (profiles, trials)."""
+    cost = np.array([float(p.get("cost", 0.0)) for p in profiles])
+    base_util = np.array([float(p.get("base_utilization", 0.0)) for p in profiles])
+    base_profit = np.array([float(p.get("monthly_profit", 0.0)) for p in profiles])
+    volatility = np.array([float(p.get("volatility", 0.3)) for p in profiles])
+
+    util_z, travel_u, profit_z = _noise(first_block, blocks, horizon)
+    util_noise = util_z * (0.08 + volatility * 0.06)[:, None, None]
+    travel_shock = -0.18 + 0.32 * travel_u
+    profit_noise = profit_z * volatility[:, None, None]
+
+    months = np.arange(1, horizon + 1, dtype=np.float64)
+    ramp = np.minimum(1.0, 0.45 + (months / float(horizon)) * 0.75)
+    util = np.clip(
+        base_util[:, None, None] * ramp + util_noise + travel_shock * 0.35,
+        UTILIZATION_MIN,
+        UTILIZATION_MAX,
+    )
+    monthly = base_profit[:, None, None] * (0.8 + 0.4 * util) * (1.0 + profit_noise * 0.35)
+    cum = np.cumsum(monthly, axis=2)
+
+    # Cash is back to its starting level once cumulative profit covers cost
+    recovered = cum >= cost[:, None, None]
+    payback = np.where(
+        recovered.any(axis=2),
+        recovered.argmax(axis=2) + 1.0,
+        float(horizon + PAYBACK_NEVER_MONTHS),
+    )
+    return util.mean(axis=2), payback, np.minimum(0.0, cum.min(axis=2)), cum[:, :, -1]
+
+
+def _sorted_median(sorted_values: np.ndarray) -> float:
+    n = len(sorted_values)
+    mid = n // 2
+    if n % 2:
+        return float(sorted_values[mid])
+    return (float(sorted_values[mid - 1]) + float(sorted_values[mid])) / 2.0
+
+
+def _median_bounds(sorted_values: np.ndarray) -> Tuple[float, float]:
+    """Distribution-free CI for the median from order statistics."""
+    n = len(sorted_values)
+    k = max(0, int(math.floor((n - CI_Z * math.sqrt(n)) / 2.0)))
+    return float(sorted_values[k]), float(sorted_values[min(n - 1, n - 1 - k)])
+
+
+def _proportion_bounds(p: float, n: int) -> Tuple[float, float]:
+    """Wilson score interval for a proportion."""
+    z2 = CI_Z * CI_Z
+    denom = 1.0 + z2 / n
+    center = (p + z2 / (2.0 * n)) / denom
+    half = CI_Z * math.sqrt(p * (1.0 - p) / n + z2 / (4.0 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+@dataclass(frozen=True)
+class PathSummary:
+    """Cash-independent summary of a profile's first `trials` paths."""
+
+    cost: float
+    trials: int
+    horizon: int
+    utilization_p50: float
+    payback_p50_months: float
+    monthly_profit_p50: float
+    utilization_ci: Tuple[float, float]
+    payback_ci: Tuple[float, float]
+    monthly_profit_ci: Tuple[float, float]
+    # Per-trial min(0, lowest cumulative profit) and final cumulative
+    # profit, both sorted ascending.
+    cum_min_sorted: np.ndarray
+    cum_end_sorted: np.ndarray
+
+
+class ProfilePaths:
+    """Per-trial outcomes of one profile in block order; grows by whole blocks."""
+
+    __slots__ = ("cost", "horizon", "util_mean", "payback", "cum_min", "cum_end", "_summaries")
+
+    def __init__(self, cost: float, horizon: int):
+        self.cost = float(cost)
+        self.horizon = int(horizon)
+        self.util_mean = np.empty(0)
+        self.payback = np.empty(0)
+        self.cum_min = np.empty(0)
+        self.cum_end = np.empty(0)
+        self._summaries: Dict[int, PathSummary] = {}
+
+    @property
+    def trials(self) -> int:
+        return len(self.util_mean)
+
+    def extend(self, util_mean: np.ndarray, payback: np.ndarray,
+               cum_min: np.ndarray, cum_end: np.ndarray):
+        self.util_mean = np.concatenate([self.util_mean, util_mean])
+        self.payback = np.concatenate([self.payback, payback])
+        self.cum_min = np.concatenate([self.cum_min, cum_min])
+        self.cum_end = np.concatenate([self.cum_end, cum_end])
+
+    def summary(self, trials: int) -> PathSummary:
+        """Summary over the first `trials` paths (rounded up to whole blocks)."""
+        n = min(self.trials, _block_count(trials) * TRIAL_BLOCK)
+        found = self._summaries.get(n)
+        if found is not None:
+            return found
+        util = np.sort(self.util_mean[:n])
+        payback = np.sort(self.payback[:n])
+        cum_end = np.sort(self.cum_end[:n])
+        horizon = float(self.horizon)
+        profit_lo, profit_hi = _median_bounds(cum_end)
+        found = PathSummary(
+            cost=self.cost,
+            trials=n,
+            horizon=self.horizon,
+            utilization_p50=_sorted_median(util),
+            payback_p50_months=_sorted_median(payback),
+            monthly_profit_p50=_sorted_median(cum_end) / horizon,
+            utilization_ci=_median_bounds(util),
+            payback_ci=_median_bounds(payback),
+            monthly_profit_ci=(profit_lo / horizon, profit_hi / horizon),
+            cum_min_sorted=np.sort(self.cum_min[:n]),
+            cum_end_sorted=cum_end,
+        )
+        self._summaries[n] = found
+        return found
+
+
+class MonteCarloExecutor:
+    """Runs Monte Carlo tasks serially or on a lazily started thread/process pool."""
+
+    KINDS = ("serial", "thread", "process")
+
+    def __init__(self, kind: str = "serial", workers: int = 1):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r} (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self._pool: Optional[Executor] = None
+
+    @property
+    def parallel(self) -> bool:
+        return self.kind != "serial" and self.workers > 1
+
+    def map(self, fn: Callable, items: Sequence) -> List:
+        if not self.parallel or len(items) <= 1:
+            return [fn(item) for item in items]
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return list(self._pool.map(fn, items))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def _simulate_task(task: Tuple) -> Tuple[np.ndarray, ...]:
+    return _simulate_blocks(*task)
+
+
+def _evaluate_task(task: Tuple) -> List[Dict[str, Any]]:
+    summaries, current_money, reserve = task
+    return [evaluate_paths(paths, current_money, reserve) for paths in summaries]
+
+
+def _shards(idx: List[int], executor: Optional[MonteCarloExecutor]) -> List[List[int]]:
+    if executor is None or not executor.parallel:
+        return [idx]
+    count = max(1, min(executor.workers, len(idx) // PARALLEL_MIN_SHARD_PROFILES))
+    bounds = np.linspace(0, len(idx), count + 1).round().astype(int).tolist()
+    return [idx[lo:hi] for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def _grow(entries: Sequence[ProfilePaths], profiles: Sequence[Dict[str, Any]], trials: int,
+          executor: Optional[MonteCarloExecutor] = None):
+    """Simulate the blocks each entry is missing up to `trials`, batched by range."""
+    need = _block_count(trials)
+    groups: Dict[int, List[int]] = {}
+    for i, entry in enumerate(entries):
+        have = entry.trials // TRIAL_BLOCK
+        if have < need:
+            groups.setdefault(have, []).append(i)
+    shards = [(have, shard) for have, idx in groups.items() for shard in _shards(idx, executor)]
+    tasks = [
+        (
+            [{key: profiles[i].get(key) for key in PROFILE_FIELDS if key in profiles[i]} for i in shard],
+            have,
+            need - have,
+            entries[shard[0]].horizon,
+        )
+        for have, shard in shards
+    ]
+    results = executor.map(_simulate_task, tasks) if executor is not None else [_simulate_task(t) for t in tasks]
+    for (_, shard), arrays in zip(shards, results):
+        for row, i in enumerate(shard):
+            entries[i].extend(*(a[row] for a in arrays))
+
+
+def simulate_paths(profiles: Sequence[Dict[str, Any]], trials: int,
+                   horizon: int) -> List[PathSummary]:
+    """Stage 1: simulate every profile's paths in one stacked pass."""
+    entries = [ProfilePaths(float(p.get("cost", 0.0)), horizon) for p in profiles]
+    if entries:
+        _grow(entries, profiles, trials)
+    return [entry.summary(trials) for entry in entries]
+
+
+def evaluate_paths(paths: PathSummary, current_money: int, reserve: float) -> Dict[str, Any]:
+    """Stage 2: summary dict for one profile at one starting cash level."""
+    start_cash = float(current_money) - paths.cost
+    trials = paths.trials
+    # min_cash < reserve  <=>  cum_min < reserve - start_cash
+    drawdown = np.searchsorted(paths.cum_min_sorted, float(reserve) - start_cash, "left") / trials
+    # ending < 0  <=>  cum_end < -start_cash
+    catastrophic = np.searchsorted(paths.cum_end_sorted, -start_cash, "left") / trials
+    drawdown_ci = _proportion_bounds(float(drawdown), trials)
+    catastrophic_ci = _proportion_bounds(float(catastrophic), trials)
+
+    def score_at(profit: float, util: float, dd: float, cat: float, payback: float) -> float:
+        return (
+            (profit / max(1.0, paths.cost)) * 1200.0
+            + util * 80.0
+            - dd * 90.0
+            - cat * 140.0
+            - (payback / float(paths.horizon)) * 15.0
+        )
+
+    score = score_at(paths.monthly_profit_p50, paths.utilization_p50, float(drawdown),
+                     float(catastrophic), paths.payback_p50_months)
+    # Every term is monotone in its statistic, so the bounds combine directly
+    score_ci = (
+        score_at(paths.monthly_profit_ci[0], paths.utilization_ci[0], drawdown_ci[1],
+                 catastrophic_ci[1], paths.payback_ci[1]),
+        score_at(paths.monthly_profit_ci[1], paths.utilization_ci[1], drawdown_ci[0],
+                 catastrophic_ci[0], paths.payback_ci[0]),
+    )
+    return {
+        "score": float(score),
+        # Score with no drawdown or catastrophic loss: the best this profile
+        # can score at any starting cash.
+        "score_bound": float(score_at(paths.monthly_profit_p50, paths.utilization_p50, 0.0, 0.0,
+                                      paths.payback_p50_months)),
+        "utilization_p50": paths.utilization_p50,
+        "drawdown_prob": float(drawdown),
+        "catastrophic_prob": float(catastrophic),
+        "payback_p50_months": paths.payback_p50_months,
+        "monthly_profit_p50": paths.monthly_profit_p50,
+        "cost": paths.cost,
+        "reserve": int(reserve),
+        "trials": paths.trials,
+        "horizon_months": paths.horizon,
+        "ci": {
+            "score": [round(v, 3) for v in score_ci],
+            "utilization_p50": [round(v, 4) for v in paths.utilization_ci],
+            "drawdown_prob": [round(v, 4) for v in drawdown_ci],
+            "catastrophic_prob": [round(v, 4) for v in catastrophic_ci],
+            "monthly_profit_p50": [round(v, 2) for v in paths.monthly_profit_ci],
+        },
+    }
+
+
+def _path_key(profile: Dict[str, Any], horizon: int) -> Tuple:
+    # Numbers are part of the key: a signature keeps its name across
+    # cycles while its estimated cost and profit move.
+    return (
+        str(profile.get("signature", "")),
+        float(profile.get("cost", 0.0)),
+        float(profile.get("base_utilization", 0.0)),
+        float(profile.get("monthly_profit", 0.0)),
+        float(profile.get("volatility", 0.3)),
+        int(horizon),
+    )
+
+
+class PathCache:
+    """Bounded memo of per-profile paths by profile and horizon.
+
+    An entry holds every block simulated so far; a request for fewer
+    trials reads its prefix, a request for more simulates only the
+    missing blocks.
+    """
+
+    def __init__(self, max_entries: int = PATH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, ProfilePaths]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, profiles: Sequence[Dict[str, Any]], trials: int, horizon: int,
+                 executor: Optional[MonteCarloExecutor] = None) -> List[PathSummary]:
+        """Summaries for every profile, simulating only blocks not cached."""
+        need = _block_count(trials) * TRIAL_BLOCK
+        keys = [_path_key(p, horizon) for p in profiles]
+        grow: Dict[Tuple, Dict[str, Any]] = {}
+        for key, profile in zip(keys, profiles):
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = ProfilePaths(float(profile.get("cost", 0.0)), horizon)
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+            if entry.trials >= need:
+                self.hits += 1
+            elif key not in grow:
+                grow[key] = profile
+                self.misses += 1
+        if grow:
+            _grow([self._entries[key] for key in grow], list(grow.values()), trials, executor)
+        entries = [self._entries[key] for key in keys]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return [entry.summary(trials) for entry in entries]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+def simulate_profiles(
+    profiles: Sequence[Dict[str, Any]],
+    current_money: int,
+    trials: int,
+    horizon: int,
+    reserve: float,
+    cache: Optional[PathCache] = None,
+    executor: Optional[MonteCarloExecutor] = None,
+) -> List[Dict[str, Any]]:
+    """Simulate every profile at one starting cash level.
+
+    Returns one dict per profile with score, utilization_p50,
+    drawdown_prob, catastrophic_prob, payback_p50_months,
+    monthly_profit_p50, cost, reserve, trials, horizon_months and ci
+    (confidence bounds on the score and each statistic).
+    """
+    return simulate_cash_levels([profiles], [current_money], trials, horizon, [reserve],
+                                cache=cache, executor=executor)[0]
+
+
+def simulate_cash_levels(
+    profile_sets: Sequence[Sequence[Dict[str, Any]]],
+    cash_levels: Sequence[int],
+    trials: int,
+    horizon: int,
+    reserves: Sequence[float],
+    cache: Optional[PathCache] = None,
+    executor: Optional[MonteCarloExecutor] = None,
+) -> List[List[Dict[str, Any]]]:
+    """simulate_profiles() for several (profiles, cash, reserve) requests.
+
+    Paths for the union of profiles are simulated once, then each request
+    is evaluated as one executor task (e.g. one lookahead beam node).
+    """
+    if cache is None:
+        cache = PathCache(max_entries=max(PATH_CACHE_SIZE, sum(len(p) for p in profile_sets)))
+    flat = [profile for profiles in profile_sets for profile in profiles]
+    all_paths = cache.get_many(flat, trials, horizon, executor) if flat else []
+    tasks = []
+    offset = 0
+    for profiles, current_money, reserve in zip(profile_sets, cash_levels, reserves):
+        tasks.append((all_paths[offset:offset + len(profiles)], current_money, reserve))
+        offset += len(profiles)
+    if executor is None:
+        return [_evaluate_task(task) for task in tasks]
+    return executor.map(_evaluate_task, tasks)
+
+
+def simulate_adaptive(
+    profiles: Sequence[Dict[str, Any]],
+    current_money: int,
+    min_trials: int,
+    max_trials: int,
+    horizon: int,
+    reserve: float,
+    settled: Callable[[List[Dict[str, Any]]], List[bool]],
+    cache: Optional[PathCache] = None,
+    executor: Optional[MonteCarloExecutor] = None,
+) -> List[Dict[str, Any]]:
+    """Sequential version of simulate_profiles().
+
+    Starts every profile at min_trials and doubles the trials of the
+    profiles `settled(sims)` reports as undecided (in whole blocks, capped
+    at max_trials) until all are settled or capped. Each dict's "trials"
+    is what that profile used; a profile run to max_trials matches
+    simulate_profiles() exactly.
+    """
+    if cache is None:
+        cache = PathCache(max_entries=max(PATH_CACHE_SIZE, len(profiles)))
+    max_trials = _block_count(max_trials) * TRIAL_BLOCK
+    trials = [min(max_trials, _block_count(min_trials) * TRIAL_BLOCK)] * len(profiles)
+    sims = simulate_profiles(profiles, current_money, trials[0], horizon, reserve,
+                             cache=cache, executor=executor) if profiles else []
+    while sims:
+        done = settled(sims)
+        grow = [i for i, ok in enumerate(done) if not ok and trials[i] < max_trials]
+        if not grow:
+            break
+        by_trials: Dict[int, List[int]] = {}
+        for i in grow:
+            trials[i] = min(max_trials, trials[i] * 2)
+            by_trials.setdefault(trials[i], []).append(i)
+        for n, idx in by_trials.items():
+            fresh = simulate_profiles([profiles[i] for i in idx], current_money, n, horizon, reserve,
+                                      cache=cache, executor=executor)
+            for i, sim in zip(idx, fresh):
+                sims[i] = sim
+    return sims
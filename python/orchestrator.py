@@ -13,18 +13,29 @@ Stages per cycle:
 
 import argparse
 import math
-import random
+import os
 import re
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
 
 from dag_builder import DAGBuilder, TOWN_DEMANDABLE
 from financial_guardian import FinancialGuardian
+from geo_index import GeoIndex
+from graph_core import GraphCore
 from ipc_client import get_ipc
 from line_doctor import LineDoctor
 from memory_store import MemoryStore
 from metrics import MetricsCollector
+from monte_carlo import (
+    MonteCarloExecutor,
+    PathCache,
+    simulate_adaptive,
+    simulate_cash_levels,
+    simulate_profiles,
+)
 
 
 MAX_ROAD_LEG_DISTANCE_M = 10000
@@ -50,6 +61,8 @@ NON_PROFITABLE_CHAIN_BUDGET_FRACTION = 0.25
 MONTE_CARLO_ENABLED = True
 MONTE_CARLO_MAX_CANDIDATES = 18
 MONTE_CARLO_TRIALS = 200
+MONTE_CARLO_ADAPTIVE = True
+MONTE_CARLO_MIN_TRIALS = 40
 MONTE_CARLO_HORIZON_MONTHS = 18
 MONTE_CARLO_MIN_UTILIZATION_P50 = 0.70
 MONTE_CARLO_MAX_DRAWDOWN_PROB = 0.40
@@ -62,14 +75,17 @@ MONTE_CARLO_RELAXED_CATASTROPHIC_PROB = 0.30
 MONTE_CARLO_SALVAGE_UTILIZATION_P50 = 0.55
 MONTE_CARLO_SALVAGE_DRAWDOWN_PROB = 0.75
 MONTE_CARLO_SALVAGE_CATASTROPHIC_PROB = 0.35
+MONTE_CARLO_FORCED_DRAWDOWN_PROB = 0.90
+MONTE_CARLO_FORCED_CATASTROPHIC_PROB = 0.45
 MONTE_CARLO_LOOKAHEAD_ENABLED = True
-MONTE_CARLO_LOOKAHEAD_HORIZON_STEPS = 3
+MONTE_CARLO_LOOKAHEAD_HORIZON_STEPS = 5
 MONTE_CARLO_LOOKAHEAD_BEAM_WIDTH = 6
 MONTE_CARLO_LOOKAHEAD_EXPAND_PER_NODE = 8
 MONTE_CARLO_LOOKAHEAD_DISCOUNT = 0.88
 MONTE_CARLO_LOOKAHEAD_STEP_MONTHS = 6
 MONTE_CARLO_LOOKAHEAD_TRIALS = 60
 MONTE_CARLO_LOOKAHEAD_HORIZON_MONTHS = 10
+MONTE_CARLO_LOOKAHEAD_CASH_BUCKET = 25_000
 RAIL_FEEDER_ELIGIBLE_CARGOS = {
     "COAL",
     "IRON_ORE",
@@ -97,6 +113,9 @@ STEEL_PAYDAY_LOCAL_FEEDER_MAX_DISTANCE_M = 3200
 STEEL_PAYDAY_BLOCKING_MODE = False
 INTERMODAL_TRANSFER_MAX_DISTANCE_M = 200
 INTERMODAL_STATION_SCAN_RADIUS_M = 1200
+# Multiplier for the fixed waits after build commands (the in-game AI
+# builder needs ~20s); TF2_BUILD_WAIT_SCALE=0 against bench/tf2_sim.py.
+BUILD_WAIT_SCALE = float(os.environ.get("TF2_BUILD_WAIT_SCALE") or 1.0)
 
 
 def _to_int(value: Any, default: int = 0) -> int:
@@ -213,17 +232,16 @@ class Surveyor:
         self.dag_builder = dag_builder
 
     def run(self, dashboard: Dict[str, Any]) -> Dict[str, Any]:
-        game_resp = self.ipc.send("query_game_state")
+        game_resp, lines_resp = self.ipc.send_batch(["query_game_state", "query_lines"])
         if not game_resp or game_resp.get("status") != "ok":
             return {"ok": False, "error": "query_game_state failed"}
 
-        lines_resp = self.ipc.send("query_lines")
         lines_raw = []
         if lines_resp and lines_resp.get("status") == "ok":
             lines_raw = lines_resp.get("data", {}).get("lines", [])
         lines = [_normalize_line(line) for line in lines_raw]
 
-        dag = self.dag_builder.build()
+        dag = self.dag_builder.load_or_build()
         if "error" in dag:
             return {"ok": False, "error": dag["error"]}
 
@@ -418,9 +436,18 @@ class Diagnostician:
 
 
 class Strategist:
-    def __init__(self, memory: MemoryStore, ipc):
+    def __init__(self, memory: MemoryStore, ipc, workers: int = 1, executor: str = "process"):
         self.memory = memory
         self.ipc = ipc
+        # Simulated profit paths do not depend on cash, so the flat scorer,
+        # the lookahead beam and later cycles all share them.
+        self.mc_paths = PathCache()
+        # Monte Carlo profiles and beam nodes are spread over this pool;
+        # results do not depend on the worker count.
+        self.mc_executor = MonteCarloExecutor(executor if workers > 1 else "serial", workers)
+
+    def close(self):
+        self.mc_executor.shutdown()
 
     def choose_action(
         self,
@@ -613,7 +640,7 @@ class Strategist:
         processor_names = self._processor_name_by_id(survey)
         processor_chain_demand = self._processor_chain_demand_by_id(survey)
         node_pos = self._node_position_index(survey.get("dag", {}))
-        edge_pull = self._edge_chain_pull(survey.get("dag", {}).get("complete_chains", []))
+        edge_pull = self._edge_chain_pull(survey.get("dag", {}))
         non_profitable = self._is_non_profitable(survey)
 
         ranked_actions: List[Tuple[float, Action]] = []
@@ -729,7 +756,7 @@ class Strategist:
         processor_chain_demand = self._processor_chain_demand_by_id(survey)
         node_pos = self._node_position_index(dag)
         node_types = self._node_type_by_id(dag)
-        edge_pull = self._edge_chain_pull(dag.get("complete_chains", []))
+        edge_pull = self._edge_chain_pull(dag)
         non_profitable = self._is_non_profitable(survey)
 
         steel_nodes = [
@@ -763,9 +790,11 @@ class Strategist:
             if str(line.get("id", ""))
         }
 
+        pair_matrix = np.nan_to_num(node_pos.pairwise(steel_ids)).tolist()
         for i, mill_a in enumerate(steel_ids):
-            for mill_b in steel_ids[i + 1:]:
-                pair_distance = self._node_distance(node_pos, mill_a, mill_b)
+            for j in range(i + 1, len(steel_ids)):
+                mill_b = steel_ids[j]
+                pair_distance = int(pair_matrix[i][j])
                 if pair_distance <= 0:
                     continue
                 if pair_distance < STEEL_PAYDAY_MIN_PAIR_DISTANCE_M:
@@ -1048,17 +1077,12 @@ class Strategist:
 
     @staticmethod
     def _node_distance(
-        node_pos: Dict[str, Dict[str, float]],
+        node_pos: GeoIndex,
         source_id: str,
         target_id: str,
     ) -> int:
-        source = node_pos.get(str(source_id), {})
-        target = node_pos.get(str(target_id), {})
-        if not source or not target:
-            return 0
-        dx = float(source.get("x", 0.0)) - float(target.get("x", 0.0))
-        dy = float(source.get("y", 0.0)) - float(target.get("y", 0.0))
-        return int(math.sqrt(dx * dx + dy * dy))
+        distance = node_pos.distance(source_id, target_id)
+        return int(distance) if distance is not None else 0
 
     def _candidate_recipe_bridge_actions(
         self,
@@ -1075,7 +1099,7 @@ class Strategist:
         processor_chain_demand = self._processor_chain_demand_by_id(survey)
         node_pos = self._node_position_index(dag)
         node_types = self._node_type_by_id(dag)
-        edge_pull = self._edge_chain_pull(dag.get("complete_chains", []))
+        edge_pull = self._edge_chain_pull(dag)
         non_profitable = self._is_non_profitable(survey)
         road_limit = (
             ROAD_MAX_SHUNT_DISTANCE_RECOVERY_M
@@ -1190,13 +1214,8 @@ class Strategist:
 
     @staticmethod
     def _node_type_by_id(dag: Dict[str, Any]) -> Dict[str, str]:
-        out: Dict[str, str] = {}
-        for group in ("raw_producers", "processors"):
-            for node in dag.get(group, []):
-                nid = str(node.get("id", ""))
-                if nid:
-                    out[nid] = str(node.get("type", "")).lower()
-        return out
+        """Industry id -> lower-case type, cached on the DAG's GraphCore."""
+        return GraphCore.from_dag(dag).type_map()
 
     @staticmethod
     def _edge_strategy_tag(edge: Dict[str, Any], node_types: Dict[str, str]) -> str:
@@ -1359,7 +1378,7 @@ class Strategist:
         self,
         leg: Dict[str, Any],
         chain: Dict[str, Any],
-        node_pos: Dict[str, Dict[str, float]],
+        node_pos: GeoIndex,
         edge_pull: Dict[Tuple[str, str, str], int],
         non_profitable: bool,
     ) -> Optional[Dict[str, Any]]:
@@ -1594,16 +1613,14 @@ class Strategist:
         focus_cargo = self._focus_cargo_from_unserved(survey)
 
         base_rows: Dict[str, Tuple[Action, Dict[str, Any], Dict[str, Any]]] = {}
-        for action in candidates[:MONTE_CARLO_MAX_CANDIDATES]:
-            profile = self._action_monte_carlo_profile(action, survey)
-            if not profile:
-                continue
-            sim = self._simulate_action_monte_carlo(
-                profile,
-                current_money,
-                trials_override=MONTE_CARLO_LOOKAHEAD_TRIALS,
-                horizon_override=MONTE_CARLO_LOOKAHEAD_HORIZON_MONTHS,
-            )
+        profiled = self._profiled_candidates(candidates, survey)
+        base_sims = self._simulate_actions_monte_carlo(
+            [p for _, p in profiled],
+            current_money,
+            trials_override=MONTE_CARLO_LOOKAHEAD_TRIALS,
+            horizon_override=MONTE_CARLO_LOOKAHEAD_HORIZON_MONTHS,
+        )
+        for (action, profile), sim in zip(profiled, base_sims):
             action_id = self._action_identity(action)
             prev = base_rows.get(action_id)
             if prev is None or _to_float(sim.get("score", 0.0), 0.0) > _to_float(prev[2].get("score", 0.0), 0.0):
@@ -1622,108 +1639,208 @@ class Strategist:
         )
         ranked_rows = ranked_rows[: max(6, MONTE_CARLO_LOOKAHEAD_EXPAND_PER_NODE * 2)]
 
+        row_ids = [self._action_identity(action) for action, _, _ in ranked_rows]
+        # Optimistic step score per row. Drawdown and catastrophic loss are the
+        # only cash-dependent score terms and the reserve penalties only
+        # subtract, so the root simulation's "score_bound" caps the step score
+        # at any later cash level.
+        row_bounds = [
+            _to_float(sim.get("score_bound", sim.get("score", 0.0)), 0.0)
+            + self._lookahead_step_bonus(action, focus_cargo)
+            for action, _, sim in ranked_rows
+        ]
+
+        # Nodes share plan prefixes: "seq" is a (action, sim, parent_seq) chain
+        # and "used" a frozenset, so children never copy their parent's plan.
         beam: List[Dict[str, Any]] = [
             {
                 "score": 0.0,
                 "cash": float(current_money),
-                "seq": [],
-                "used": set(),
+                "seq": None,
+                "used": frozenset(),
             }
         ]
+        width = max(1, MONTE_CARLO_LOOKAHEAD_BEAM_WIDTH)
+        per_node = max(1, MONTE_CARLO_LOOKAHEAD_EXPAND_PER_NODE)
+        simulated = 0
+        pruned = 0
 
         for depth in range(max(1, MONTE_CARLO_LOOKAHEAD_HORIZON_STEPS)):
-            next_beam: List[Dict[str, Any]] = []
             discount = MONTE_CARLO_LOOKAHEAD_DISCOUNT ** depth
-            for node in beam:
-                expansions = 0
-                for action, profile, _ in ranked_rows:
-                    action_id = self._action_identity(action)
-                    if action_id in node["used"]:
-                        continue
-                    sim = self._simulate_action_monte_carlo(
-                        profile,
-                        int(node["cash"]),
-                        trials_override=MONTE_CARLO_LOOKAHEAD_TRIALS,
-                        horizon_override=MONTE_CARLO_LOOKAHEAD_HORIZON_MONTHS,
-                    )
-                    catastrophic = _to_float(sim.get("catastrophic_prob", 1.0), 1.0)
-                    if catastrophic > 0.70:
+            # Every (node, row) pair best-first by optimistic child score.
+            pending = sorted(
+                (
+                    (float(node["score"]) + row_bounds[r] * discount, n, r)
+                    for n, node in enumerate(beam)
+                    for r in range(len(ranked_rows))
+                    if row_ids[r] not in node["used"]
+                ),
+                key=lambda item: (-item[0], item[1], item[2]),
+            )
+            # Each node keeps its best `per_node` children, sorted.
+            children: List[List[Dict[str, Any]]] = [[] for _ in beam]
+            cursor = 0
+            while cursor < len(pending):
+                floor = self._lookahead_beam(children, width)
+                floor_score = float(floor[-1]["score"]) if len(floor) >= width else float("-inf")
+                chunk: Dict[int, List[int]] = {}
+                taken = 0
+                while cursor < len(pending) and taken < width * 2:
+                    bound, n, r = pending[cursor]
+                    if bound < floor_score:
+                        # Sorted: nothing left can enter the beam.
+                        pruned += len(pending) - cursor
+                        cursor = len(pending)
+                        break
+                    cursor += 1
+                    if len(children[n]) >= per_node and bound < float(children[n][-1]["score"]):
+                        pruned += 1
                         continue
+                    chunk.setdefault(n, []).append(r)
+                    taken += 1
+                if not chunk:
+                    break
 
-                    step_score = _to_float(sim.get("score", 0.0), 0.0)
-                    target_chain_cargo = str(action.payload.get("target_chain_cargo", "")).upper()
-                    if action.action == "build_chain":
-                        step_score += 14.0
-                        chain = action.payload.get("chain", {}) if isinstance(action.payload.get("chain"), dict) else {}
-                        if str(chain.get("final_cargo", "")).upper() == "MACHINES":
-                            step_score += 20.0
-                    elif action.action == "build_multi_stop_loop":
-                        step_score += 8.0
-                    elif action.action == "build_shunt" and str(action.payload.get("target_chain_id", "")):
-                        step_score += 6.0
-                        if target_chain_cargo == "MACHINES":
-                            step_score += 14.0
-
-                    # Focus mode penalty: avoid unrelated shunts while machine
-                    # demand remains open.
-                    if focus_cargo:
-                        if action.action == "build_shunt" and target_chain_cargo and target_chain_cargo != focus_cargo:
+                node_ids = list(chunk)
+                batches = self._simulate_action_batches(
+                    [[ranked_rows[r][1] for r in chunk[n]] for n in node_ids],
+                    [int(beam[n]["cash"]) for n in node_ids],
+                    trials_override=MONTE_CARLO_LOOKAHEAD_TRIALS,
+                    horizon_override=MONTE_CARLO_LOOKAHEAD_HORIZON_MONTHS,
+                )
+                for n, node_sims in zip(node_ids, batches):
+                    node = beam[n]
+                    for r, sim in zip(chunk[n], node_sims):
+                        simulated += 1
+                        catastrophic = _to_float(sim.get("catastrophic_prob", 1.0), 1.0)
+                        if catastrophic > 0.70:
+                            continue
+                        action, profile, _ = ranked_rows[r]
+                        step_score = _to_float(sim.get("score", 0.0), 0.0)
+                        step_score += self._lookahead_step_bonus(action, focus_cargo)
+
+                        cost = _to_float(sim.get("cost", profile.get("cost", 0.0)), 0.0)
+                        monthly_profit = _to_float(sim.get("monthly_profit_p50", 0.0), 0.0)
+                        next_cash = float(node["cash"]) - cost + (monthly_profit * MONTE_CARLO_LOOKAHEAD_STEP_MONTHS)
+                        reserve = max(MONTE_CARLO_MIN_CASH_RESERVE, int(max(0.0, float(node["cash"])) * 0.10))
+                        if next_cash < float(reserve):
                             step_score -= 20.0
-                        if action.action == "build_shunt" and not target_chain_cargo:
-                            step_score -= 28.0
-                        if action.action == "build_chain":
-                            chain = action.payload.get("chain", {}) if isinstance(action.payload.get("chain"), dict) else {}
-                            if str(chain.get("final_cargo", "")).upper() != focus_cargo:
-                                step_score -= 16.0
-                        if action.action == "build_multi_stop_loop":
-                            step_score -= 14.0
-
-                    cost = _to_float(sim.get("cost", profile.get("cost", 0.0)), 0.0)
-                    monthly_profit = _to_float(sim.get("monthly_profit_p50", 0.0), 0.0)
-                    next_cash = float(node["cash"]) - cost + (monthly_profit * MONTE_CARLO_LOOKAHEAD_STEP_MONTHS)
-                    reserve = max(MONTE_CARLO_MIN_CASH_RESERVE, int(max(0.0, float(node["cash"])) * 0.10))
-                    if next_cash < float(reserve):
-                        step_score -= 20.0
-                    if next_cash < -250_000.0:
-                        step_score -= 80.0
-
-                    next_node = {
-                        "score": float(node["score"]) + (step_score * discount),
-                        "cash": next_cash,
-                        "seq": list(node["seq"]) + [(action, sim)],
-                        "used": set(node["used"]) | {action_id},
-                    }
-                    next_beam.append(next_node)
-                    expansions += 1
-                    if expansions >= max(1, MONTE_CARLO_LOOKAHEAD_EXPAND_PER_NODE):
-                        break
-
+                        if next_cash < -250_000.0:
+                            step_score -= 80.0
+
+                        siblings = children[n]
+                        siblings.append({
+                            "score": float(node["score"]) + (step_score * discount),
+                            "cash": next_cash,
+                            "seq": (action, sim, node["seq"]),
+                            "used": node["used"] | {row_ids[r]},
+                        })
+                        siblings.sort(key=lambda c: (float(c["score"]), float(c["cash"])), reverse=True)
+                        del siblings[per_node:]
+
+            next_beam = self._lookahead_beam(children, width)
             if not next_beam:
                 break
-            next_beam.sort(key=lambda n: (float(n["score"]), float(n["cash"])), reverse=True)
-            beam = next_beam[: max(1, MONTE_CARLO_LOOKAHEAD_BEAM_WIDTH)]
+            beam = next_beam
 
-        if not beam or not beam[0].get("seq"):
+        if not beam or beam[0].get("seq") is None:
             return self._select_action_via_monte_carlo(survey, candidates)
 
-        best = max(beam, key=lambda n: (float(n["score"]), float(n["cash"])))
-        first_action, first_sim = best["seq"][0]
-        plan_labels = [self._action_route_label(item[0]) for item in best["seq"]]
+        best = beam[0]
+        plan = self._unroll_plan(best["seq"])
+        first_action, first_sim = plan[0]
+        plan_labels = [self._action_route_label(action) for action, _ in plan]
+        print(
+            f"[strategist] lookahead: {len(plan)} steps, {simulated} nodes simulated, "
+            f"{pruned} pruned by bound"
+        )
 
         first_action.payload = dict(first_action.payload)
         first_action.payload["mc"] = first_sim
         first_action.payload["mc_tier"] = "lookahead"
         first_action.payload["mc_sequence"] = plan_labels
         first_action.payload["mc_sequence_score"] = float(best.get("score", 0.0))
-        first_action.payload["mc_sequence_horizon"] = len(best["seq"])
+        first_action.payload["mc_sequence_horizon"] = len(plan)
         first_action.reason = (
             f"{first_action.reason} "
-            f"[MC lookahead steps={len(best['seq'])} plan_score={best.get('score', 0.0):.1f} "
+            f"[MC lookahead steps={len(plan)} plan_score={best.get('score', 0.0):.1f} "
             f"util_p50={first_sim.get('utilization_p50', 0.0):.2f} "
             f"drawdown={first_sim.get('drawdown_prob', 1.0):.2f}]"
         )
         return first_action
 
+    @staticmethod
+    def _lookahead_step_bonus(action: Action, focus_cargo: str) -> float:
+        """Cash-independent part of a lookahead step score beyond the MC score."""
+        bonus = 0.0
+        target_chain_cargo = str(action.payload.get("target_chain_cargo", "")).upper()
+        chain = action.payload.get("chain", {}) if isinstance(action.payload.get("chain"), dict) else {}
+        if action.action == "build_chain":
+            bonus += 14.0
+            if str(chain.get("final_cargo", "")).upper() == "MACHINES":
+                bonus += 20.0
+        elif action.action == "build_multi_stop_loop":
+            bonus += 8.0
+        elif action.action == "build_shunt" and str(action.payload.get("target_chain_id", "")):
+            bonus += 6.0
+            if target_chain_cargo == "MACHINES":
+                bonus += 14.0
+
+        # Focus mode penalty: avoid unrelated shunts while machine
+        # demand remains open.
+        if focus_cargo:
+            if action.action == "build_shunt" and target_chain_cargo and target_chain_cargo != focus_cargo:
+                bonus -= 20.0
+            if action.action == "build_shunt" and not target_chain_cargo:
+                bonus -= 28.0
+            if action.action == "build_chain" and str(chain.get("final_cargo", "")).upper() != focus_cargo:
+                bonus -= 16.0
+            if action.action == "build_multi_stop_loop":
+                bonus -= 14.0
+        return bonus
+
+    @staticmethod
+    def _lookahead_beam(children: List[List[Dict[str, Any]]], width: int) -> List[Dict[str, Any]]:
+        """Best `width` children after merging transpositions.
+
+        Children with the same used set and cash bucket are the same state
+        reached in a different order (A->B vs B->A); only the best is kept.
+        """
+        table: Dict[Tuple[FrozenSet[str], int], Dict[str, Any]] = {}
+        for siblings in children:
+            for child in siblings:
+                key = (child["used"], int(float(child["cash"]) // MONTE_CARLO_LOOKAHEAD_CASH_BUCKET))
+                known = table.get(key)
+                if known is None or (child["score"], child["cash"]) > (known["score"], known["cash"]):
+                    table[key] = child
+        return sorted(
+            table.values(),
+            key=lambda c: (float(c["score"]), float(c["cash"])),
+            reverse=True,
+        )[:width]
+
+    @staticmethod
+    def _unroll_plan(seq: Optional[Tuple]) -> List[Tuple[Action, Dict[str, Any]]]:
+        plan = []
+        while seq is not None:
+            action, sim, seq = seq
+            plan.append((action, sim))
+        plan.reverse()
+        return plan
+
+    def _profiled_candidates(
+        self,
+        candidates: List[Action],
+        survey: Dict[str, Any],
+    ) -> List[Tuple[Action, Dict[str, Any]]]:
+        """(action, profile) for the first MONTE_CARLO_MAX_CANDIDATES with a profile."""
+        rows = []
+        for action in candidates[:MONTE_CARLO_MAX_CANDIDATES]:
+            profile = self._action_monte_carlo_profile(action, survey)
+            if profile:
+                rows.append((action, profile))
+        return rows
+
     def _action_monte_carlo_profile(
         self,
         action: Action,
@@ -1850,119 +1967,78 @@ class Strategist:
         trials_override: Optional[int] = None,
         horizon_override: Optional[int] = None,
     ) -> Dict[str, Any]:
-        cost = float(profile.get("cost", 0.0))
-        base_util = float(profile.get("base_utilization", 0.0))
-        base_monthly_profit = float(profile.get("monthly_profit", 0.0))
-        volatility = float(profile.get("volatility", 0.3))
+        return self._simulate_actions_monte_carlo(
+            [profile], current_money, trials_override, horizon_override
+        )[0]
+
+    def _simulate_actions_monte_carlo(
+        self,
+        profiles: List[Dict[str, Any]],
+        current_money: int,
+        trials_override: Optional[int] = None,
+        horizon_override: Optional[int] = None,
+        tiers: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Monte Carlo summaries for a batch of profiles at one cash level.
 
+        With `tiers` (and MONTE_CARLO_ADAPTIVE) trials are sampled in blocks
+        from MONTE_CARLO_MIN_TRIALS up to the trial count, and a profile stops
+        once its confidence intervals settle the tier decision.
+        """
         trials = max(20, _to_int(trials_override, MONTE_CARLO_TRIALS))
         horizon = max(6, _to_int(horizon_override, MONTE_CARLO_HORIZON_MONTHS))
         reserve = max(MONTE_CARLO_MIN_CASH_RESERVE, int(current_money * 0.12))
-        rng = random.Random(f"{profile.get('signature', '')}:{current_money}:{int(cost)}")
-
-        utilization_trials: List[float] = []
-        ending_cash: List[float] = []
-        min_cash: List[float] = []
-        payback_months: List[float] = []
-        monthly_profit_samples: List[float] = []
-
-        for _ in range(trials):
-            cash = float(current_money) - cost
-            min_seen = cash
-            util_series: List[float] = []
-            recovered_at = float(horizon + 6)
-
-            for month in range(1, horizon + 1):
-                ramp = min(1.0, 0.45 + (month / float(horizon)) * 0.75)
-                util_noise = rng.gauss(0.0, 0.08 + volatility * 0.06)
-                travel_shock = rng.uniform(-0.18, 0.14)
-                util = self._clamp(
-                    (base_util * ramp) + util_noise + (travel_shock * 0.35),
-                    0.10,
-                    0.98,
-                )
-                util_series.append(util)
-                profit_noise = rng.gauss(0.0, volatility)
-                monthly_profit = base_monthly_profit * (0.8 + 0.4 * util) * (1.0 + profit_noise * 0.35)
-                cash += monthly_profit
-                min_seen = min(min_seen, cash)
-                if recovered_at > horizon and cash >= float(current_money):
-                    recovered_at = float(month)
-
-            utilization_trials.append(sum(util_series) / float(len(util_series)))
-            ending_cash.append(cash)
-            min_cash.append(min_seen)
-            payback_months.append(recovered_at)
-            monthly_profit_samples.append((cash - (float(current_money) - cost)) / float(horizon))
-
-        util_p50 = self._median(utilization_trials, 0.0)
-        drawdown_prob = (
-            sum(1 for c in min_cash if c < float(reserve)) / float(trials)
-            if trials > 0
-            else 1.0
-        )
-        catastrophic_prob = (
-            sum(1 for c in ending_cash if c < 0.0) / float(trials)
-            if trials > 0
-            else 1.0
-        )
-        payback_p50 = self._median(payback_months, float(horizon + 6))
-        monthly_profit_p50 = self._median(monthly_profit_samples, 0.0)
-
-        score = (
-            (monthly_profit_p50 / max(1.0, cost)) * 1200.0
-            + util_p50 * 80.0
-            - drawdown_prob * 90.0
-            - catastrophic_prob * 140.0
-            - (payback_p50 / float(horizon)) * 15.0
-        )
-        accepted = (
-            util_p50 >= MONTE_CARLO_MIN_UTILIZATION_P50
-            and drawdown_prob <= MONTE_CARLO_MAX_DRAWDOWN_PROB
-            and catastrophic_prob <= MONTE_CARLO_MAX_CATASTROPHIC_PROB
-        )
-
-        return {
-            "score": float(score),
-            "accepted": bool(accepted),
-            "utilization_p50": float(util_p50),
-            "drawdown_prob": float(drawdown_prob),
-            "catastrophic_prob": float(catastrophic_prob),
-            "payback_p50_months": float(payback_p50),
-            "monthly_profit_p50": float(monthly_profit_p50),
-            "cost": float(cost),
-            "reserve": int(reserve),
-            "trials": int(trials),
-            "horizon_months": int(horizon),
-        }
+        if tiers and MONTE_CARLO_ADAPTIVE:
+            sims = simulate_adaptive(
+                profiles,
+                current_money,
+                min(trials, MONTE_CARLO_MIN_TRIALS),
+                trials,
+                horizon,
+                reserve,
+                lambda rows: self._monte_carlo_settled(rows, tiers),
+                cache=self.mc_paths,
+                executor=self.mc_executor,
+            )
+        else:
+            sims = simulate_profiles(
+                profiles, current_money, trials, horizon, reserve,
+                cache=self.mc_paths, executor=self.mc_executor,
+            )
+        self._mark_accepted(sims)
+        return sims
 
-    def _select_action_via_monte_carlo(
+    def _simulate_action_batches(
         self,
-        survey: Dict[str, Any],
-        candidates: List[Action],
-    ) -> Optional[Action]:
-        if not candidates:
-            return None
-        if not MONTE_CARLO_ENABLED:
-            return candidates[0]
-
-        current_money = _to_int(survey.get("money", 0), 0)
-        if current_money <= 0:
-            return None
-        non_profitable = self._is_non_profitable(survey)
-
-        evaluations: List[Tuple[Action, Dict[str, Any]]] = []
-        for action in candidates[:MONTE_CARLO_MAX_CANDIDATES]:
-            profile = self._action_monte_carlo_profile(action, survey)
-            if not profile:
-                continue
-            sim = self._simulate_action_monte_carlo(profile, current_money)
-            evaluations.append((action, sim))
+        profile_sets: List[List[Dict[str, Any]]],
+        cash_levels: List[int],
+        trials_override: Optional[int] = None,
+        horizon_override: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """_simulate_actions_monte_carlo for several cash levels, one executor task each."""
+        trials = max(20, _to_int(trials_override, MONTE_CARLO_TRIALS))
+        horizon = max(6, _to_int(horizon_override, MONTE_CARLO_HORIZON_MONTHS))
+        reserves = [max(MONTE_CARLO_MIN_CASH_RESERVE, int(cash * 0.12)) for cash in cash_levels]
+        batches = simulate_cash_levels(
+            profile_sets, cash_levels, trials, horizon, reserves,
+            cache=self.mc_paths, executor=self.mc_executor,
+        )
+        for sims in batches:
+            self._mark_accepted(sims)
+        return batches
 
-        if not evaluations:
-            return None
+    @staticmethod
+    def _mark_accepted(sims: List[Dict[str, Any]]):
+        for sim in sims:
+            sim["accepted"] = bool(
+                sim["utilization_p50"] >= MONTE_CARLO_MIN_UTILIZATION_P50
+                and sim["drawdown_prob"] <= MONTE_CARLO_MAX_DRAWDOWN_PROB
+                and sim["catastrophic_prob"] <= MONTE_CARLO_MAX_CATASTROPHIC_PROB
+            )
 
-        tiers = [
+    @staticmethod
+    def _monte_carlo_tiers(non_profitable: bool) -> List[Dict[str, Any]]:
+        return [
             {
                 "name": "strict",
                 "util": MONTE_CARLO_MIN_UTILIZATION_P50,
@@ -1986,49 +2062,126 @@ class Strategist:
             },
         ]
 
-        chosen_tier = ""
-        shortlist: List[Tuple[Action, Dict[str, Any]]] = []
+    @staticmethod
+    def _monte_carlo_shortlist(
+        sims: List[Dict[str, Any]],
+        tiers: List[Dict[str, Any]],
+    ) -> Tuple[str, List[int]]:
+        """First tier any simulation qualifies for, and the indexes that do."""
         for tier in tiers:
             shortlist = [
-                (act, sim)
-                for act, sim in evaluations
+                i
+                for i, sim in enumerate(sims)
                 if _to_float(sim.get("utilization_p50", 0.0), 0.0) >= float(tier["util"])
                 and _to_float(sim.get("drawdown_prob", 1.0), 1.0) <= float(tier["drawdown"])
                 and _to_float(sim.get("catastrophic_prob", 1.0), 1.0) <= float(tier["cat"])
                 and _to_float(sim.get("monthly_profit_p50", -999999.0), -999999.0) >= float(tier["profit"])
             ]
             if shortlist:
-                chosen_tier = str(tier["name"])
-                break
+                return str(tier["name"]), shortlist
+        # Last resort: still pick the safest simulated candidate so we do not
+        # stall indefinitely when all options narrowly miss tier thresholds.
+        fallback = [
+            i
+            for i, sim in enumerate(sims)
+            if _to_float(sim.get("drawdown_prob", 1.0), 1.0) <= MONTE_CARLO_FORCED_DRAWDOWN_PROB
+            and _to_float(sim.get("catastrophic_prob", 1.0), 1.0) <= MONTE_CARLO_FORCED_CATASTROPHIC_PROB
+        ]
+        return ("forced" if fallback else ""), fallback
+
+    @classmethod
+    def _monte_carlo_settled(
+        cls,
+        sims: List[Dict[str, Any]],
+        tiers: List[Dict[str, Any]],
+    ) -> List[bool]:
+        """Stopping rule for adaptive sampling.
+
+        A simulation is settled when no tier threshold lies strictly inside
+        the confidence interval of its statistic and, if it is on the current
+        shortlist, its score interval is clear of the leader's: below the
+        leader's lower bound, or (for the leader) above every other upper bound.
+        """
+        thresholds = {
+            "utilization_p50": {float(t["util"]) for t in tiers},
+            "drawdown_prob": {float(t["drawdown"]) for t in tiers} | {MONTE_CARLO_FORCED_DRAWDOWN_PROB},
+            "catastrophic_prob": {float(t["cat"]) for t in tiers} | {MONTE_CARLO_FORCED_CATASTROPHIC_PROB},
+            "monthly_profit_p50": {float(t["profit"]) for t in tiers},
+        }
+        settled = []
+        for sim in sims:
+            ci = sim.get("ci", {})
+            settled.append(not any(
+                ci[key][0] < value < ci[key][1]
+                for key, values in thresholds.items()
+                if key in ci
+                for value in values
+            ))
+
+        _, shortlist = cls._monte_carlo_shortlist(sims, tiers)
+        if len(shortlist) > 1:
+            def bounds(i: int) -> Tuple[float, float]:
+                low, high = sims[i].get("ci", {}).get("score", (sims[i]["score"], sims[i]["score"]))
+                return float(low), float(high)
+
+            leader = max(shortlist, key=lambda i: (sims[i]["score"], sims[i]["monthly_profit_p50"]))
+            leader_low = bounds(leader)[0]
+            for i in shortlist:
+                if i != leader and bounds(i)[1] > leader_low:
+                    settled[i] = False
+                    settled[leader] = False
+        return settled
+
+    def _select_action_via_monte_carlo(
+        self,
+        survey: Dict[str, Any],
+        candidates: List[Action],
+    ) -> Optional[Action]:
+        if not candidates:
+            return None
+        if not MONTE_CARLO_ENABLED:
+            return candidates[0]
 
+        current_money = _to_int(survey.get("money", 0), 0)
+        if current_money <= 0:
+            return None
+        tiers = self._monte_carlo_tiers(self._is_non_profitable(survey))
+
+        profiled = self._profiled_candidates(candidates, survey)
+        if not profiled:
+            return None
+        sims = self._simulate_actions_monte_carlo([p for _, p in profiled], current_money, tiers=tiers)
+        used = [int(sim.get("trials", 0)) for sim in sims]
+        print(
+            f"[strategist] MC trials: {sum(used)} over {len(used)} candidates "
+            f"(min {min(used)}, max {max(used)}, fixed would be {len(used) * MONTE_CARLO_TRIALS})"
+        )
+
+        chosen_tier, shortlist = self._monte_carlo_shortlist(sims, tiers)
         if not shortlist:
-            # Last resort: still pick the safest simulated candidate so we do not
-            # stall indefinitely when all options narrowly miss tier thresholds.
-            fallback = [
-                row for row in evaluations
-                if _to_float(row[1].get("drawdown_prob", 1.0), 1.0) <= 0.90
-                and _to_float(row[1].get("catastrophic_prob", 1.0), 1.0) <= 0.45
-            ]
-            if not fallback:
-                return None
-            chosen_tier = "forced"
-            shortlist = fallback
+            return None
 
-        best_action, best_sim = max(
+        best = max(
             shortlist,
-            key=lambda row: (
-                _to_float(row[1].get("score", 0.0), 0.0),
-                _to_float(row[1].get("monthly_profit_p50", 0.0), 0.0),
+            key=lambda i: (
+                _to_float(sims[i].get("score", 0.0), 0.0),
+                _to_float(sims[i].get("monthly_profit_p50", 0.0), 0.0),
             ),
         )
+        best_action, best_sim = profiled[best][0], sims[best]
         best_action.payload = dict(best_action.payload)
         best_action.payload["mc"] = best_sim
         best_action.payload["mc_tier"] = chosen_tier or "strict"
+        best_action.payload["mc_trials"] = {
+            str(profile.get("signature", "")): sim.get("trials", 0)
+            for (_, profile), sim in zip(profiled, sims)
+        }
         best_action.reason = (
             f"{best_action.reason} "
             f"[MC tier={chosen_tier or 'strict'} score={best_sim.get('score', 0.0):.1f} "
             f"util_p50={best_sim.get('utilization_p50', 0.0):.2f} "
-            f"drawdown={best_sim.get('drawdown_prob', 1.0):.2f}]"
+            f"drawdown={best_sim.get('drawdown_prob', 1.0):.2f} "
+            f"trials={best_sim.get('trials', 0)}]"
         )
         return best_action
 
@@ -2569,7 +2722,7 @@ class Strategist:
         dag = survey.get("dag", {})
         money = _to_int(survey.get("money", 0), 0)
         non_profitable = self._is_non_profitable(survey)
-        chain_pull = self._edge_chain_pull(dag.get("complete_chains", []))
+        chain_pull = self._edge_chain_pull(dag)
         node_pos = self._node_position_index(dag)
 
         candidates: List[Dict[str, Any]] = []
@@ -2651,33 +2804,14 @@ class Strategist:
         return candidates
 
     @staticmethod
-    def _edge_chain_pull(chains: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], int]:
-        pull: Dict[Tuple[str, str, str], int] = {}
-        for chain in chains:
-            demand = _to_int(chain.get("town_demand", 0), 0)
-            for leg in chain.get("legs", []):
-                sid = str(leg.get("source_id", ""))
-                tid = str(leg.get("target_id", ""))
-                cargo = str(leg.get("cargo", "")).upper()
-                if not sid or not tid or not cargo:
-                    continue
-                key = (sid, tid, cargo)
-                pull[key] = pull.get(key, 0) + max(1, demand)
-        return pull
+    def _edge_chain_pull(dag: Dict[str, Any]) -> Dict[Tuple[str, str, str], int]:
+        """(source, target, CARGO) -> summed chain town demand, from GraphCore."""
+        return GraphCore.from_dag(dag).chain_pull_map()
 
     @staticmethod
-    def _node_position_index(dag: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
-        idx: Dict[str, Dict[str, float]] = {}
-        for group in ("raw_producers", "processors"):
-            for node in dag.get(group, []):
-                nid = str(node.get("id", ""))
-                if not nid:
-                    continue
-                idx[nid] = {
-                    "x": _to_float(node.get("x", 0), 0.0),
-                    "y": _to_float(node.get("y", 0), 0.0),
-                }
-        return idx
+    def _node_position_index(dag: Dict[str, Any]) -> GeoIndex:
+        """Survey-wide positions; the GeoIndex behind the DAG's GraphCore."""
+        return GraphCore.from_dag(dag).geo
 
     def _select_shunt_transport(
         self,
@@ -2685,7 +2819,7 @@ class Strategist:
         target_id: str,
         distance: int,
         chain_pull: int,
-        node_pos: Dict[str, Dict[str, float]],
+        node_pos: GeoIndex,
         non_profitable: bool = False,
     ) -> str:
         if distance >= WATER_MIN_DISTANCE_M:
@@ -3208,7 +3342,7 @@ class Builder:
 
             entry["ok"] = True
             result["steps"].append(entry)
-            wait_seconds = _to_int(step.get("wait_seconds", 0), 0)
+            wait_seconds = _to_int(step.get("wait_seconds", 0), 0) * BUILD_WAIT_SCALE
             if wait_seconds > 0:
                 time.sleep(wait_seconds)
 
@@ -3434,15 +3568,17 @@ class Builder:
         if not rails or not roads:
             return None
 
-        best: Optional[Dict[str, Any]] = None
-        for rail in rails:
-            for road in roads:
-                dx = float(rail.get("x", 0.0)) - float(road.get("x", 0.0))
-                dy = float(rail.get("y", 0.0)) - float(road.get("y", 0.0))
-                gap = int(math.sqrt(dx * dx + dy * dy))
-                if not best or gap < _to_int(best.get("gap", 999999), 999999):
-                    best = {"gap": gap, "rail": rail, "road": road}
-        return best
+        # rails x roads gap matrix; argmin returns the first (rail-major) minimum.
+        gaps = GeoIndex.pairwise_points(
+            [(r["x"], r["y"]) for r in rails],
+            [(r["x"], r["y"]) for r in roads],
+        ).astype(np.int64)
+        rail_idx, road_idx = divmod(int(np.argmin(gaps)), len(roads))
+        return {
+            "gap": int(gaps[rail_idx, road_idx]),
+            "rail": rails[rail_idx],
+            "road": roads[road_idx],
+        }
 
     def _ensure_industry_intermodal_ready(
         self,
@@ -3478,7 +3614,7 @@ class Builder:
                 "status": "error",
                 "message": f"build_rail_station failed for industry {industry_id}",
             }
-        time.sleep(20)
+        time.sleep(20 * BUILD_WAIT_SCALE)
 
         stations = self._query_nearby_stations(industry_id, INTERMODAL_STATION_SCAN_RADIUS_M)
         best = self._best_intermodal_gap(stations)
@@ -3652,14 +3788,25 @@ class Learner:
 
 
 class Orchestrator:
-    def __init__(self, dry_run: bool = False, max_vehicle_add_per_line: int = 12):
+    def __init__(
+        self,
+        dry_run: bool = False,
+        max_vehicle_add_per_line: int = 12,
+        strategist_workers: int = 1,
+        strategist_executor: str = "process",
+    ):
         self.ipc = get_ipc()
         self.memory = MemoryStore()
         self.metrics = MetricsCollector(self.ipc, self.memory)
         self.dag_builder = DAGBuilder()
         self.surveyor = Surveyor(self.ipc, self.dag_builder)
         self.diagnostician = Diagnostician(self.memory)
-        self.strategist = Strategist(self.memory, self.ipc)
+        self.strategist = Strategist(
+            self.memory,
+            self.ipc,
+            workers=strategist_workers,
+            executor=strategist_executor,
+        )
         self.planner = Planner()
         self.financial_guardian = FinancialGuardian(self.ipc)
         self.line_doctor = LineDoctor()
@@ -3774,6 +3921,10 @@ class Orchestrator:
         return f"{first} ... (+{len(steps)-1} steps)"
 
     def run_cycle(self, cycle: int) -> Dict[str, Any]:
+        self.ipc.trace_mark(f"cycle {cycle}")
+        # Start every cycle from fresh game state; repeated reads within the
+        # cycle are then served from the IPC read cache.
+        self.ipc.invalidate_cache()
         self._ensure_calendar_speed()
         pre = self.metrics.collect()
         if not pre:
@@ -3958,6 +4109,24 @@ def _parse_args() -> argparse.Namespace:
         default=None,
         help="Path to log file (tees stdout to file and console)",
     )
+    parser.add_argument(
+        "--ipc-trace",
+        type=str,
+        default=None,
+        help="Record every IPC request/response to this JSONL(.gz) trace for ipc_replay.py",
+    )
+    parser.add_argument(
+        "--strategist-workers",
+        type=int,
+        default=1,
+        help="Worker pool size for Strategist Monte Carlo scoring (1 = serial)",
+    )
+    parser.add_argument(
+        "--strategist-executor",
+        choices=("thread", "process"),
+        default="process",
+        help="Pool type used when --strategist-workers > 1",
+    )
     return parser.parse_args()
 
 
@@ -4026,6 +4195,19 @@ class _Tee:
         return self._stdout.fileno()
 
 
+def _print_ipc_stats(ipc, top: int = 5) -> None:
+    """Commands that spent the most time waiting on the game so far."""
+    commands = ipc.stats().get("commands", {})
+    ranked = sorted(commands.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    for command, st in ranked[:top]:
+        print(
+            f"[ipc] {command}: n={st['count']} total={st['total_ms'] / 1000.0:.1f}s "
+            f"p50={st['p50_ms']:.0f}ms p95={st['p95_ms']:.0f}ms p99={st['p99_ms']:.0f}ms "
+            f"timeouts={st['timeouts']} stale={st['stale_discards']} "
+            f"bytes~{st['resp_bytes_mean']:,} decode={st['decode_ms_total']:.0f}ms"
+        )
+
+
 def main() -> int:
     args = _parse_args()
 
@@ -4034,6 +4216,8 @@ def main() -> int:
         sys.stderr = _Tee(args.log_file)
 
     ipc = get_ipc()
+    if args.ipc_trace:
+        ipc.start_trace(args.ipc_trace)
 
     # Wait indefinitely for TF2 IPC connection
     attempt = 0
@@ -4057,6 +4241,8 @@ def main() -> int:
     orchestrator = Orchestrator(
         dry_run=args.dry_run,
         max_vehicle_add_per_line=max(0, args.max_vehicle_add_per_line),
+        strategist_workers=max(1, args.strategist_workers),
+        strategist_executor=args.strategist_executor,
     )
 
     cycle = 1
@@ -4067,83 +4253,87 @@ def main() -> int:
     print(f"[startup] Orchestrator running (cycles={'infinite' if args.cycles == 0 else args.cycles}, "
           f"delay={base_delay}s, dry_run={args.dry_run})")
 
-    while True:
-        try:
-            result = orchestrator.run_cycle(cycle)
-            _print_result(cycle, result)
+    try:
+        while True:
+            try:
+                result = orchestrator.run_cycle(cycle)
+                _print_result(cycle, result)
+
+                if not result.get("ok", False):
+                    consecutive_errors += 1
+                    consecutive_idles = 0
+                elif result.get("idle", False):
+                    consecutive_idles += 1
+                    consecutive_errors = 0
+                else:
+                    consecutive_errors = 0
+                    consecutive_idles = 0
 
-            if not result.get("ok", False):
+            except Exception as exc:
                 consecutive_errors += 1
                 consecutive_idles = 0
-            elif result.get("idle", False):
-                consecutive_idles += 1
-                consecutive_errors = 0
-            else:
-                consecutive_errors = 0
-                consecutive_idles = 0
-
-        except Exception as exc:
-            consecutive_errors += 1
-            consecutive_idles = 0
-            print(f"[cycle {cycle}] EXCEPTION ({type(exc).__name__}): {exc}")
-
-        # Print dashboard every 10 cycles
-        if cycle % 10 == 0:
+                print(f"[cycle {cycle}] EXCEPTION ({type(exc).__name__}): {exc}")
+
+            # Print dashboard every 10 cycles
+            if cycle % 10 == 0:
+                try:
+                    dashboard_text = orchestrator.metrics.get_dashboard_text()
+                    if dashboard_text:
+                        print(f"\n{'='*60}")
+                        print(dashboard_text)
+                        print(f"{'='*60}\n")
+                except Exception:
+                    pass
+                _print_ipc_stats(ipc)
+
+            # Print line doctor summary every 20 cycles
+            if cycle % 20 == 0:
+                try:
+                    diag_summary = orchestrator.line_doctor.get_diagnosis_summary()
+                    if diag_summary:
+                        print(f"[line_doctor] Tracking {len(diag_summary)} broken lines")
+                except Exception:
+                    pass
+
+            # Check for game completion (year >= 2025)
             try:
-                dashboard_text = orchestrator.metrics.get_dashboard_text()
-                if dashboard_text:
-                    print(f"\n{'='*60}")
-                    print(dashboard_text)
-                    print(f"{'='*60}\n")
+                gs = ipc.send("query_game_state", {})
+                if gs and gs.get("status") == "ok":
+                    game_year = _to_int(gs.get("data", {}).get("year", 0), 0)
+                    if game_year >= 2025:
+                        print(f"[orchestrator] Game year {game_year} reached. Domination complete!")
+                        break
             except Exception:
                 pass
 
-        # Print line doctor summary every 20 cycles
-        if cycle % 20 == 0:
-            try:
-                diag_summary = orchestrator.line_doctor.get_diagnosis_summary()
-                if diag_summary:
-                    print(f"[line_doctor] Tracking {len(diag_summary)} broken lines")
-            except Exception:
-                pass
+            if args.cycles > 0 and cycle >= args.cycles:
+                break
 
-        # Check for game completion (year >= 2025)
-        try:
-            gs = ipc.send("query_game_state", {})
-            if gs and gs.get("status") == "ok":
-                game_year = _to_int(gs.get("data", {}).get("year", 0), 0)
-                if game_year >= 2025:
-                    print(f"[orchestrator] Game year {game_year} reached. Domination complete!")
-                    break
-        except Exception:
-            pass
-
-        if args.cycles > 0 and cycle >= args.cycles:
-            break
-
-        # Adaptive delay: backoff on errors/idles, reset on success
-        if consecutive_errors >= 5:
-            delay = 120
-            print(f"[orchestrator] {consecutive_errors} consecutive errors, backing off {delay}s")
-            # Try to re-ping IPC in case game restarted
-            if not ipc.ping():
-                print("[orchestrator] IPC lost, waiting for game to come back...")
-                for attempt in range(30):
-                    time.sleep(10)
-                    if ipc.ping():
-                        print("[orchestrator] IPC restored!")
-                        consecutive_errors = 0
-                        break
-                else:
-                    print("[orchestrator] IPC not restored after 5 minutes, exiting")
-                    return 1
-        elif consecutive_idles >= 5:
-            delay = min(base_delay + consecutive_idles * 10, 120)
-        else:
-            delay = base_delay
+            # Adaptive delay: backoff on errors/idles, reset on success
+            if consecutive_errors >= 5:
+                delay = 120
+                print(f"[orchestrator] {consecutive_errors} consecutive errors, backing off {delay}s")
+                # Try to re-ping IPC in case game restarted
+                if not ipc.ping():
+                    print("[orchestrator] IPC lost, waiting for game to come back...")
+                    for attempt in range(30):
+                        time.sleep(10)
+                        if ipc.ping():
+                            print("[orchestrator] IPC restored!")
+                            consecutive_errors = 0
+                            break
+                    else:
+                        print("[orchestrator] IPC not restored after 5 minutes, exiting")
+                        return 1
+            elif consecutive_idles >= 5:
+                delay = min(base_delay + consecutive_idles * 10, 120)
+            else:
+                delay = base_delay
 
-        cycle += 1
-        time.sleep(delay)
+            cycle += 1
+            time.sleep(delay)
+    finally:
+        orchestrator.strategist.close()
 
     print(f"[orchestrator] Finished after {cycle} cycles")
     return 0
@@ -0,0 +1,150 @@
+"""
+Persistent catalog of parsed industry recipes from `.con` files.
+
+DAGBuilder resolves each industry's recipe by reading its `.con` file from
+mod construction roots or the base-game construction zip and running a
+regex parser over it. This catalog keeps the parsed result on disk so a
+fresh process (e.g. each `agent_helper.py run-cycle`) resolves recipes
+without opening the zip or re-parsing anything.
+
+Entries are keyed by the `.con` path relative to the construction root and
+tagged with a source fingerprint:
+- mod/local file:  file:<absolute path>:<size>:<mtime_ns>
+- base-game zip:   zip:<zip path>:<member CRC32>
+A recipe is reused only when the file that currently wins resolution has
+the same fingerprint. The zip's `.con` member index (name -> CRC) is built
+once and rebuilt only when the zip's size or mtime changes.
+
+`python dag_builder.py --index` fills the catalog for every industry `.con`
+up front (see `build_recipe_index`) and records a summary in `index_meta`.
+"""
+
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+
+DEFAULT_CATALOG_FILE = Path(__file__).parent / "memory" / "recipe_catalog.json"
+CATALOG_VERSION = 1
+
+
+class RecipeCatalog:
+    """JSON-backed recipe cache keyed by `.con` source fingerprint."""
+
+    def __init__(self, path: Path = DEFAULT_CATALOG_FILE):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.zip_index: Dict[str, Any] = {}
+        # Summary of the last full pre-index run (empty if never indexed)
+        self.index_meta: Dict[str, Any] = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def zip_members(self, zip_path: str) -> Dict[str, int]:
+        """Return `.con` member -> CRC32 for the zip, reusing the stored index."""
+        try:
+            st = os.stat(zip_path)
+        except OSError:
+            return {}
+
+        idx = self.zip_index
+        if (
+            idx.get("path") == zip_path
+            and idx.get("size") == st.st_size
+            and idx.get("mtime_ns") == st.st_mtime_ns
+        ):
+            return idx.get("members", {})
+
+        try:
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                members = {
+                    info.filename: info.CRC
+                    for info in zf.infolist()
+                    if info.filename.endswith(".con")
+                }
+        except (OSError, zipfile.BadZipFile):
+            return {}
+
+        self.zip_index = {
+            "path": zip_path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "members": members,
+        }
+        self.dirty = True
+        return members
+
+    def lookup(self, rel_path: str, source_key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached recipe if it was parsed from this exact source."""
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry.get("source") == source_key:
+            self.hits += 1
+            return entry.get("recipe")
+        self.misses += 1
+        return None
+
+    def store(self, rel_path: str, source_key: str, recipe: Dict[str, Any]):
+        self.entries[rel_path] = {"source": source_key, "recipe": recipe}
+        self.dirty = True
+
+    def prune(self, keep: Set[str], prefix: str = "") -> int:
+        """Drop entries under `prefix` whose path is not in `keep`."""
+        stale = [
+            rel for rel in self.entries
+            if rel.startswith(prefix) and rel not in keep
+        ]
+        for rel in stale:
+            del self.entries[rel]
+        if stale:
+            self.dirty = True
+        return len(stale)
+
+    def set_index_meta(self, meta: Dict[str, Any]):
+        self.index_meta = dict(meta)
+        self.dirty = True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "zip_members": len(self.zip_index.get("members", {})),
+        }
+
+    def save(self):
+        """Persist the catalog if anything changed since load."""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": CATALOG_VERSION,
+                    "zip_index": self.zip_index,
+                    "index_meta": self.index_meta,
+                    "entries": self.entries,
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(str(tmp_path), str(self.path))
+        self.dirty = False
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        if not isinstance(data, dict) or data.get("version") != CATALOG_VERSION:
+            return
+        self.entries = data.get("entries", {}) or {}
+        self.zip_index = data.get("zip_index", {}) or {}
+        self.index_meta = data.get("index_meta", {}) or {}
@@ -0,0 +1,120 @@
+"""
+Uniform-grid spatial index for nearest-neighbour lookups on the map.
+
+DAGBuilder keeps one index per output cargo so supplier expansion only
+touches the k closest producers instead of every producer on the map.
+Points are bucketed into square cells; a query scans rings of cells
+outward from the query point and stops once no unscanned cell can beat
+the current k-th result.
+
+Results are ordered by (rounded distance, insertion order), the same
+tie-break the supply graph used when it kept every producer in
+`query_industries` order and picked the nearest with `min()`.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+# Cell edge in metres; TF2 industries are typically 1-5 km apart.
+DEFAULT_CELL_SIZE = 2000.0
+
+
+class GridIndex:
+    """Static 2D grid over (id, x, y) points."""
+
+    def __init__(self, points: List[Tuple[str, float, float]],
+                 cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, str, float, float]]] = {}
+        self.size = 0
+        self._min_cx = self._min_cy = 0
+        self._max_cx = self._max_cy = -1
+
+        for order, (point_id, x, y) in enumerate(points):
+            cx, cy = self._cell(x, y)
+            self.cells.setdefault((cx, cy), []).append((order, point_id, float(x), float(y)))
+            if self.size == 0:
+                self._min_cx = self._max_cx = cx
+                self._min_cy = self._max_cy = cy
+            else:
+                self._min_cx = min(self._min_cx, cx)
+                self._max_cx = max(self._max_cx, cx)
+                self._min_cy = min(self._min_cy, cy)
+                self._max_cy = max(self._max_cy, cy)
+            self.size += 1
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _ring(self, cx: int, cy: int, r: int):
+        """Occupied cells at Chebyshev distance exactly r from (cx, cy)."""
+        if r == 0:
+            bucket = self.cells.get((cx, cy))
+            if bucket:
+                yield bucket
+            return
+        x_lo = max(cx - r, self._min_cx)
+        x_hi = min(cx + r, self._max_cx)
+        for y in (cy - r, cy + r):
+            if self._min_cy <= y <= self._max_cy:
+                for x in range(x_lo, x_hi + 1):
+                    bucket = self.cells.get((x, y))
+                    if bucket:
+                        yield bucket
+        y_lo = max(cy - r + 1, self._min_cy)
+        y_hi = min(cy + r - 1, self._max_cy)
+        for x in (cx - r, cx + r):
+            if self._min_cx <= x <= self._max_cx:
+                for y in range(y_lo, y_hi + 1):
+                    bucket = self.cells.get((x, y))
+                    if bucket:
+                        yield bucket
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        k: Optional[int] = None,
+        radius: Optional[float] = None,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """Return up to k (id, distance) pairs nearest to (x, y).
+
+        `k=None` returns every point (within `radius`, if given). Ordering
+        is by rounded distance, then insertion order.
+        """
+        if self.size == 0 or (k is not None and k <= 0):
+            return []
+
+        cx, cy = self._cell(x, y)
+        max_ring = max(
+            abs(cx - self._min_cx), abs(cx - self._max_cx),
+            abs(cy - self._min_cy), abs(cy - self._max_cy),
+        )
+        found: List[Tuple[int, int, str, float]] = []
+        for r in range(max_ring + 1):
+            for bucket in self._ring(cx, cy, r):
+                for order, point_id, px, py in bucket:
+                    if point_id == exclude:
+                        continue
+                    dist = math.sqrt((px - x) ** 2 + (py - y) ** 2)
+                    if radius is not None and dist > radius:
+                        continue
+                    found.append((round(dist), order, point_id, dist))
+
+            # Any point in ring r+1 is at least r * cell_size away.
+            next_bound = r * self.cell_size
+            if radius is not None and next_bound > radius:
+                break
+            if k is not None and len(found) >= k:
+                found.sort()
+                found = found[:k]
+                # Strictly beyond the k-th rounded distance: cannot tie or beat it.
+                if next_bound > found[-1][0] + 0.5:
+                    break
+
+        found.sort()
+        if k is not None:
+            found = found[:k]
+        return [(point_id, dist) for _, _, point_id, dist in found]
@@ -12,6 +12,13 @@
       1. Poll command file for new commands
       2. If command found, execute it and write response
       3. Clear command file after processing
+
+    Spool protocol (several commands in flight):
+      /tmp/tf2_ipc/cmd_<slot>.json  - One pending command per slot (Python
+                                      claims a slot, we consume and delete it)
+      /tmp/tf2_ipc/resp_<id>.json   - One response file per request id
+      /tmp/tf2_ipc/ready            - Written by us once the spool is served
+      Up to SPOOL_MAX_PER_TICK queued commands are drained per poll.
 ]]
 
 local M = {}
@@ -30,10 +37,15 @@ end
 local CMD_FILE = "/tmp/tf2_cmd.json"
 local RESP_FILE = "/tmp/tf2_resp.json"
 local LOG_FILE = "/tmp/tf2_simple_ipc.log"
+local SPOOL_DIR = "/tmp/tf2_ipc"
+local SPOOL_SLOTS = 16
+local SPOOL_MAX_PER_TICK = 8
 
 -- State
 local last_cmd_id = nil
 local json = nil
+local spool_ready = false
+local spool_next_slot = 0
 
 -- Snapshot storage for state diffing
 local snapshots = {}
@@ -56,7 +68,8 @@ local function get_json()
 end
 
 -- Write response (direct write since os.rename may not be available in sandbox)
-local function write_response(resp)
+local function write_response(resp, path)
+    path = path or RESP_FILE
     local j = get_json()
     if not j then
         log("ERROR: No JSON encoder")
@@ -71,9 +84,9 @@ local function write_response(resp)
     end
 
     -- Write directly to response file
-    local f, err = io.open(RESP_FILE, "w")
+    local f, err = io.open(path, "w")
     if not f then
-        log("ERROR: Cannot open " .. RESP_FILE .. ": " .. tostring(err))
+        log("ERROR: Cannot open " .. path .. ": " .. tostring(err))
         return false
     end
 
@@ -389,20 +402,11 @@ handlers.query_industries = function(params)
     return {status = "ok", data = {industries = industries}}
 end
 
--- Debug helper: inspect one industry's live cargo IO and AI-builder params.
-handlers.query_industry_recipe = function(params)
-    if not params or not params.industry_id then
-        return {status = "error", message = "Need industry_id parameter"}
-    end
-
-    local industryId = tonumber(params.industry_id)
-    if not industryId then
-        return {status = "error", message = "Invalid industry_id"}
-    end
-
+-- Live cargo IO and AI-builder params for one industry (nil, err if missing)
+local function industry_recipe_detail(industryId)
     local industry = game.interface.getEntity(industryId)
     if not industry then
-        return {status = "error", message = "Industry not found: " .. tostring(industryId)}
+        return nil, "Industry not found: " .. tostring(industryId)
     end
 
     local constructionId = api.engine.system.streetConnectorSystem.getConstructionEntityForSimBuilding(industryId)
@@ -455,19 +459,73 @@ handlers.query_industry_recipe = function(params)
     end
 
     return {
-        status = "ok",
-        data = {
-            industry_id = tostring(industryId),
-            name = industry.name or "Unknown",
-            file_name = construction and construction.fileName or "",
-            type = (construction and construction.fileName and construction.fileName:match("industry/(.-)%.") or "unknown"),
-            items_produced = produced,
-            items_consumed = consumed,
-            ai_params = aiParams
-        }
+        industry_id = tostring(industryId),
+        name = industry.name or "Unknown",
+        file_name = construction and construction.fileName or "",
+        type = (construction and construction.fileName and construction.fileName:match("industry/(.-)%.") or "unknown"),
+        items_produced = produced,
+        items_consumed = consumed,
+        ai_params = aiParams
     }
 end
 
+-- Debug helper: inspect one industry's live cargo IO and AI-builder params.
+handlers.query_industry_recipe = function(params)
+    if not params or not params.industry_id then
+        return {status = "error", message = "Need industry_id parameter"}
+    end
+
+    local industryId = tonumber(params.industry_id)
+    if not industryId then
+        return {status = "error", message = "Invalid industry_id"}
+    end
+
+    local detail, err = industry_recipe_detail(industryId)
+    if not detail then
+        return {status = "error", message = err}
+    end
+    return {status = "ok", data = detail}
+end
+
+-- Bulk variant of query_industry_recipe: one response for many industries.
+-- params.industry_ids: comma-separated ids; omit for every industry.
+handlers.query_industry_recipes = function(params)
+    local ids = {}
+    local idsParam = params and params.industry_ids
+    if type(idsParam) == "table" then
+        for _, raw in ipairs(idsParam) do
+            local id = tonumber(raw)
+            if id then table.insert(ids, id) end
+        end
+    elseif type(idsParam) == "string" and idsParam ~= "" then
+        for raw in idsParam:gmatch("[^,]+") do
+            local id = tonumber(raw)
+            if id then table.insert(ids, id) end
+        end
+    else
+        local entities = game.interface.getEntities({radius=1e9}, {type="SIM_BUILDING", includeData=true})
+        for id, industry in pairs(entities) do
+            if industry.itemsProduced or industry.itemsConsumed then
+                table.insert(ids, id)
+            end
+        end
+    end
+
+    local recipes = {}
+    local missing = {}
+    for _, industryId in ipairs(ids) do
+        local ok, detail = pcall(industry_recipe_detail, industryId)
+        if ok and detail then
+            table.insert(recipes, detail)
+        else
+            table.insert(missing, tostring(industryId))
+        end
+    end
+
+    log("RECIPES: " .. #recipes .. " industries, " .. #missing .. " missing")
+    return {status = "ok", data = {recipes = recipes, missing = missing}}
+end
+
 -- Debug helper: inspect constructionRep data for a specific .con file.
 handlers.query_construction_recipe = function(params)
     if not params or not params.file_name then
@@ -4631,6 +4689,101 @@ handlers.query_supply_tree = function(params)
     return {status = "error", message = "query_supply_tree failed: " .. tostring(result)}
 end
 
+-- Run one command through its handler, always returning a response table
+local function run_command(cmd_name, params)
+    local handler = handlers[cmd_name]
+    if not handler then
+        log("UNKNOWN: " .. tostring(cmd_name))
+        return {status = "error", message = "Unknown command: " .. tostring(cmd_name)}
+    end
+
+    log("EXEC: " .. tostring(cmd_name))
+    local success, result = pcall(handler, params)
+    if not success then
+        log("FAIL: " .. tostring(result))
+        return {status = "error", message = tostring(result)}
+    end
+    if not result then
+        return {status = "error", message = "nil response"}
+    end
+    log("OK: " .. tostring(cmd_name))
+    return result
+end
+
+-- Execute several commands within a single poll tick.
+-- params.commands = [{id=..., cmd=..., params={...}}, ...]
+-- Returns data.results in request order, each result tagged with its id.
+handlers.batch = function(params)
+    if not params or type(params.commands) ~= "table" then
+        return {status = "error", message = "Need commands list"}
+    end
+
+    local results = {}
+    for idx, sub in ipairs(params.commands) do
+        local sub_id = sub.id or tostring(idx)
+        local resp
+        if sub.cmd == "batch" then
+            resp = {status = "error", message = "Nested batch not allowed"}
+        else
+            resp = run_command(sub.cmd, sub.params)
+        end
+        resp.id = sub_id
+        table.insert(results, resp)
+    end
+
+    log("BATCH: ran " .. #results .. " commands")
+    return {status = "ok", data = {results = results}}
+end
+
+-- Advertise the spool once Python has created the directory
+local function mark_spool_ready()
+    if spool_ready then return true end
+    local f = io.open(SPOOL_DIR .. "/ready", "w")
+    if not f then return false end
+    f:write("1")
+    f:close()
+    spool_ready = true
+    log("SPOOL: serving " .. SPOOL_DIR)
+    return true
+end
+
+-- Process up to SPOOL_MAX_PER_TICK queued spool commands.
+-- Slots are scanned from a rotating offset so no client starves.
+local function drain_spool(j)
+    if not mark_spool_ready() then return end
+
+    local processed = 0
+    for i = 0, SPOOL_SLOTS - 1 do
+        if processed >= SPOOL_MAX_PER_TICK then break end
+        local slot = (spool_next_slot + i) % SPOOL_SLOTS
+        local path = SPOOL_DIR .. "/cmd_" .. slot .. ".json"
+        local f = io.open(path, "r")
+        if f then
+            local content = f:read("*a")
+            f:close()
+            os.remove(path)
+            if content and #content > 0 then
+                processed = processed + 1
+                local ok, cmd = pcall(j.decode, content)
+                local cmd_id = ok and cmd and tostring(cmd.id or "") or ""
+                if cmd_id:match("^[%w_]+$") then
+                    log("SPOOL RECV: " .. tostring(cmd.cmd) .. " id=" .. cmd_id .. " slot=" .. slot)
+                    local resp = run_command(cmd.cmd, cmd.params)
+                    resp.id = cmd_id
+                    local write_ok, write_result = pcall(write_response, resp,
+                        SPOOL_DIR .. "/resp_" .. cmd_id .. ".json")
+                    if not write_ok or not write_result then
+                        log("SPOOL WRITE_FAIL: id=" .. cmd_id)
+                    end
+                else
+                    log("ERROR: Bad spool command in slot " .. slot .. ": " .. tostring(content):sub(1, 50))
+                end
+            end
+        end
+    end
+    spool_next_slot = (spool_next_slot + 1) % SPOOL_SLOTS
+end
+
 -- Poll for commands and process them
 function M.poll()
     -- Ensure game is at target speed
@@ -4643,6 +4796,9 @@ function M.poll()
         return
     end
 
+    -- Per-request spool first, then the legacy single-slot command file
+    drain_spool(j)
+
     -- Check for command file
     local f = io.open(CMD_FILE, "r")
     if not f then return end
@@ -4671,10 +4827,6 @@ function M.poll()
     -- IMMEDIATELY mark as processed to prevent re-processing
     last_cmd_id = cmd_id
 
-    -- Get handler
-    local handler = handlers[cmd.cmd]
-    local resp
-
     -- Ensure game is at target speed before executing command
     if api and api.cmd then
         pcall(function()
@@ -4682,20 +4834,7 @@ function M.poll()
         end)
     end
 
-    if handler then
-        log("EXEC: " .. tostring(cmd.cmd))
-        local success, result = pcall(handler, cmd.params)
-        if success then
-            resp = result
-            log("OK: " .. tostring(cmd.cmd))
-        else
-            resp = {status = "error", message = tostring(result)}
-            log("FAIL: " .. tostring(result))
-        end
-    else
-        resp = {status = "error", message = "Unknown command: " .. tostring(cmd.cmd)}
-        log("UNKNOWN: " .. tostring(cmd.cmd))
-    end
+    local resp = run_command(cmd.cmd, cmd.params)
 
     log("PRE_WRITE")
 
@@ -4708,6 +4847,10 @@ function M.poll()
         resp = {status = "error", message = "nil response", id = cmd_id}
     end
 
+    -- Clear command file before answering: a client that wakes up fast
+    -- may write its next command right after reading this response.
+    clear_command()
+
     -- Write response with error handling
     local write_success, write_result = pcall(function()
         return write_response(resp)
@@ -4723,8 +4866,6 @@ function M.poll()
         log("WRITE_ERROR: " .. tostring(write_result))
     end
 
-    -- Clear command file
-    clear_command()
     log("DONE: " .. tostring(cmd_id))
 end
 
@@ -4734,6 +4875,8 @@ function M.init()
     -- Clear any stale files
     pcall(os.remove, CMD_FILE)
     pcall(os.remove, RESP_FILE)
+    pcall(os.remove, SPOOL_DIR .. "/ready")
+    spool_ready = false
 end
 
 return M